@@ -1,36 +1,82 @@
-def Database(dsn: str, timeout: float = 5.0):
+def Database(
+    dsn: str,
+    timeout: float = 5.0,
+    pool: dict | bool = None,
+    replicas: list = None,
+    routing: dict = None,
+    **kwargs,
+):
     """
     PyDO工厂方法
 
     Args:
         dsn (str): data source name
             see: https://docs.sqlalchemy.org/en/20/core/engines.html
+        timeout (float): 连接超时
+        pool (dict | bool, optional): 连接池模式
+            - True: 默认参数
+            - dict: PooledPyDO 参数, 如 dict(min_size=1, max_size=10, max_overflow=0,
+                wait_timeout=30.0, idle_timeout=300.0, pre_ping=True)
+        replicas (list, optional): 只读从库 dsn 或 (dsn, weight), 返回读写分离的 RoutingPyDO
+        routing (dict, optional): RoutingPyDO 参数, 如 dict(balance="least_outstanding",
+            sticky_seconds=1.0, eject_seconds=30.0)
+        kwargs: 透传给驱动的 connect 方法
 
     Returns:
         PyDO: PyDO对象
     """
+    if replicas:
+        from .routing import RoutingPyDO  #
+
+        return RoutingPyDO(
+            dsn, replicas, timeout=timeout, pool=pool, **(routing or {}), **kwargs
+        )
+
+    if pool:
+        from .pool import PooledPyDO  #
+
+        options = pool if isinstance(pool, dict) else {}
+        return PooledPyDO(dsn, timeout=timeout, **options, **kwargs)
+
+    pydo_class = driver_class(dsn)
+    if pydo_class.__name__ == "PostgresPyDO":
+        return pydo_class(dsn, **kwargs)
+
+    return pydo_class(dsn, timeout=timeout, **kwargs)
+
+
+# END Database
+
+
+def driver_class(dsn: str):
+    """
+    根据dsn返回对应的PyDO类
+
+    Args:
+        dsn (str): data source name
+
+    Returns:
+        type: SqlitePyDO/MySQLPyDO/PostgresPyDO
+    """
     driver = dsn.split(':')[0]
-    pydo = None
 
     if driver == 'sqlite':
         from .sqlite import SqlitePyDO  #
 
-        pydo = SqlitePyDO(dsn, timeout=timeout)
+        return SqlitePyDO
 
     elif driver.startswith('mysql'):
         from .mysql import MySQLPyDO  #
 
-        pydo = MySQLPyDO(dsn, timeout=timeout)
+        return MySQLPyDO
 
     elif driver.startswith('postgres'):
         from .postgres import PostgresPyDO  #
 
-        pydo = PostgresPyDO(dsn)
+        return PostgresPyDO
 
     else:
         raise ValueError(f"PyDO not support dialect+driver:{driver}")
 
-    return pydo
 
-
-# END Database
+# END driver_class
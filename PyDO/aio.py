@@ -0,0 +1,205 @@
+"""
+asyncio 前端
+    - 与PyDO相同的 exec/fetch_*/table_* 方法, 均为 awaitable
+    - 底层为连接池(PooledPyDO) + 有界线程池, 每次调用在线程池中借出/归还连接
+    - 借出前先在事件循环上等待连接名额, 线程池中不会有线程阻塞在借出上
+    - DSN 与 Database() 工厂一致
+
+    Usage:
+        db = AsyncPyDO(dsn, pool=dict(max_size=10))
+        row = await db.table_select("users", {"id": 1})
+
+        async with db.transaction() as conn:
+            await conn.table_inserts("users", rows)
+            await conn.exec("UPDATE stats SET n = n + 1")
+
+        async for row in db.iter_query("SELECT * FROM events", batch_size=5000):
+            ...
+"""
+
+import asyncio, functools, inspect, itertools  #
+from concurrent.futures import ThreadPoolExecutor  #
+from contextlib import asynccontextmanager  #
+
+from . import Database  #
+
+
+class AsyncConnection:
+    """
+    借出的单个连接, 同一连接上的调用按 await 顺序执行
+        - 由 AsyncPyDO.connection()/transaction() 得到
+    """
+
+    def __init__(self, pydo, executor) -> None:
+        self.pydo = pydo
+        self._executor = executor
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(fn, *args, **kwargs)
+        )
+
+    def __getattr__(self, name):
+        attr = getattr(self.pydo, name)
+        if not callable(attr):
+            return attr
+
+        if inspect.isgeneratorfunction(getattr(type(self.pydo), name, None)):
+
+            def stream(*args, **kwargs):
+                batch_size = kwargs.get("batch_size", 1000)
+                return self._aiter(attr(*args, **kwargs), batch_size)
+
+            stream.__name__ = name
+            return stream
+
+        async def method(*args, **kwargs):
+            return await self._run(attr, *args, **kwargs)
+
+        method.__name__ = name
+        return method
+
+    async def _aiter(self, generator, batch_size: int):
+        # 在线程池中按批推进同步生成器
+        try:
+            while True:
+                rows = await self._run(list, itertools.islice(generator, batch_size))
+                if not rows:
+                    break
+                for row in rows:
+                    yield row
+        finally:
+            await self._run(generator.close)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """事务: 正常退出提交, 异常回滚"""
+        await self._run(self.pydo.beginTransaction)
+        try:
+            yield self
+        except BaseException:
+            await self._run(self.pydo.rollBack)
+            raise
+        await self._run(self.pydo.commit)
+
+
+# END class AsyncConnection
+
+
+class AsyncPyDO:
+    """
+    asyncio 版PyDO
+
+    Args:
+        dsn (str): 与 Database() 相同
+        timeout (float): 连接超时
+        pool (dict, optional): PooledPyDO 参数
+        max_workers (int, optional): 线程池大小, 默认 max_size + max_overflow; 同时借出的连接数不超过此值
+        kwargs: 透传给驱动的 connect 方法
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        timeout: float = 5.0,
+        pool: dict = None,
+        max_workers: int = None,
+        **kwargs,
+    ) -> None:
+        options = dict(pool) if isinstance(pool, dict) else {}
+        options.setdefault("max_size", 10)
+        capacity = options["max_size"] + options.get("max_overflow", 0)
+        if max_workers is None:
+            max_workers = capacity
+
+        self.dsn = dsn
+        self.pydo = Database(dsn, timeout=timeout, pool=options, **kwargs)
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="pydo")
+        # 连接名额: 每个持有连接的调用方同一时刻只占一个线程, 持有者总能拿到线程执行
+        self._slots = asyncio.Semaphore(min(capacity, max_workers))
+
+    # END init
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(fn, *args, **kwargs)
+        )
+
+    def __getattr__(self, name):
+        attr = getattr(self.pydo._class, name)
+        if not callable(attr):
+            return attr
+
+        if inspect.isgeneratorfunction(attr):
+
+            async def stream(*args, **kwargs):
+                async with self.connection() as conn:
+                    async for row in getattr(conn, name)(*args, **kwargs):
+                        yield row
+
+            stream.__name__ = name
+            return stream
+
+        async def method(*args, **kwargs):
+            async with self._slots:
+                return await self._run(getattr(self.pydo, name), *args, **kwargs)
+
+        method.__name__ = name
+        return method
+
+    ##连接池 Start
+    @asynccontextmanager
+    async def connection(self):
+        """
+        借出一个连接, 在上下文内独占
+
+        Yields:
+            AsyncConnection
+        """
+        async with self._slots:
+            pydo = await self._run(self.pydo.pool.acquire)
+            try:
+                yield AsyncConnection(pydo, self._executor)
+            finally:
+                await self._run(self.pydo.pool.release, pydo)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        借出连接并开启事务, 正常退出提交, 异常回滚
+
+        Yields:
+            AsyncConnection
+        """
+        async with self.connection() as conn:
+            async with conn.transaction():
+                yield conn
+
+    def pool_status(self) -> dict:
+        return self.pydo.pool.status()
+
+    async def close(self):
+        await self._run(self.pydo.close)
+        self._executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    ##连接池 End
+
+    ##事务包装 Start
+    # 线程池中的调用不固定线程, 事务需绑定连接, 使用 transaction()
+    async def beginTransaction(self):
+        raise RuntimeError("use 'async with db.transaction() as conn'")
+
+    commit = rollBack = beginTransaction
+
+    ##事务包装 End
+
+
+# END class AsyncPyDO
@@ -26,6 +26,15 @@
 """
 
 from .cost import PYDO_ATTRIBUTE  #
+from .bulk import copy_stream, iter_row_tuples  #
+from .statement import freeze, rewrite_placeholder, statement_cache  #
+from .cache import is_write_sql, sql_tables  #
+from .metrics import EVENTS, QueryEvent  #
+from .columnar import ColumnBuilder  #
+from .schema import Column, column_adapter, schema_cache  #
+
+import itertools, operator, random, time  #
+from contextlib import contextmanager  #
 
 
 class BasePyDO:
@@ -42,6 +51,28 @@ class BasePyDO:
 
     # sql占位符
     _placeholder = "%s"
+    # 单条语句最多绑定参数个数, 批量插入按此切分
+    _max_parameters = 999
+    # 查询结果缓存, 见 cache.ResultCache
+    _result_cache = None
+    # 未提交的写语句涉及的表, 提交/回滚时再次失效查询结果缓存; "*" 为全部
+    _dirty_tables = None
+    # 埋点回调 {event: [callback]}, 见 metrics
+    _listeners = None
+    # 临时表名序号
+    _temp_counter = itertools.count()
+    # 随机排序函数, 分区抽样使用
+    _random_function = "RANDOM()"
+    # upsert 需写出冲突字段(ON CONFLICT), 未指定时取主键
+    _conflict_required = False
+    # transaction() 嵌套层数, 内层使用 SAVEPOINT
+    _savepoint_depth = 0
+    # batch() 中为 [commit_every, 未提交的写语句数]
+    _batch = None
+    # setAttribute("AUTO_COMMIT") 设置的模式, 重连后恢复
+    _autocommit_mode = None
+    # 最近一次执行语句的时间, 空闲超过 PING_INTERVAL 时先做健康检查
+    _last_used = None
 
     attrs = dict()
 
@@ -69,11 +100,10 @@ class BasePyDO:
         sql = self.sql_placeholder(sql)
         parameters = self.parameters_mutate(parameters)
 
-        cur = self.cursor()
-        if parameters is None:
-            return cur.execute(sql).rowcount
-        else:
-            return cur.execute(sql, parameters).rowcount
+        rowcount = self._execute(self.cursor(), sql, parameters).rowcount
+        # ALTER/DROP/CREATE TABLE 后表结构缓存失效
+        schema_cache.invalidate_sql(self.dsn, sql)
+        return rowcount
 
     def query(self, sql: str, parameters=None):
         """
@@ -93,16 +123,317 @@ class BasePyDO:
         sql = self.sql_placeholder(sql)
         parameters = self.parameters_mutate(parameters)
 
-        cur = self.cursor()
-        return cur.execute(sql, parameters)
+        return self._execute(self.cursor(), sql, parameters)
 
     def fetch_all(self, sql: str, parameters=None):
-        rowcount = self.query(sql, parameters)
-        return self.cursor().fetchall()
+        if self._result_cache is None or self.inTransaction() or self._dirty_tables:
+            return self._fetch(sql, parameters, "fetchall")
+
+        return self._result_cache.fetch(
+            self._cache_namespace("all"),
+            sql,
+            parameters,
+            lambda: self._fetch(sql, parameters, "fetchall"),
+        )
 
     def fetch_one(self, sql: str, parameters=None):
-        rowcount = self.query(sql, parameters)
-        return self.cursor().fetchone()
+        if self._result_cache is None or self.inTransaction() or self._dirty_tables:
+            return self._fetch(sql, parameters, "fetchone")
+
+        return self._result_cache.fetch(
+            self._cache_namespace("one"),
+            sql,
+            parameters,
+            lambda: self._fetch(sql, parameters, "fetchone"),
+        )
+
+    def _fetch(self, sql: str, parameters, method: str):
+        if method == "fetchall" and self.attrs["FETCH_MODE"]["DEFAULT"] == "columns":
+            return self.fetch_columns(sql, parameters)
+
+        cur = self.query(sql, parameters)
+        if self._listeners is None:
+            return getattr(cur, method)()
+
+        start = time.perf_counter()
+        result = getattr(cur, method)()
+        event = QueryEvent(sql, parameters, id(self._connect))
+        event.duration = time.perf_counter() - start
+        event.rowcount = (
+            (0 if result is None else 1) if method == "fetchone" else len(result)
+        )
+        self._emit("after_fetch", event)
+        return result
+
+    def fetch_columns(
+        self, sql: str, parameters=None, batch_size: int = 10000, use_numpy: bool = None
+    ) -> dict:
+        """
+        列式查询, 返回每列一个数组, 适合分析类的大结果集
+            - FETCH_MODE 为 columns 时 fetch_all 即返回此结果
+
+        Args:
+            sql (str): SQL
+            parameters (optional): 参数
+            batch_size (int): 每批 fetchmany 的行数
+            use_numpy (bool, optional): 默认安装了numpy即返回 ndarray, 否则 array.array/list
+
+        Returns:
+            dict: 列名 => 数组
+        """
+        sql = self.sql_placeholder(sql)
+        parameters = self.parameters_mutate(parameters)
+
+        cur = self._tuple_cursor()
+        try:
+            self._execute(cur, sql, parameters)
+            builder = ColumnBuilder(
+                cur.description,
+                [self._column_typecode(column) for column in cur.description],
+            )
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                builder.extend(rows)
+        finally:
+            cur.close()
+
+        return builder.result(use_numpy)
+
+    # END fetch_columns
+
+    def _tuple_cursor(self):
+        # 返回tuple行的独立游标, 待子类重写
+        return self.connect().cursor()
+
+    def _column_typecode(self, column) -> str:
+        """
+        由 cursor.description 的一列得到 array typecode
+
+        Returns:
+            str: q(整数)/d(浮点)/b(布尔), None为按数据推断
+        """
+        return None
+
+    def _execute(self, cur, sql: str, parameters=None, executor=None):
+        """
+        所有语句执行的统一入口
+
+        Args:
+            cur: 游标
+            sql (str): 已替换占位符的SQL
+            parameters (optional): 参数
+            executor (callable, optional): 替代 cur.execute, 如 cur.executemany/copy_expert
+
+        Returns:
+            cursor: 传入的游标
+        """
+        if self.attrs["PING_INTERVAL"]["DEFAULT"] is not None:
+            # 空闲检查在 connect() 中, 游标创建之前
+            self._last_used = time.monotonic()
+
+        try:
+            self._execute_once(cur, sql, parameters, executor)
+        except Exception as e:
+            cur = self._retry(e, cur, sql, parameters, executor)
+
+        if self._result_cache is not None and is_write_sql(sql):
+            self._result_cache.invalidate_sql(sql)
+            if self._pending_transaction():
+                # 提交前其它连接仍可能读到并缓存旧数据, 提交/回滚时再失效一次
+                self._mark_dirty(sql)
+
+        return cur
+
+    # END _execute
+
+    def _execute_once(self, cur, sql: str, parameters=None, executor=None):
+        if executor is None:
+            executor = cur.execute if parameters is not None else None
+
+        if self._listeners is None:
+            if executor is None:
+                cur.execute(sql)
+            else:
+                executor(sql, parameters)
+        else:
+            self._execute_events(cur, sql, parameters, executor)
+
+    def _retry(self, error: Exception, cur, sql: str, parameters, executor):
+        """
+        语句失败后的重连与重试
+            - 仅重试事务外、共享游标上的只读语句, 遇连接断开或死锁/序列化失败时重试
+            - 其它语句不重试, 连接断开时先重连再抛出, 之后的调用可继续使用
+
+        Returns:
+            cursor: 重试成功的游标
+        """
+        attempts = self._retry_attempts()
+        attempt = 0
+        while True:
+            disconnect = self._is_disconnect(error)
+            retryable = (
+                (disconnect or self._is_retryable(error))
+                and attempt < attempts
+                and executor is None
+                and cur is self._cursor
+                and not self.inTransaction()
+                and self._batch is None
+                and not is_write_sql(sql)
+            )
+            if not retryable:
+                if disconnect and not self.inTransaction():
+                    self._reconnect_quietly()
+                raise error
+
+            attempt += 1
+            self._emit_retry(sql, parameters, error)
+            time.sleep(self._backoff(attempt))
+            if disconnect:
+                self._reconnect_quietly()
+            else:
+                # 结束出错的隐式事务(PostgreSQL 需回滚后才能继续执行)
+                self._rollback_quietly()
+
+            cur = self.cursor()
+            try:
+                self._execute_once(cur, sql, parameters)
+                return cur
+            except Exception as e:
+                error = e
+
+    # END _retry
+
+    def retry_transaction(self, fn, attempts: int = None):
+        """
+        在事务中执行 fn(pydo), 遇死锁/序列化失败/连接断开时回滚后整体重试
+            - fn 需可重复执行(除数据库操作外无副作用)
+            - 已在事务中调用时不重试, 作为 SAVEPOINT 执行一次
+
+        Args:
+            fn (callable): fn(pydo)
+            attempts (int, optional): 最多重试次数, 默认 RETRY ATTEMPTS
+
+        Returns:
+            fn 的返回值
+        """
+        if self.inTransaction():
+            with self.transaction():
+                return fn(self)
+
+        attempts = self._retry_attempts() if attempts is None else attempts
+        attempt = 0
+        while True:
+            try:
+                with self.transaction():
+                    return fn(self)
+            except Exception as e:
+                disconnect = self._is_disconnect(e)
+                if attempt >= attempts or not (disconnect or self._is_retryable(e)):
+                    if disconnect:
+                        self._reconnect_quietly()
+                    raise
+
+                attempt += 1
+                self._emit_retry(None, None, e)
+                time.sleep(self._backoff(attempt))
+                if disconnect:
+                    self._reconnect_quietly()
+
+    # END retry_transaction
+
+    def _retry_attempts(self) -> int:
+        # setAttribute("RETRY", False) 关闭重试
+        retry = self.attrs["RETRY"]
+        return int(retry["ATTEMPTS"]) if retry["DEFAULT"] else 0
+
+    def _backoff(self, attempt: int) -> float:
+        # 指数退避 + full jitter
+        retry = self.attrs["RETRY"]
+        return random.uniform(
+            0, min(retry["BACKOFF_MAX"], retry["BACKOFF"] * 2 ** (attempt - 1))
+        )
+
+    def _is_disconnect(self, error: Exception) -> bool:
+        # 连接已断开, 待子类重写
+        return False
+
+    def _is_retryable(self, error: Exception) -> bool:
+        # 死锁/序列化失败等可重试的错误, 待子类重写
+        return False
+
+    def _emit_retry(self, sql: str, parameters, error: Exception) -> None:
+        if self._listeners is not None:
+            event = QueryEvent(sql, parameters, id(self._connect))
+            event.error = error
+            self._emit("retry", event)
+
+    def _execute_events(self, cur, sql: str, parameters, executor):
+        # 带埋点的执行
+        event = QueryEvent(sql, parameters, id(self._connect))
+        self._emit("before_execute", event)
+
+        start = time.perf_counter()
+        try:
+            if executor is None:
+                cur.execute(sql)
+            else:
+                executor(sql, parameters)
+        except BaseException as e:
+            event.duration = time.perf_counter() - start
+            event.error = e
+            self._emit("error", event)
+            raise
+
+        event.duration = time.perf_counter() - start
+        event.rowcount = cur.rowcount
+        self._emit("after_execute", event)
+
+    def _emit(self, name: str, event) -> None:
+        for callback in self._listeners.get(name, ()):
+            callback(event)
+
+    def iter_query(self, sql: str, parameters=None, batch_size: int = 1000):
+        """
+        流式查询, 按 batch_size 分批从服务端/游标取数据, 不会一次加载全部结果
+            - 默认: 独立游标 + fetchmany
+            - PostgreSQL: 命名(服务端)游标
+            - MySQL: SSCursor/SSDictCursor, 迭代结束前同一连接不能执行其它查询
+
+        Args:
+            sql (str): SQL
+            parameters (optional): 参数
+            batch_size (int): 每批读取的行数
+
+        Yields:
+            row: 与 FETCH_MODE 一致的行
+        """
+        sql = self.sql_placeholder(sql)
+        parameters = self.parameters_mutate(parameters)
+
+        cur = self._stream_cursor(batch_size)
+        try:
+            self._execute(cur, sql, parameters)
+
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cur.close()
+            self._stream_close()
+
+    # END iter_query
+
+    def _stream_cursor(self, batch_size: int):
+        # 流式查询使用独立游标, 不影响 cursor() 的共享游标
+        return self.connect().cursor()
+
+    def _stream_close(self):
+        # 流式查询结束后的清理, 待子类重写
+        pass
 
     def lastInsertId(self):
         cur = self.cursor()
@@ -117,7 +448,16 @@ class BasePyDO:
             rowcount
         """
         if rowcount > 0 and not self.inTransaction():
-            self.connect().commit()
+            if self._batch is None:
+                self.connect().commit()
+                self._flush_dirty()
+            else:
+                # batch() 中每 commit_every 条写语句提交一次
+                self._batch[1] += 1
+                if self._batch[1] >= self._batch[0]:
+                    self.connect().commit()
+                    self._end_batch()
+                    self._flush_dirty()
 
         return rowcount
 
@@ -141,6 +481,9 @@ class BasePyDO:
     ) -> int:
         """
         table快捷插入
+            - 多行数据合并为 INSERT ... VALUES (...),(...) 分批执行
+            - 每批行数取 INSERT_BATCH 与驱动参数上限(_max_parameters)的较小值
+            - 多批时在同一事务中执行
             - 返回修改的行数
 
         Args:
@@ -155,77 +498,343 @@ class BasePyDO:
         Returns:
             int: 返回修改的行数
         """
-        # 预设插入数据行数
-        len_rows = 0
-
-        if isinstance(rows, dict):
-            fields = list(rows.keys())
-            len_rows = 1
-        elif isinstance(rows, list):
-            fields = list(rows[0].keys())
-            len_rows = len(fields)
-        else:
-            raise ValueError(f"param:rows only suport dict and list")
-
-        places = list(map(lambda x: self._placeholder, fields))
-        action = "INSERT" if use_replace is False else "REPLACE"
-        if use_ignore:
-            action += " IGNORE"
-        sql = (
-            f"{action} INTO {table} ({', '.join(fields)}) values ({', '.join(places)})"
+        fields, encoder = self._insert_fields(table, rows)
+        head, tail = statement_cache.get(
+            ("insert", type(self), table, tuple(fields), use_replace, use_ignore),
+            lambda: self._insert_sql(table, fields, use_replace, use_ignore),
         )
+        return self._insert_values(head, fields, rows, tail, encoder=encoder)
 
-        cur = self.cursor()
-        rows = self.parameters_mutate(rows)
-        if len_rows > 1:
-            cur.executemany(sql, rows)
-        else:
-            cur.execute(sql, rows)
-
-        # autocommit
-        return self._lazycommit(cur.rowcount)
-
-    def table_inserts_on_duplicate_update(self, table: str, rows: dict | list) -> int:
-        """插入时主键冲突即更新
+    def table_inserts_on_duplicate_update(
+        self,
+        table: str,
+        rows: dict | list,
+        conflict: str | list = None,
+        update: list = None,
+    ) -> int:
+        """插入时主键冲突即更新, 多行数据同 table_inserts 分批合并为 VALUES (...),(...)
          - Mariadb: ON DUPLICATE KEY UPDATE value = VALUES(value);
-         - PostgreSQL: ON CONFLICT (id) DO UPDATE SET value = excluded.value;
+         - PostgreSQL/SQLite: ON CONFLICT (id) DO UPDATE SET value = excluded.value;
 
         Args:
-            table (str): _description_
-            rows (dict | list): _description_
+            table (str): 表名
+            rows (dict | list): 插入的数据
+            conflict (str | list, optional): 冲突判断的字段(唯一索引), 默认主键; MySQL忽略此参数
+            update (list, optional): 冲突时更新的字段, 默认除conflict外的全部字段
 
         Returns:
             int: 更新行数
         """
-        # 预设插入数据行数
-        len_rows = 0
         if len(rows) == 0:
             raise ValueError("empty rows")
 
-        if isinstance(rows, dict):
-            fields = list(rows.keys())
-            len_rows = 1
-        elif isinstance(rows, list):
-            fields = list(rows[0].keys())
-            len_rows = len(fields)
-        else:
-            raise ValueError(f"param:rows only suport dict and list")
+        if isinstance(conflict, str):
+            conflict = [conflict]
+        elif conflict is None and self._conflict_required:
+            # 主键随表结构缓存失效, 不固化在缓存的语句里
+            conflict = self._primary_key(table)
+        fields, encoder = self._insert_fields(table, rows)
+        self._check_fields(table, (conflict or []) + (update or []))
+        head, tail = statement_cache.get(
+            (
+                "upsert",
+                type(self),
+                table,
+                tuple(fields),
+                freeze(conflict),
+                freeze(update),
+            ),
+            lambda: self._upsert_sql(table, fields, conflict, update),
+        )
+        return self._insert_values(head, fields, rows, tail, encoder=encoder)
 
-        places = list(map(lambda x: self._placeholder, fields))
-        sql = f"INSERT INTO {table} ({', '.join(fields)}) values ({', '.join(places)})"
-        sql += f" ON DUPLICATE KEY UPDATE " + ', '.join(
-            map(lambda x: f"{x} = VALUES({x})", fields)
+    def table_upsert(
+        self,
+        table: str,
+        rows: dict | list,
+        conflict: str | list = None,
+        update: list = None,
+    ) -> int:
+        return self.table_inserts_on_duplicate_update(table, rows, conflict, update)
+
+    def _upsert_sql(
+        self, table: str, fields: list, conflict: list = None, update: list = None
+    ) -> (str, str):
+        head, _ = self._insert_sql(table, fields)
+        update = self._upsert_fields(fields, conflict, update)
+        if len(update) == 0:
+            # 无更新字段, 冲突时保留原行
+            return head, f" ON DUPLICATE KEY UPDATE {fields[0]} = {fields[0]}"
+
+        tail = f" ON DUPLICATE KEY UPDATE " + ", ".join(
+            map(lambda x: f"{x} = VALUES({x})", update)
+        )
+        return head, tail
+
+    def _on_conflict_sql(
+        self, table: str, fields: list, conflict: list = None, update: list = None
+    ) -> (str, str):
+        # PostgreSQL/SQLite 的 ON CONFLICT 语法, 未指定conflict时使用主键
+        head, _ = self._insert_sql(table, fields)
+        if conflict is None:
+            conflict = self._primary_key(table)
+
+        update = self._upsert_fields(fields, conflict, update)
+        tail = f" ON CONFLICT ({', '.join(conflict)}) DO "
+        if len(update) == 0:
+            return head, tail + "NOTHING"
+
+        return head, tail + "UPDATE SET " + ", ".join(
+            map(lambda x: f"{x} = excluded.{x}", update)
         )
 
+    @staticmethod
+    def _upsert_fields(
+        fields: list, conflict: list = None, update: list = None
+    ) -> list:
+        if update is not None:
+            return list(update)
+        return [field for field in fields if field not in (conflict or [])]
+
+    def _primary_key(self, table: str) -> list:
+        """
+        表的主键字段, 经表结构缓存读取(见 table_schema), 随 TTL 与 DDL 失效
+
+        Raises:
+            ValueError: 表不存在或无主键
+        """
+        schema = self.table_schema(table)
+        if schema is None or len(schema.primary_key) == 0:
+            raise ValueError(f"primary key of {table} unknown, pass conflict columns")
+        return schema.primary_key
+
+    def _columns_sql(self, table: str) -> (str, list):
+        """
+        读取表字段的SQL, 待子类重写
+            - 每行为 (字段名, 类型, 可空, 主键), 按字段位置排序
+
+        Returns:
+            (str, list): SQL, 参数
+        """
+        raise NotImplementedError(f"{type(self).__name__} not support schema cache")
+
+    def _load_columns(self, table: str) -> list:
+        """
+        Returns:
+            list: [schema.Column], 表不存在时为空
+        """
+        sql, parameters = self._columns_sql(table)
+        cur = self._tuple_cursor()
+        pending = self._pending_transaction()
+        try:
+            self._execute(cur, sql, parameters)
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+
+        # 结束 SELECT 隐式开启的事务, 不丢弃未提交的写入
+        self._end_read(pending)
+        return [
+            Column(name, (type_ or "").lower(), bool(nullable), bool(primary_key))
+            for name, type_, nullable, primary_key in rows
+        ]
+
+    def _insert_sql(
+        self,
+        table: str,
+        fields: list,
+        use_replace: bool = False,
+        use_ignore: bool = False,
+    ) -> (str, str):
+        """
+        INSERT语句的头尾, 不同数据库的 REPLACE/IGNORE 语法由子类重写
+
+        Returns:
+            (str, str): "INSERT INTO table (fields)", VALUES之后的语句
+        """
+        action = "INSERT" if use_replace is False else "REPLACE"
+        if use_ignore:
+            action += " IGNORE"
+
+        return f"{action} INTO {table} ({', '.join(fields)})", ""
+
+    def _insert_values(
+        self,
+        head: str,
+        fields: list,
+        rows,
+        tail: str = "",
+        returning: bool = False,
+        encoder=None,
+    ):
+        """
+        多行VALUES分批插入引擎
+
+        Args:
+            head (str): INSERT INTO table (fields)
+            fields (list): 字段
+            rows (dict | list): 插入的数据
+            tail (str): VALUES之后的语句, 如 ON DUPLICATE KEY UPDATE/RETURNING
+            returning (bool): 是否收集每批 fetchall 的结果
+            encoder (callable, optional): dict行 => 参数序列, 见 _insert_fields
+
+        Returns:
+            int: 修改的行数
+            list: returning=True 时返回结果集
+        """
+        rows = [rows] if isinstance(rows, dict) else rows
+        # 按 fields 取值的惰性迭代器, 每行的字段须与 fields 一致
+        _, parameters = iter_row_tuples(rows, fields, strict=True, encoder=encoder)
+
+        return self._insert_chunks(head, len(fields), parameters, tail, returning)
+
+    # END _insert_values
+
+    def _insert_chunks(
+        self, head: str, width: int, parameters, tail: str = "", returning: bool = False
+    ):
+        # 按批拼接 VALUES 执行, 参数为tuple的可迭代对象, 流式消费
+        chunks = self._chunk_rows(parameters, self._insert_batch_rows(width))
+        first = next(chunks, None)
+        if first is None:
+            return [] if returning else 0
+
+        second = next(chunks, None)
+
+        def values_sql(length: int) -> str:
+            places = f"({', '.join([self._placeholder] * width)})"
+            return f"{head} VALUES {', '.join([places] * length)}{tail}"
+
+        def execute(cur, chunk):
+            # 同批次行数相同的SQL只拼接一次
+            sql = statement_cache.get(
+                ("values", self._placeholder, head, tail, width, len(chunk)),
+                lambda: values_sql(len(chunk)),
+            )
+            self._execute(cur, sql, list(itertools.chain.from_iterable(chunk)))
+            return cur.rowcount
+
         cur = self.cursor()
-        rows = self.parameters_mutate(rows)
-        if len_rows > 1:
-            cur.executemany(sql, rows)
+        if second is None:
+            # 单批次, 沿用懒人版自动提交
+            rowcount = execute(cur, first)
+            result = cur.fetchall() if returning else rowcount
+            self._lazycommit(rowcount)
+            return result
+
+        # 多批次在同一事务中执行
+        def execute_all():
+            rowcount, result = 0, []
+            for chunk in itertools.chain([first, second], chunks):
+                rowcount += execute(cur, chunk)
+                if returning:
+                    result += cur.fetchall()
+            return result if returning else rowcount
+
+        return self._atomic(execute_all)
+
+    # END _insert_chunks
+
+    def table_bulk_load(self, table: str, rows, columns: list = None) -> int:
+        """
+        大批量导入, 流式消费rows, 不会构造完整的参数list
+            - 默认: 同一事务内多行VALUES分批插入
+            - PostgreSQL: COPY ... FROM STDIN
+            - MySQL: LOAD DATA LOCAL INFILE (需 local_infile=True)
+            - SQLite: 同一事务 + executemany, 导入期间 synchronous=OFF
+
+        Args:
+            table (str): 表名
+            rows (iterable | dict): dict 或 list/tuple 行的可迭代对象(可为生成器), 或列式 {字段: 数组}
+            columns (list, optional): 字段顺序, dict行默认取第一行的key
+
+        Returns:
+            int: 导入行数
+        """
+        columns, parameters = self._bulk_rows(table, rows, columns)
+        first = next(parameters, None)
+        if first is None:
+            return 0
+
+        head = f"INSERT INTO {table}"
+        if columns is not None:
+            head += f" ({', '.join(columns)})"
+
+        parameters = itertools.chain([first], parameters)
+        return self._atomic(lambda: self._insert_chunks(head, len(first), parameters))
+
+    # END table_bulk_load
+
+    def _bulk_rows(self, table: str, rows, columns: list = None) -> (list, any):
+        # iter_row_tuples, SCHEMA_CACHE 开启时校验字段并按字段类型转换
+        columns, parameters = iter_row_tuples(rows, columns)
+        schema = None if columns is None else self._schema(table)
+        if schema is None:
+            return columns, parameters
+
+        schema.validate(columns)
+        return columns, schema.adapt_rows(self, columns, parameters)
+
+    def _atomic(self, fn):
+        """
+        在一个事务中执行fn, 已在事务中则直接执行
+
+        Returns:
+            fn的返回值
+        """
+        if self.inTransaction():
+            return fn()
+
+        self.beginTransaction()
+        try:
+            result = fn()
+        except BaseException:
+            self.rollBack()
+            raise
+
+        self._commit_or_rollback()
+        return result
+
+    def _insert_batch_rows(self, field_count: int) -> int:
+        # 每批插入行数: INSERT_BATCH 与驱动绑定参数上限
+        batch = int(self.attrs["INSERT_BATCH"]["DEFAULT"])
+        return max(1, min(batch, self._max_parameters // max(1, field_count)))
+
+    def _insert_fields(self, table: str, rows: dict | list) -> (list, any):
+        """
+        插入的字段与行编码函数
+            - SCHEMA_CACHE 开启时校验字段, 按表的字段顺序排列, 按字段名取值(itemgetter)并转换类型
+
+        Returns:
+            (list, callable): 字段, encoder(未开启时为None, 按 parameters_mutate 取值)
+        """
+        fields = self._rows_fields(rows)
+        schema = self._schema(table)
+        if schema is None:
+            return fields, None
+
+        fields = schema.order(fields)
+        return fields, schema.encoder(self, fields)
+
+    @staticmethod
+    def _rows_fields(rows: dict | list) -> list:
+        # 插入数据的字段, 以第一行为准
+        if isinstance(rows, dict):
+            return list(rows.keys())
+        elif isinstance(rows, list) and len(rows) > 0:
+            return list(rows[0].keys())
         else:
-            cur.execute(sql, rows)
+            raise ValueError(f"param:rows only suport dict and list")
 
-        # autocommit
-        return self._lazycommit(cur.rowcount)
+    @staticmethod
+    def _chunk_rows(rows, size: int):
+        # 按行数切分
+        rows = iter(rows)
+        while True:
+            chunk = list(itertools.islice(rows, size))
+            if not chunk:
+                return
+            yield chunk
 
     # 返回插入行主键
     def table_insert(self, table: str, row) -> int:
@@ -252,11 +861,283 @@ class BasePyDO:
             else self.fetch_all(sql, parameters)
         )
 
+    def table_get_many(
+        self,
+        table: str,
+        key: str,
+        values,
+        params: dict = {},
+        chunk_size: int = None,
+        multiple: bool = False,
+    ) -> dict:
+        """
+        按key批量查询, 替代循环调用 table_select
+            - key去重后按 IN (...) 分批绑定参数查询, 每批不超过 IN_BATCH 与驱动参数上限
+            - key数达到 TEMP_TABLE_KEYS 时, 导入临时表后JOIN查询
+            - 连接池模式(PooledPyDO)下多批并发查询
+
+        Args:
+            table (str): 表名
+            key (str): 查询的字段, 通常为主键
+            values (iterable): key的值
+            params (dict, optional): 附加的 key = value 条件
+            chunk_size (int, optional): 每批key数, 默认 IN_BATCH
+            multiple (bool): key不唯一时为True, 每个key对应行的list
+
+        Returns:
+            dict: key值 => 行(multiple=True时为行的list), 未查到的key不在结果中
+        """
+        keys = list(dict.fromkeys(values))
+        result = dict()
+        if not keys:
+            return result
+
+        if len(keys) >= int(self.attrs["TEMP_TABLE_KEYS"]["DEFAULT"]):
+            cur = self._atomic(lambda: self._get_many_temp(table, key, keys, params))
+            self._collect_rows(result, cur, key, multiple)
+            return result
+
+        for chunk in self._chunk_rows(keys, self._get_many_batch(params, chunk_size)):
+            sql, parameters = self._table_select_sql(table, {**params, key: chunk})
+            self._collect_rows(result, self.query(sql, parameters), key, multiple)
+
+        return result
+
+    # END table_get_many
+
+    def _get_many_batch(self, params: dict, chunk_size: int = None) -> int:
+        # 每批key数: IN_BATCH 与驱动绑定参数上限
+        batch = int(chunk_size or self.attrs["IN_BATCH"]["DEFAULT"])
+        return max(1, min(batch, self._max_parameters - len(params)))
+
+    def _get_many_temp(self, table: str, key: str, keys: list, params: dict):
+        # key导入临时表(字段类型同key), JOIN后删除, 需在事务中调用
+        tmp = f"pydo_keys_{next(self._temp_counter)}"
+        self.exec(
+            f"CREATE TEMPORARY TABLE {tmp} AS SELECT {key} AS k FROM {table} WHERE 1 = 0"
+        )
+        try:
+            self.table_bulk_load(tmp, ((k,) for k in keys), columns=["k"])
+            sql = f"SELECT t.* FROM {table} t JOIN {tmp} k ON t.{key} = k.k"
+            if params:
+                sql += " WHERE " + " AND ".join(f"t.{k} = %s" for k in params)
+            cur = self.query(sql, list(params.values()))
+            # 删除临时表前取出结果
+            rows = cur.fetchall()
+            return cur.description, rows
+        finally:
+            self.exec(f"DROP TABLE {tmp}")
+
+    @staticmethod
+    def _collect_rows(result: dict, cur, key: str, multiple: bool) -> None:
+        """
+        查询结果按key归入result
+
+        Args:
+            cur: 已执行的游标, 或 (description, rows)
+        """
+        if isinstance(cur, tuple):
+            description, rows = cur
+        else:
+            description, rows = cur.description, cur.fetchall()
+
+        getter = BasePyDO._row_getter(description, [key])
+        for row in rows:
+            (value,) = getter(row)
+            if multiple:
+                result.setdefault(value, []).append(row)
+            else:
+                result[value] = row
+
+    def table_paginate(
+        self,
+        table: str,
+        params: dict = {},
+        order_by: str | list | tuple = None,
+        page_size: int = 1000,
+        start: tuple = None,
+    ):
+        """
+        keyset(seek)分页遍历, 每页耗时不随页数增长, 替代 LIMIT ... OFFSET
+            - 记住上一页最后一行的排序字段值, 下一页以 WHERE (k1, k2) > (...) 定位
+            - 升降序混合时展开为 k1 > %s OR (k1 = %s AND k2 < %s)
+            - 排序字段需 NOT NULL, 且组合后唯一(如末尾带上主键), 并有对应索引
+
+        Args:
+            table (str): 表名
+            params (dict): key = value 条件, 同 table_select
+            order_by (str | list | tuple): 排序字段, 同 orderby_mutate: "id", ("id", "DESC"), [("ts", "DESC"), "id"]
+            page_size (int): 每页行数
+            start (tuple, optional): 从该排序值之后开始, 用于断点续读
+
+        Yields:
+            row: 与 FETCH_MODE 一致的行
+        """
+        order = self._order_keys(order_by)
+        if len(order) == 0:
+            raise ValueError("table_paginate need order_by")
+        self._check_fields(table, [k for k, _ in order])
+
+        shape = tuple(
+            (k, len(v)) if isinstance(v, list) else k for k, v in params.items()
+        )
+        _, where = self._table_select_sql(table, params)
+        last = None if start is None else tuple(start)
+        getter = None
+
+        while True:
+            sql = statement_cache.get(
+                (
+                    "paginate",
+                    self._placeholder,
+                    table,
+                    shape,
+                    tuple(order),
+                    page_size,
+                    last is None,
+                ),
+                lambda: self._paginate_sql(
+                    table, params, order, page_size, last is not None
+                ),
+            )
+            parameters = (
+                where if last is None else where + self._seek_parameters(order, last)
+            )
+            cur = self.query(sql, parameters)
+            rows = cur.fetchall()
+            if not rows:
+                return
+
+            if getter is None:
+                getter = self._row_getter(cur.description, [k for k, _ in order])
+            yield from rows
+            if len(rows) < page_size:
+                return
+            last = getter(rows[-1])
+
+    # END table_paginate
+
+    def _paginate_sql(
+        self, table: str, params: dict, order: list, page_size: int, seek: bool
+    ) -> str:
+        sql, _ = self._build_select_sql(table, params)
+        if seek:
+            sql += (" AND " if params else "WHERE ") + f"({self._seek_sql(order)})"
+        sql += " ORDER BY " + ", ".join(f"{k} {direction}" for k, direction in order)
+        return sql + f" LIMIT {int(page_size)}"
+
+    def _seek_sql(self, order: list) -> str:
+        # 排序字段位于上一页最后一行之后的条件
+        directions = set(direction for _, direction in order)
+        if len(directions) == 1:
+            op = "<" if "DESC" in directions else ">"
+            if len(order) == 1:
+                return f"{order[0][0]} {op} {self._placeholder}"
+            return (
+                f"({', '.join(k for k, _ in order)}) {op} "
+                f"({', '.join([self._placeholder] * len(order))})"
+            )
+
+        # 升降序混合, 行值比较不适用
+        condition = list()
+        for index, (k, direction) in enumerate(order):
+            equal = [f"{x} = {self._placeholder}" for x, _ in order[:index]]
+            op = "<" if direction == "DESC" else ">"
+            condition.append(" AND ".join(equal + [f"{k} {op} {self._placeholder}"]))
+        return " OR ".join(f"({x})" for x in condition)
+
+    @staticmethod
+    def _seek_parameters(order: list, last: tuple) -> list:
+        # 与 _seek_sql 的占位符顺序一致
+        if len(set(direction for _, direction in order)) == 1:
+            return list(last)
+
+        parameters = list()
+        for index in range(len(order)):
+            parameters += last[: index + 1]
+        return parameters
+
+    @staticmethod
+    def _order_keys(order_by) -> list:
+        # 排序参数 => [(字段, ASC/DESC)]
+        if order_by is None:
+            return []
+        if isinstance(order_by, (str, tuple)):
+            order_by = [order_by]
+
+        order = list()
+        for item in order_by:
+            if isinstance(item, str):
+                parts = item.split()
+                item = (parts[0], parts[1]) if len(parts) == 2 else (item, "ASC")
+            if item[1].upper() not in ["DESC", "ASC"]:
+                raise ValueError(f"sort key must with DESC/ASC, '{item[1]}' give")
+            order.append((item[0], item[1].upper()))
+        return order
+
+    @staticmethod
+    def _row_getter(description, keys: list):
+        # 取行中keys的值, tuple/namedtuple 按位置, dict/Row 按字段名
+        names = [column[0] for column in description]
+        index = [names.index(k) for k in keys]
+
+        def getter(row) -> tuple:
+            if isinstance(row, tuple):
+                return tuple(row[i] for i in index)
+            return tuple(row[k] for k in keys)
+
+        return getter
+
+    def table_parallel_scan(
+        self,
+        table: str,
+        partition_key: str,
+        fn,
+        workers: int = None,
+        reduce=None,
+        params: dict = {},
+        split: str = "minmax",
+        batch_size: int = 1000,
+        **kwargs,
+    ):
+        """
+        多进程分区并行扫描全表, 见 parallel.parallel_scan
+            - 按 partition_key 切分为 workers 个范围, 每个进程一个连接流式读取
+            - fn(rows) 在worker进程中处理一个分区, 需为可pickle的模块级函数
+
+        Args:
+            table (str): 表名
+            partition_key (str): 分区字段, 需有索引
+            fn (callable): fn(rows) => 分区结果
+            workers (int, optional): 进程数, 默认CPU核数
+            reduce (callable, optional): reduce(a, b) 合并分区结果
+            params (dict): key = value 条件, 同 table_select
+            split (str): minmax / quantile
+            batch_size (int): 每批读取的行数
+            kwargs: partitions, connect_kwargs, mp_context
+
+        Returns:
+            reduce 的结果, 或各分区结果的list
+        """
+        from .parallel import parallel_scan  #
+
+        return parallel_scan(
+            self,
+            table,
+            partition_key,
+            fn,
+            workers,
+            reduce,
+            params,
+            split,
+            batch_size,
+            **kwargs,
+        )
+
     def table_delete(self, table: str, params: dict = {}, limit: int = None):
         sql, parameters = self._table_select_sql(table, params, limit=limit)
-        rowcount = self.exec(sql.replace('SELECT *', 'DELETE'), parameters)
-        # autocommit
-        return self._lazycommit(rowcount)
+        # 驱动的 exec 已懒人版提交
+        return self.exec(sql.replace("SELECT *", "DELETE"), parameters)
 
     def _table_select_sql(
         self,
@@ -264,6 +1145,30 @@ class BasePyDO:
         params: dict = {},
         orderbydesc: str | list = None,
         limit: int = None,
+    ) -> (str, list):
+        self._check_fields(table, params)
+        # IN 列表按长度缓存, 同样长度的key集合共用一条语句
+        shape = tuple(
+            (k, len(v)) if isinstance(v, list) else k for k, v in params.items()
+        )
+        sql = statement_cache.get(
+            ("select", self._placeholder, table, shape, freeze(orderbydesc), limit),
+            lambda: self._build_select_sql(table, params, orderbydesc, limit)[0],
+        )
+        parameters = list()
+        for v in params.values():
+            if isinstance(v, list):
+                parameters.extend(v)
+            else:
+                parameters.append(v)
+        return sql, parameters
+
+    def _build_select_sql(
+        self,
+        table: str,
+        params: dict = {},
+        orderbydesc: str | list = None,
+        limit: int = None,
     ) -> (str, list):
         sql = f"SELECT * FROM {table} "
         parameters = list()
@@ -273,8 +1178,14 @@ class BasePyDO:
             # raise ValueError("not support empty condition.")
             for k, v in params.items():
                 if isinstance(v, list):
-                    vlist = [self.quote(x) for x in v]
-                    condition.append(f"{k} IN ({','.join(vlist)})")
+                    if len(v) == 0:
+                        # 空 IN () 不是合法SQL
+                        condition.append("1 = 0")
+                        continue
+                    condition.append(
+                        f"{k} IN ({', '.join([self._placeholder] * len(v))})"
+                    )
+                    parameters.extend(v)
                 else:
                     condition.append(f"{k} = {self._placeholder}")
                     parameters.append(v)
@@ -293,7 +1204,7 @@ class BasePyDO:
             sql += f" LIMIT {limit}"
 
         return sql, parameters
-        # END _table_select_sql
+        # END _build_select_sql
 
     def table_update(
         self, table: str, whereParams: dict, updateParams: dict, limit=1
@@ -313,27 +1224,245 @@ class BasePyDO:
         """
         if whereParams is None or len(whereParams) == 0:
             raise ValueError("not support empty condition.")
+        self._check_fields(table, list(whereParams) + list(updateParams))
+
+        sql = statement_cache.get(
+            (
+                "update",
+                self._placeholder,
+                table,
+                tuple(updateParams),
+                tuple(whereParams),
+            ),
+            lambda: self._build_update_sql(table, whereParams, updateParams),
+        )
+        parameters = list(updateParams.values()) + list(whereParams.values())
+        return self.exec(sql, parameters)
 
-        parameters = list()
+    def _build_update_sql(
+        self, table: str, whereParams: dict, updateParams: dict
+    ) -> str:
         updation = list()
-        for k, v in updateParams.items():
+        for k in updateParams.keys():
             updation.append(f"{k} = {self._placeholder}")
-            parameters.append(v)
 
         condition = list()
-        for k, v in whereParams.items():
+        for k in whereParams.keys():
             condition.append(f"{k} = {self._placeholder}")
-            parameters.append(v)
 
         sql = (
             f"UPDATE {table} SET {', '.join(updation)} WHERE {' AND '.join(condition)}"
         )
         # ? SQLite 默认不支持update/delete带limit, so 先禁用之
         # sql += f" LIMIT {int(limit)}"
-        return self.exec(sql, parameters)
+        return sql
+
+    def table_updates(
+        self,
+        table: str,
+        key_fields: str | list,
+        rows: dict | list,
+        chunk_size: int = None,
+    ) -> int:
+        """
+        按key批量更新, 每行更新的值可不同
+            - 默认(MySQL): UPDATE ... SET c = CASE WHEN k = %s THEN %s ... END WHERE k IN (...)
+            - PostgreSQL: UPDATE ... FROM (VALUES ...)
+            - SQLite: 导入临时表后 UPDATE ... FROM
+            - 按 chunk_size(默认 INSERT_BATCH) 分批, 全部批次在同一事务中执行
+
+        Args:
+            table (str): 表名
+            key_fields (str | list): 定位行的字段, 通常为主键
+            rows (dict | list): 含key字段与更新字段的数据, 字段以第一行为准
+            chunk_size (int, optional): 每批行数
+
+        Returns:
+            int: 更新影响行数
+        """
+        if isinstance(rows, dict):
+            rows = [rows]
+        if len(rows) == 0:
+            return 0
+
+        keys = [key_fields] if isinstance(key_fields, str) else list(key_fields)
+        fields = [field for field in self._rows_fields(rows) if field not in keys]
+        if len(keys) == 0 or len(fields) == 0:
+            raise ValueError("table_updates need both key fields and update fields")
+
+        schema = self._schema(table)
+        if schema is None:
+            getter = operator.itemgetter(*keys, *fields)
+        else:
+            schema.validate(keys + fields)
+            getter = schema.encoder(self, keys + fields)
+        parameters = map(getter, rows)
+        return self._atomic(
+            lambda: self._update_rows(table, keys, fields, parameters, chunk_size)
+        )
+
+    # END table_updates
+
+    def _update_rows(
+        self, table: str, keys: list, fields: list, parameters, chunk_size: int = None
+    ) -> int:
+        # CASE 分批更新, 参数为 (key..., field...) 的tuple, 需在事务中调用
+        width = len(fields) * (len(keys) + 1) + len(keys)
+        batch = int(chunk_size or self.attrs["INSERT_BATCH"]["DEFAULT"])
+        size = max(1, min(batch, self._max_parameters // width))
+
+        rowcount, cur = 0, self.cursor()
+        for chunk in self._chunk_rows(parameters, size):
+            sql = statement_cache.get(
+                (
+                    "updates",
+                    self._placeholder,
+                    table,
+                    tuple(keys),
+                    tuple(fields),
+                    len(chunk),
+                ),
+                lambda: self._update_case_sql(table, keys, fields, len(chunk)),
+            )
+            values = list()
+            for index in range(len(keys), len(keys) + len(fields)):
+                for row in chunk:
+                    values += row[: len(keys)]
+                    values.append(row[index])
+            for row in chunk:
+                values += row[: len(keys)]
+
+            self._execute(cur, sql, values)
+            rowcount += cur.rowcount
+
+        return rowcount
+
+    def _update_case_sql(
+        self, table: str, keys: list, fields: list, length: int
+    ) -> str:
+        when = " AND ".join(f"{k} = {self._placeholder}" for k in keys)
+        cases = f" WHEN {when} THEN {self._placeholder}" * length
+        updation = [f"{field} = CASE{cases} ELSE {field} END" for field in fields]
+        return (
+            f"UPDATE {table} SET {', '.join(updation)} "
+            f"WHERE {self._in_sql(keys, length)}"
+        )
+
+    def table_delete_many(
+        self, table: str, key_fields: str | list, values, chunk_size: int = None
+    ) -> int:
+        """
+        按key列表批量删除, 按 IN (...) 分批, 全部批次在同一事务中执行
+
+        Args:
+            table (str): 表名
+            key_fields (str | list): 字段, 多个字段时values为tuple
+            values (iterable): key的值
+            chunk_size (int, optional): 每批key数, 默认 IN_BATCH
+
+        Returns:
+            int: 删除行数
+        """
+        keys = [key_fields] if isinstance(key_fields, str) else list(key_fields)
+        values = list(dict.fromkeys(values))
+        if not values:
+            return 0
+        self._check_fields(table, keys)
+
+        size = max(1, self._get_many_batch({}, chunk_size) // len(keys))
+
+        def delete_all():
+            rowcount, cur = 0, self.cursor()
+            for chunk in self._chunk_rows(values, size):
+                sql = statement_cache.get(
+                    ("delete_many", self._placeholder, table, tuple(keys), len(chunk)),
+                    lambda: f"DELETE FROM {table} WHERE {self._in_sql(keys, len(chunk))}",
+                )
+                if len(keys) > 1:
+                    chunk = list(itertools.chain.from_iterable(chunk))
+                self._execute(cur, sql, chunk)
+                rowcount += cur.rowcount
+            return rowcount
+
+        return self._atomic(delete_all)
+
+    # END table_delete_many
+
+    def _in_sql(self, keys: list, length: int) -> str:
+        # k IN (%s, ...) 或多字段 (k1, k2) IN ((%s, %s), ...)
+        if len(keys) == 1:
+            return f"{keys[0]} IN ({', '.join([self._placeholder] * length)})"
+
+        places = f"({', '.join([self._placeholder] * len(keys))})"
+        return f"({', '.join(keys)}) IN ({', '.join([places] * length)})"
 
     ##table操作 End
 
+    ##BLOB Start
+    def blob_open(self, table: str, column: str, rowid: int, readonly: bool = True):
+        """
+        打开一行的BLOB字段做增量读写, 待子类重写(SQLite)
+            - 不能改变BLOB长度, 写入前需以 zeroblob(n) 预分配, 见 blob_insert
+
+        Args:
+            table (str): 表名
+            column (str): BLOB字段
+            rowid (int): 行的 rowid
+            readonly (bool): 只读
+
+        Returns:
+            file-like: read/write/seek/tell, 支持 with
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} not support incremental blob I/O"
+        )
+
+    def blob_read(
+        self, table: str, column: str, rowid: int, offset: int = 0, size: int = -1
+    ) -> bytes:
+        # 只读取 [offset, offset + size) 部分
+        with self.blob_open(table, column, rowid) as blob:
+            blob.seek(offset)
+            return blob.read(size)
+
+    def blob_iter(self, table: str, column: str, rowid: int, chunk_size: int = None):
+        """
+        按块流式读取BLOB, 不会一次加载全部数据
+
+        Yields:
+            bytes: 每块不超过 chunk_size(默认 BLOB_CHUNK) 字节
+        """
+        chunk_size = int(chunk_size or self.attrs["BLOB_CHUNK"]["DEFAULT"])
+        with self.blob_open(table, column, rowid) as blob:
+            while True:
+                chunk = blob.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def blob_write(
+        self, table: str, column: str, rowid: int, data, offset: int = 0
+    ) -> int:
+        """
+        从offset处覆盖写入已有BLOB, 写入超出BLOB长度时报错
+
+        Args:
+            data: bytes-like(按 memoryview 切片写入, 不复制) 或有 read 方法的文件对象
+
+        Returns:
+            int: 写入的字节数
+        """
+        chunk_size = int(self.attrs["BLOB_CHUNK"]["DEFAULT"])
+
+        def write():
+            with self.blob_open(table, column, rowid, readonly=False) as blob:
+                blob.seek(offset)
+                return copy_stream(data, blob, chunk_size)
+
+        return self._atomic(write)
+
+    ##BLOB End
+
     ##连接与游标 Start
     def original_connect(self):
         """
@@ -345,11 +1474,15 @@ class BasePyDO:
         return self._connect
 
     def connect(self):
+        if self._last_used is not None:
+            self._check_idle()
         return self._connect
 
     def cursor(self):
+        # 先 connect() 做空闲检查, 重连后共享游标已重置
+        _connect = self.connect()
         if not self._cursor:
-            self._cursor = self.connect().cursor()
+            self._cursor = _connect.cursor()
             # self._cursor = self._connect.cursor()
 
         return self._cursor
@@ -359,6 +1492,127 @@ class BasePyDO:
             self._cursor.close()
             self._cursor = None
 
+    def close(self):
+        # 关闭游标与连接
+        self.cursor_close()
+        if self._connect is not None:
+            self._connect.close()
+            self._connect = None
+
+    def ping(self) -> bool:
+        """
+        连接健康检查, 连接池借出前调用
+
+        Returns:
+            bool: 连接是否可用
+        """
+        try:
+            pending = self._pending_transaction()
+            cur = self._connect.cursor()
+            cur.execute("SELECT 1")
+            cur.fetchall()
+            cur.close()
+            self._end_read(pending)
+        except Exception:
+            return False
+
+        return True
+
+    def _pending_transaction(self) -> bool:
+        """
+        驱动连接上是否已有未结束的事务(含懒人版提交前未提交的写入), 待子类重写
+            - 无法判断时视为有, 只读语句后不回滚
+
+        Returns:
+            bool
+        """
+        return True
+
+    def _end_read(self, pending: bool) -> None:
+        """
+        结束只读语句隐式开启的事务
+            - 语句前已有事务(pending), 或在 transaction()/batch() 中时不回滚, 以免丢弃未提交的写入
+
+        Args:
+            pending (bool): 语句执行前的 _pending_transaction()
+        """
+        if not pending and not self.inTransaction() and self._batch is None:
+            self._connect.rollback()
+
+    def _open_connect(self):
+        """
+        创建数据库连接, 待子类重写, reconnect 时调用
+
+        Returns:
+            DB-API connection
+        """
+        raise NotImplementedError(f"{type(self).__name__} not support reconnect")
+
+    def reconnect(self):
+        """
+        关闭当前连接并重新连接, 恢复返回格式与提交模式
+            - 未提交的事务与 batch() 中未提交的写入会丢失
+        """
+        old, self._connect, self._cursor = self._connect, None, None
+        self.in_transaction = False
+        self._savepoint_depth = 0
+        if self._batch is not None:
+            self._batch[1] = 0
+        if old is not None:
+            try:
+                old.close()
+            except Exception:
+                pass
+
+        # 未提交的写入已随旧连接丢弃
+        self._flush_dirty()
+        self._connect = self._open_connect()
+        self._last_used = time.monotonic()
+        self.setFetchMode(self.attrs["FETCH_MODE"]["DEFAULT"])
+        if self._autocommit_mode is not None:
+            self.setAutoCommit(self._autocommit_mode)
+
+        if self._listeners is not None:
+            self._emit("reconnect", QueryEvent(None, None, id(self._connect)))
+
+    def _reconnect_quietly(self) -> bool:
+        # 重连失败(如服务端仍未恢复)时保留异常给下一次调用
+        try:
+            self.reconnect()
+        except Exception:
+            return False
+        return True
+
+    def _rollback_quietly(self) -> None:
+        try:
+            self.connect().rollback()
+        except Exception:
+            pass
+        self._cursor = None
+        self._flush_dirty()
+
+    def _check_connect(self) -> bool:
+        """
+        健康检查, 不可用时重连
+
+        Returns:
+            bool: 是否发生了重连
+        """
+        if self.inTransaction() or self.ping():
+            return False
+        return self._reconnect_quietly()
+
+    def _check_idle(self) -> None:
+        # 空闲超过 PING_INTERVAL 的连接可能已被服务端断开, 使用前先做健康检查
+        interval = self.attrs["PING_INTERVAL"]["DEFAULT"]
+        if interval is None:
+            return
+
+        now = time.monotonic()
+        if now - self._last_used > interval:
+            self._last_used = now
+            self._check_connect()
+
     def __delete__(self):
         if self._cursor:
             self._cursor.close()
@@ -369,22 +1623,130 @@ class BasePyDO:
 
     ##事务包装 Start
     def beginTransaction(self):
-        self.connect().beginTransaction()
+        # DB-API 在第一条语句前隐式开启事务, 驱动有显式 begin 的子类重写
         self.in_transaction = True
 
     def commit(self):
         self.connect().commit()
         self.in_transaction = False
+        self._end_batch()
+        self._flush_dirty()
         self.cursor_close()
 
     def rollBack(self):
-        self.connect().rollBack()
-        self.in_transaction = False
-        self.cursor_close()
+        try:
+            self.connect().rollback()
+        finally:
+            # 连接已断开时回滚会失败, 仍需结束事务状态
+            self.in_transaction = False
+            self._end_batch()
+            self._flush_dirty()
+            try:
+                self.cursor_close()
+            except Exception:
+                self._cursor = None
+
+    def _commit_or_rollback(self) -> None:
+        # 提交失败(如延迟的外键检查)时回滚, 否则事务状态残留, 之后的写入都不会提交
+        try:
+            self.commit()
+        except BaseException:
+            self.rollBack()
+            raise
+
+    def _end_batch(self) -> None:
+        # batch() 中提交/回滚后, 下一批重新计数
+        if self._batch is not None:
+            self._batch[1] = 0
+
+    def _mark_dirty(self, sql: str) -> None:
+        if self._dirty_tables is None:
+            self._dirty_tables = set()
+        # 解析不出表名时提交后清空缓存
+        self._dirty_tables.update(sql_tables(sql) or ["*"])
+
+    def _flush_dirty(self) -> None:
+        """
+        提交/回滚后失效未提交期间写过的表
+            - 写语句执行时已失效一次, 此处清掉提交前被其它连接(连接池/共享缓存的进程)写入的旧结果
+        """
+        tables, self._dirty_tables = self._dirty_tables, None
+        if tables is None or self._result_cache is None:
+            return
+
+        if "*" in tables:
+            self._result_cache.clear()
+        else:
+            self._result_cache.invalidate(*tables)
 
     def inTransaction(self):
         return self.in_transaction
 
+    @contextmanager
+    def transaction(self):
+        """
+        事务上下文: 正常退出提交, 异常回滚
+            - 嵌套时内层为 SAVEPOINT, 内层异常只回滚到该保存点
+
+        Usage:
+            with db.transaction():
+                db.table_inserts("orders", rows)
+                with db.transaction():  # SAVEPOINT
+                    db.table_update("stock", {"id": 1}, {"n": 0})
+        """
+        if not self.inTransaction():
+            self.beginTransaction()
+            try:
+                yield self
+            except BaseException:
+                self.rollBack()
+                raise
+            self._commit_or_rollback()
+            return
+
+        name = f"pydo_sp_{self._savepoint_depth}"
+        self._savepoint_depth += 1
+        cur = self.cursor()
+        try:
+            self._execute(cur, f"SAVEPOINT {name}")
+            try:
+                yield self
+            except BaseException:
+                self._execute(cur, f"ROLLBACK TO SAVEPOINT {name}")
+                self._execute(cur, f"RELEASE SAVEPOINT {name}")
+                raise
+            self._execute(cur, f"RELEASE SAVEPOINT {name}")
+        finally:
+            self._savepoint_depth -= 1
+
+    # END transaction
+
+    @contextmanager
+    def batch(self, commit_every: int = 1000):
+        """
+        批量提交: 上下文内的 exec/table_* 写语句不再逐条提交, 每 commit_every 条提交一次
+            - 不是原子操作, 已提交的批次不会回滚; 退出时(含异常)提交剩余部分
+            - 事务中或嵌套时不生效
+
+        Args:
+            commit_every (int): 每多少条写语句提交一次
+        """
+        if self._batch is not None or self.inTransaction():
+            yield self
+            return
+
+        self._batch = [max(1, int(commit_every)), 0]
+        try:
+            yield self
+        finally:
+            pending = self._batch[1]
+            self._batch = None
+            if pending > 0 and not self.inTransaction():
+                self.connect().commit()
+                self._flush_dirty()
+
+    # END batch
+
     ##事务包装 End
 
     ##配置 Start
@@ -415,6 +1777,9 @@ class BasePyDO:
                 else self.attrs[attribute]["DEFAULT"]
             )
             val_fare = self.setAutoCommit(mode)
+            self._autocommit_mode = mode
+        elif attribute in self.attrs:
+            self.attrs[attribute]["DEFAULT"] = value
         # END if
         return val_fare
 
@@ -434,6 +1799,7 @@ class BasePyDO:
                 - dict: 字典
                 - row: Row
                 - namedtuple: 具名元组
+            - columns: 列式, fetch_all 返回 fetch_columns 的结果
         """
         _connect = self.connect()
         cursor_factory = self.getCursorFactory(mode)
@@ -445,19 +1811,109 @@ class BasePyDO:
         elif hasattr(_connect, "cursorclass"):  # pymysql
             _connect.cursorclass = cursor_factory
 
+        # 已创建的游标沿用旧格式, 下次使用时重建
+        self.cursor_close()
+
     # END setFetchMode
 
     def getCursorFactory(self, mode=None):
         ##自定义返回格式
         return None
 
+    def setResultCache(self, cache=None):
+        """
+        开启/关闭查询结果缓存
+
+        Args:
+            cache (ResultCache, optional): None 为关闭
+        """
+        self._result_cache = cache
+
+    def addListener(self, event: str, callback) -> None:
+        """
+        注册埋点回调
+
+        Args:
+            event (str): before_execute/after_execute/error/after_fetch/retry/reconnect
+            callback (callable): callback(QueryEvent)
+        """
+        if event not in EVENTS:
+            raise ValueError(f"unsupport event:{event}, use one of {EVENTS}")
+
+        if self._listeners is None:
+            self._listeners = dict()
+        self._listeners.setdefault(event, []).append(callback)
+
+    def removeListener(self, event: str, callback) -> None:
+        if self._listeners is not None and callback in self._listeners.get(event, []):
+            self._listeners[event].remove(callback)
+
+    def table_schema(self, table: str, refresh: bool = False):
+        """
+        表结构, 见 schema.TableSchema; 不受 SCHEMA_CACHE 开关影响
+
+        Args:
+            table (str): 表名
+            refresh (bool): 重新从数据库读取
+
+        Returns:
+            TableSchema: 表不存在时为None
+        """
+        if refresh:
+            schema_cache.invalidate(self.dsn, table)
+        return schema_cache.get(self, table, self.attrs["SCHEMA_CACHE"]["TTL"])
+
+    def refresh_schema(self, table: str = None) -> None:
+        # 清除表结构缓存, table为None时清除该数据库的全部表
+        schema_cache.invalidate(self.dsn, table)
+
+    def _schema(self, table: str):
+        # SCHEMA_CACHE 关闭时为None, table_* 方法不做校验
+        if not self.attrs["SCHEMA_CACHE"]["DEFAULT"]:
+            return None
+        return self.table_schema(table)
+
+    def _check_fields(self, table: str, fields) -> None:
+        schema = self._schema(table)
+        if schema is not None:
+            schema.validate(fields)
+
+    def _column_adapter(self, column):
+        """
+        字段的参数转换函数, 驱动相关的类型由子类重写
+
+        Args:
+            column (schema.Column): 字段
+
+        Returns:
+            callable | None: None为无需转换
+        """
+        return column_adapter(column.type)
+
+    def _cache_namespace(self, kind: str) -> tuple:
+        # 同一缓存可被多个数据库/返回格式共用
+        return (self.dsn, self.attrs["FETCH_MODE"]["DEFAULT"], kind)
+
     ##配置 End
 
     ##数据转义 Start
     def sql_placeholder(self, sql: str, old="%s", new=None):
-        # 与pymysql和psycopg2保持一致 使用%s
+        # 与pymysql和psycopg2保持一致 使用%s, 同一SQL文本只替换一次
         new = self._placeholder if new is None else new
-        return sql.replace(old, new) if old != new else sql
+        if old == new:
+            return sql
+
+        return rewrite_placeholder(sql, old, new)
+
+    @staticmethod
+    def statementCacheStats() -> dict:
+        """
+        SQL语句缓存命中统计
+
+        Returns:
+            dict: hits/misses/size/maxsize/hit_rate
+        """
+        return statement_cache.stats()
 
     @staticmethod
     def quote(s: str):
@@ -467,12 +1923,13 @@ class BasePyDO:
     @staticmethod
     def parameters_mutate(parameters):
         # sqlite see: https://docs.python.org/3/library/sqlite3.html#sqlite3-placeholders
+        # bytes/bytearray/memoryview 等二进制参数原样交给驱动, 不做转换
         if isinstance(parameters, dict):
             parameters = tuple(parameters.values())
         elif isinstance(parameters, list) and len(parameters) > 0:
             if isinstance(parameters[0], dict):
-                # 第一项是dict, 默认为所有项都是dict
-                parameters = list(map(lambda x: tuple(x.values()), parameters))
+                # 第一项是dict, 所有项按第一项的字段名取值, 字段不一致时报错
+                parameters = list(iter_row_tuples(parameters)[1])
             elif isinstance(parameters[0], list):
                 # 第一项是list, 默认为所有项都是list
                 parameters = list(map(lambda x: tuple(x), parameters))
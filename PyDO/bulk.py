@@ -0,0 +1,217 @@
+"""
+批量导入工具
+    - 流式的行数据规整, 不构造完整list
+    - PostgreSQL COPY / MySQL LOAD DATA 共用的 text 格式:
+        字段以 \\t 分隔, 行以 \\n 结束, NULL 为 \\N, 反斜杠转义
+        see: https://www.postgresql.org/docs/current/sql-copy.html#id-1.9.3.55.9.2
+        see: https://dev.mysql.com/doc/refman/8.0/en/load-data.html
+    - BLOB 的分块复制, 二进制参数按 buffer 协议切片, 不复制整块数据
+"""
+
+import itertools, operator  #
+
+
+def iter_row_tuples(
+    rows, columns: list = None, strict: bool = None, encoder=None
+) -> (list, any):
+    """
+    批量参数编码: 行数据流式转为参数序列的迭代器, 驱动/VALUES拼接直接消费, 不构造中间list
+        - dict行: 字段顺序只取一次(columns 或第一行的key), itemgetter 按字段名取值,
+            行内key顺序不同也不会错位
+        - tuple/list行(已按字段顺序): 原样返回, 不再逐行转tuple
+        - 列式 {字段: 数组}(如 fetch_columns 的结果): 按行 zip 各列
+        - rows 可为生成器
+
+    Args:
+        rows (iterable | dict): 行的可迭代对象, 或列式dict
+        columns (list, optional): 字段顺序
+        strict (bool, optional): dict行的字段须与columns完全一致, 默认未指定columns时校验;
+            指定columns时多出的字段被忽略
+        encoder (callable, optional): dict行 => 参数序列, 默认 itemgetter(*columns),
+            如 schema.TableSchema.encoder
+
+    Raises:
+        ValueError: 缺少字段, strict 时字段个数不同, 列式数据各列长度不同
+
+    Returns:
+        (list, iterator): 字段(序列行且未指定时为None), 参数序列的迭代器
+    """
+    if isinstance(rows, dict):
+        return _iter_columnar(rows, columns)
+
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return columns, iter(())
+
+    rows = itertools.chain([first], rows)
+    if not isinstance(first, dict):
+        return columns, rows
+
+    if strict is None:
+        strict = columns is None
+    columns = list(first.keys()) if columns is None else list(columns)
+    if encoder is not None:
+        getter = encoder
+    elif len(columns) == 1:
+        key = columns[0]
+        getter = lambda row: (row[key],)
+    else:
+        getter = operator.itemgetter(*columns)
+
+    return columns, _iter_dict_rows(rows, columns, getter, strict)
+
+
+# END iter_row_tuples
+
+
+def _iter_dict_rows(rows, columns: list, getter, strict: bool):
+    # 每行只比较字段个数, 缺少的字段由 itemgetter 发现
+    width = len(columns)
+    count = 0
+    try:
+        for row in rows:
+            if strict and len(row) != width:
+                raise ValueError(f"row {count} fields {list(row)} not match {columns}")
+            yield getter(row)
+            count += 1
+    except KeyError as e:
+        raise ValueError(f"row {count} missing field {e}, expect {columns}") from None
+
+
+def _iter_columnar(data: dict, columns: list = None) -> (list, any):
+    # {字段: 数组} => 行tuple迭代器; numpy/array.array 先 tolist 为Python标量
+    columns = list(data.keys()) if columns is None else list(columns)
+    arrays = list()
+    for column in columns:
+        array = data[column]
+        if hasattr(array, "tolist"):
+            array = array.tolist()
+        arrays.append(array)
+
+    if len(set(map(len, arrays))) > 1:
+        raise ValueError(
+            f"columnar data length not match: {dict(zip(columns, map(len, arrays)))}"
+        )
+    return columns, zip(*arrays)
+
+
+_TEXT_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def copy_text_line(row, bytes_hex: bool = True) -> bytes:
+    """
+    一行数据编码为 COPY/LOAD DATA 的 text 格式
+
+    Args:
+        row (tuple): 一行数据
+        bytes_hex (bool): 二进制字段编码方式
+            - True: PostgreSQL bytea 的 \\x 十六进制格式
+            - False: MySQL 原始字节 + 反斜杠转义
+
+    Returns:
+        bytes: 以 \\n 结尾的一行
+    """
+    return b"\t".join([_copy_text_value(value, bytes_hex) for value in row]) + b"\n"
+
+
+def _copy_text_value(value, bytes_hex: bool) -> bytes:
+    if value is None:
+        return b"\\N"
+    elif value is True or value is False:
+        return b"1" if value else b"0"
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        if bytes_hex:
+            return b"\\\\x" + value.hex().encode()
+        return (
+            bytes(value)
+            .replace(b"\\", b"\\\\")
+            .replace(b"\t", b"\\t")
+            .replace(b"\n", b"\\n")
+            .replace(b"\r", b"\\r")
+            .replace(b"\0", b"\\0")
+        )
+
+    return str(value).translate(_TEXT_ESCAPES).encode()
+
+
+class LineStream:
+    """
+    把按行产生bytes的迭代器包装为只读文件对象, 供 copy_expert 等按块读取
+
+    Attributes:
+        lines (int): 已读出的行数
+    """
+
+    def __init__(self, lines) -> None:
+        self._lines = iter(lines)
+        self._buffer = b""
+        self.lines = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunks = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            chunks.append(line)
+            length += len(line)
+            self.lines += 1
+
+        data = b"".join(chunks)
+        if size < 0:
+            self._buffer = b""
+            return data
+
+        self._buffer = data[size:]
+        return data[:size]
+
+
+# END class LineStream
+
+
+def copy_stream(source, target, chunk_size: int) -> int:
+    """
+    分块把 source 写入 target
+
+    Args:
+        source: bytes/bytearray/memoryview 等 buffer, 或有 read(size) 方法的文件对象
+        target: 有 write(data) 方法的对象, 如 sqlite3.Blob/psycopg2 lobject/文件
+        chunk_size (int): 每块字节数
+
+    Returns:
+        int: 写入的字节数
+    """
+    written = 0
+    if hasattr(source, "read"):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                return written
+            target.write(chunk)
+            written += len(chunk)
+
+    # memoryview 切片不复制数据
+    view = memoryview(source).cast("B")
+    for start in range(0, view.nbytes, chunk_size):
+        chunk = view[start : start + chunk_size]
+        target.write(chunk)
+        written += chunk.nbytes
+    return written
+
+
+# END copy_stream
+
+
+def stream_size(data) -> int:
+    # bytes-like 的长度, 或文件对象从当前位置到末尾的长度
+    if not hasattr(data, "read"):
+        return memoryview(data).nbytes
+    if not hasattr(data, "seek"):
+        raise ValueError("blob size is required for unseekable stream")
+
+    position = data.tell()
+    size = data.seek(0, 2) - position
+    data.seek(position)
+    return size
@@ -0,0 +1,351 @@
+"""
+查询结果缓存(可选)
+    - fetch_all/fetch_one(含 table_select)的结果按 规整后的SQL + 参数 缓存
+    - TTL过期 + 按数量的LRU淘汰
+    - exec/table_* 写入某表时, 自动失效读取了该表的缓存; 未提交的写入在提交/回滚时再失效一次
+    - 事务中(含有未提交写入)的查询不读写缓存
+    - 后端可替换:
+        MemoryBackend: 进程内
+        DiskBackend: 基于SQLite文件, 多个worker进程共享
+
+    Usage:
+        cache = ResultCache(ttl=30, maxsize=10000)
+        # or ResultCache(DiskBackend("/tmp/pydo_cache.db"), ttl=30)
+        db.setResultCache(cache)
+
+    - 注意: MemoryBackend 返回的是缓存中的同一对象, 不要修改返回值, 或设置 copy=True
+"""
+
+import copy, hashlib, pickle, re, sqlite3, threading, time  #
+from collections import OrderedDict  #
+
+# 写语句的首个关键字
+_WRITE_KEYWORDS = frozenset(
+    [
+        "INSERT",
+        "UPDATE",
+        "DELETE",
+        "REPLACE",
+        "MERGE",
+        "UPSERT",
+        "COPY",
+        "LOAD",
+        "TRUNCATE",
+        "CREATE",
+        "DROP",
+        "ALTER",
+        "RENAME",
+    ]
+)
+_TABLE_PATTERN = re.compile(
+    r"\b(?:JOIN|INTO|UPDATE|TABLE)\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?([`\"\[]?[\w.]+[`\"\]]?)",
+    re.IGNORECASE,
+)
+# FROM 子句, 支持 FROM a, b 的逗号连接
+_FROM_PATTERN = re.compile(
+    r"\bFROM\s+([^()]+?)(?=\bWHERE\b|\bGROUP\b|\bORDER\b|\bLIMIT\b|\bHAVING\b|\bUNION\b"
+    r"|\b(?:LEFT|RIGHT|INNER|OUTER|FULL|CROSS|NATURAL)\b|\bJOIN\b|\)|;|$)",
+    re.IGNORECASE | re.DOTALL,
+)
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    # 合并空白, 作为缓存键
+    return _SPACES.sub(" ", sql).strip()
+
+
+def sql_tables(sql: str) -> frozenset:
+    """
+    SQL中涉及的表名(小写, 去掉引号)
+
+    Returns:
+        frozenset: 表名集合
+    """
+    names = _TABLE_PATTERN.findall(sql)
+    for clause in _FROM_PATTERN.findall(sql):
+        for item in clause.split(","):
+            item = item.strip()
+            if item:
+                names.append(item.split()[0])
+
+    return frozenset(name.strip('`"[]').lower() for name in names)
+
+
+def is_write_sql(sql: str) -> bool:
+    keyword = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+    if keyword == "WITH":
+        return bool(re.search(r"\b(INSERT|UPDATE|DELETE)\b", sql, re.IGNORECASE))
+
+    return keyword in _WRITE_KEYWORDS
+
+
+class MemoryBackend:
+    """
+    进程内LRU + TTL
+
+    Args:
+        maxsize (int): 最多缓存的结果数
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        # key => (过期时间, 表名, 结果)
+        self._data = OrderedDict()
+        # 表名 => key集合
+        self._tags = dict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return False, None
+            if item[0] < time.monotonic():
+                self._remove(key)
+                return False, None
+
+            self._data.move_to_end(key)
+            return True, item[2]
+
+    def set(self, key: str, value, tables: frozenset, ttl: float) -> None:
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (time.monotonic() + ttl, tables, value)
+            for table in tables:
+                self._tags.setdefault(table, set()).add(key)
+            while len(self._data) > self.maxsize:
+                self._remove(next(iter(self._data)))
+
+    def invalidate(self, tables: frozenset) -> None:
+        with self._lock:
+            for table in tables:
+                for key in list(self._tags.get(table, ())):
+                    self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._tags.clear()
+
+    def _remove(self, key: str) -> None:
+        # 需持有锁调用
+        _, tables, _ = self._data.pop(key)
+        for table in tables:
+            keys = self._tags.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[table]
+
+
+# END class MemoryBackend
+
+
+class DiskBackend:
+    """
+    基于SQLite文件的共享缓存, 多进程可同时使用同一文件
+        - 结果使用 pickle 序列化, 无法序列化的结果不缓存
+
+    Args:
+        file (str): 缓存文件路径
+        maxsize (int): 最多缓存的结果数
+        timeout (float): 文件锁等待秒数
+    """
+
+    def __init__(self, file: str, maxsize: int = 100000, timeout: float = 5.0) -> None:
+        self.file = file
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._evict_every = max(1, min(100, maxsize // 10))
+        self._writes = 0
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS pydo_cache "
+            "(key TEXT PRIMARY KEY, value BLOB, expires REAL, used REAL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS pydo_cache_tag "
+            "(tag TEXT, key TEXT, PRIMARY KEY (tag, key))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS pydo_cache_used ON pydo_cache (used)")
+
+    def _conn(self):
+        # 每个线程一个连接, 自动提交
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.file, timeout=self.timeout, isolation_level=None
+            )
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str):
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT value, expires FROM pydo_cache WHERE key = ?", (key,)
+        ).fetchone()
+        # 使用 wall clock, 多进程间可比较
+        now = time.time()
+        if row is None or row[1] < now:
+            return False, None
+
+        conn.execute("UPDATE pydo_cache SET used = ? WHERE key = ?", (now, key))
+        return True, pickle.loads(row[0])
+
+    def set(self, key: str, value, tables: frozenset, ttl: float) -> None:
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return
+
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "REPLACE INTO pydo_cache (key, value, expires, used) VALUES (?, ?, ?, ?)",
+                (key, blob, now + ttl, now),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO pydo_cache_tag (tag, key) VALUES (?, ?)",
+                [(table, key) for table in tables],
+            )
+            # COUNT(*) 需全表扫描, 每 _evict_every 次写入检查一次
+            self._writes += 1
+            if self._writes % self._evict_every == 0:
+                self._evict(conn, self.maxsize, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def invalidate(self, tables: frozenset) -> None:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for table in tables:
+                conn.execute(
+                    "DELETE FROM pydo_cache WHERE key IN (SELECT key FROM pydo_cache_tag WHERE tag = ?)",
+                    (table,),
+                )
+                conn.execute("DELETE FROM pydo_cache_tag WHERE tag = ?", (table,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def clear(self) -> None:
+        conn = self._conn()
+        conn.execute("DELETE FROM pydo_cache")
+        conn.execute("DELETE FROM pydo_cache_tag")
+
+    @staticmethod
+    def _evict(conn, maxsize: int, now: float) -> None:
+        # 先删过期, 再按最近使用时间淘汰到 maxsize 以内
+        conn.execute("DELETE FROM pydo_cache WHERE expires < ?", (now,))
+        (total,) = conn.execute("SELECT COUNT(*) FROM pydo_cache").fetchone()
+        if total > maxsize:
+            conn.execute(
+                "DELETE FROM pydo_cache WHERE key IN "
+                "(SELECT key FROM pydo_cache ORDER BY used LIMIT ?)",
+                (total - maxsize,),
+            )
+        conn.execute(
+            "DELETE FROM pydo_cache_tag WHERE key NOT IN (SELECT key FROM pydo_cache)"
+        )
+
+
+# END class DiskBackend
+
+
+class ResultCache:
+    """
+    查询结果缓存
+
+    Args:
+        backend (optional): MemoryBackend/DiskBackend, 默认 MemoryBackend(maxsize)
+        ttl (float): 结果有效秒数
+        maxsize (int): 默认后端的最大缓存数
+        copy (bool): 命中时返回深拷贝, 调用方会修改结果时开启
+    """
+
+    def __init__(
+        self, backend=None, ttl: float = 60.0, maxsize: int = 1024, copy: bool = False
+    ) -> None:
+        self.backend = MemoryBackend(maxsize) if backend is None else backend
+        self.ttl = ttl
+        self.copy = copy
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(namespace: tuple, sql: str, parameters) -> str:
+        """
+        缓存键: 数据库/返回格式 + 规整后的SQL + 参数
+
+        Returns:
+            str: sha1
+        """
+        raw = repr((namespace, normalize_sql(sql), parameters))
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def fetch(self, namespace: tuple, sql: str, parameters, load):
+        """
+        读缓存, 未命中时调用 load() 并写入缓存
+
+        Args:
+            namespace (tuple): 区分数据库与返回格式
+            sql (str): SQL
+            parameters: 参数
+            load (callable): 无参数, 执行查询
+
+        Returns:
+            查询结果
+        """
+        key = self.key(namespace, sql, parameters)
+        hit, value = self.backend.get(key)
+        if hit:
+            self.hits += 1
+            return copy.deepcopy(value) if self.copy else value
+
+        self.misses += 1
+        value = load()
+        tables = sql_tables(sql)
+        if tables:
+            # 解析不出表名的查询无法失效, 不缓存
+            self.backend.set(key, value, tables, self.ttl)
+        return copy.deepcopy(value) if self.copy else value
+
+    def invalidate_sql(self, sql: str) -> None:
+        # 写语句失效相关表, 无法解析出表名时清空
+        tables = sql_tables(sql)
+        self.invalidations += 1
+        if tables:
+            self.backend.invalidate(tables)
+        else:
+            self.backend.clear()
+
+    def invalidate(self, *tables: str) -> None:
+        self.invalidations += 1
+        self.backend.invalidate(frozenset(table.lower() for table in tables))
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            invalidations=self.invalidations,
+            hit_rate=self.hits / total if total else 0.0,
+        )
+
+
+# END class ResultCache
@@ -0,0 +1,128 @@
+"""
+列式结果
+    - fetch_columns 按 fetchmany 分批把结果填充为每列一个数组, 不创建逐行的dict/tuple对象
+    - 数值列使用 array.array, 安装了 numpy 时零拷贝转为 numpy.ndarray
+    - 列类型优先取自 cursor.description 的 type_code, 无类型信息时(SQLite)按首批数据推断
+    - 含 NULL 的整数列、字符串等其它列退化为 list (numpy 时为 object 数组), 浮点列 NULL 记为 nan
+"""
+
+from array import array  #
+
+try:
+    import numpy  #
+except ImportError:
+    numpy = None
+
+# array typecode => numpy dtype
+_NUMPY_DTYPES = {"q": "int64", "d": "float64", "b": "bool"}
+_NAN = float("nan")
+
+
+class ColumnBuilder:
+    """
+    分批追加行, 生成列式结果
+
+    Args:
+        description: cursor.description
+        typecodes (list): 每列 array typecode(q/d/b) 或 None(按数据推断)
+    """
+
+    def __init__(self, description, typecodes: list = None) -> None:
+        self.names = [column[0] for column in description]
+        self._typecodes = list(typecodes or [None] * len(self.names))
+        self._columns = None
+
+    def extend(self, rows: list) -> None:
+        if not rows:
+            return
+
+        values = list(zip(*rows))
+        if self._columns is None:
+            self._columns = [
+                self._new_column(typecode, column)
+                for typecode, column in zip(self._typecodes, values)
+            ]
+
+        for index, column in enumerate(values):
+            target = self._columns[index]
+            if isinstance(target, list):
+                target.extend(column)
+                continue
+            length = len(target)
+            try:
+                target.extend(column)
+            except (TypeError, OverflowError):
+                # extend 失败前已追加的部分需丢弃
+                del target[length:]
+                self._columns[index] = self._widen(target, column)
+
+    @staticmethod
+    def _new_column(typecode, column):
+        if typecode is None:
+            typecode = _infer_typecode(column)
+        return list() if typecode is None else array(typecode)
+
+    @staticmethod
+    def _widen(target: array, column) -> list | array:
+        # 浮点列 NULL => nan, 其它退化为list
+        if target.typecode == "d":
+            length = len(target)
+            try:
+                target.extend([_NAN if value is None else value for value in column])
+                return target
+            except TypeError:
+                del target[length:]
+
+        widened = target.tolist()
+        widened.extend(column)
+        return widened
+
+    def result(self, use_numpy: bool = None) -> dict:
+        """
+        Args:
+            use_numpy (bool, optional): 默认安装了numpy即使用
+
+        Returns:
+            dict: 列名 => ndarray/array/list
+        """
+        use_numpy = numpy is not None if use_numpy is None else use_numpy
+        if use_numpy and numpy is None:
+            raise ImportError("numpy is required for use_numpy=True")
+
+        columns = self._columns
+        if columns is None:
+            columns = [self._new_column(typecode, ()) for typecode in self._typecodes]
+
+        if not use_numpy:
+            return dict(zip(self.names, columns))
+
+        result = dict()
+        for name, column in zip(self.names, columns):
+            if isinstance(column, array):
+                result[name] = numpy.frombuffer(
+                    column, dtype=_NUMPY_DTYPES[column.typecode]
+                )
+            else:
+                values = numpy.empty(len(column), dtype=object)
+                values[:] = column
+                result[name] = values
+        return result
+
+
+# END class ColumnBuilder
+
+
+def _infer_typecode(column) -> str:
+    # 以第一个非NULL值推断
+    for value in column:
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            return "b"
+        if isinstance(value, int):
+            return "q"
+        if isinstance(value, float):
+            return "d"
+        return None
+
+    return None
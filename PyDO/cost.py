@@ -7,6 +7,7 @@ PYDO_ATTRIBUTE = dict(
         DICT    = 'dict',
         ROW     = 'row',
         NAMEDTUPLE  = 'namedtuple', #具名元组
+        COLUMNS = 'columns', #列式, fetch_all 返回 {列名: 数组}
     ),
     
     #提交模式
@@ -14,5 +15,44 @@ PYDO_ATTRIBUTE = dict(
         DEFAULT = False,
         AUTOCOMMIT = True,
     ),
+
+    #批量插入每条语句最多行数, 另受驱动绑定参数上限限制
+    INSERT_BATCH = dict(
+        DEFAULT = 1000,
+    ),
+
+    #table_get_many 每条 IN (...) 最多绑定的key数, 另受驱动绑定参数上限限制
+    IN_BATCH = dict(
+        DEFAULT = 1000,
+    ),
+
+    #连接空闲超过此秒数, 执行语句前先 ping, 失败即重连; None为不检查
+    PING_INTERVAL = dict(
+        DEFAULT = 60,
+    ),
+
+    #事务外只读语句 与 retry_transaction 遇连接断开/死锁/序列化失败时的重试
+    RETRY = dict(
+        DEFAULT = True,
+        ATTEMPTS = 3,       #最多重试次数, 0为不重试
+        BACKOFF = 0.05,     #首次退避秒数, 之后指数增长, 随机抖动
+        BACKOFF_MAX = 2.0,
+    ),
+
+    #BLOB/大对象 分块读写的字节数
+    BLOB_CHUNK = dict(
+        DEFAULT = 1048576,
+    ),
+
+    #表结构缓存: 开启后 table_* 方法校验字段名, 按字段类型转换参数; TTL秒后重新读取, None为不过期
+    SCHEMA_CACHE = dict(
+        DEFAULT = False,
+        TTL = 300,
+    ),
+
+    #table_get_many 的key数达到此值时, 改为导入临时表后JOIN
+    TEMP_TABLE_KEYS = dict(
+        DEFAULT = 20000,
+    ),
 )
 
@@ -0,0 +1,285 @@
+"""
+查询埋点
+    - 事件: before_execute / after_execute / error / after_fetch / retry / reconnect
+        db.addListener("after_execute", callback)  # callback(event: QueryEvent)
+        retry: 重试前触发, event.error 为触发重试的异常; reconnect: 重连成功后触发
+    - SlowQueryLog: 超过阈值的语句写入 logging
+    - QueryMetrics: 按语句指纹统计延迟直方图, 可导出 Prometheus 文本格式
+
+    Usage:
+        metrics = QueryMetrics().install(db)
+        SlowQueryLog(threshold=0.2).install(db)
+        ...
+        print(metrics.prometheus())
+"""
+
+import bisect, logging, re, threading  #
+
+EVENTS = (
+    "before_execute",
+    "after_execute",
+    "error",
+    "after_fetch",
+    "retry",
+    "reconnect",
+)
+
+
+class QueryEvent:
+    """
+    一次语句执行
+
+    Attributes:
+        sql (str): 已替换占位符的SQL, reconnect/retry_transaction 时为None
+        parameter_count (int): 参数个数, 无法计算(如生成器)时为None
+        parameter_bytes (int): 参数大小估算
+        connection_id (int): 连接标识
+        duration (float): 秒, before_execute 时为None
+        rowcount (int): 影响/返回行数
+        error (Exception): 异常, 仅 error 事件
+    """
+
+    __slots__ = (
+        "sql",
+        "parameter_count",
+        "parameter_bytes",
+        "connection_id",
+        "duration",
+        "rowcount",
+        "error",
+    )
+
+    def __init__(self, sql: str, parameters, connection_id: int) -> None:
+        self.sql = sql
+        self.connection_id = connection_id
+        self.parameter_count, self.parameter_bytes = _parameters_size(parameters)
+        self.duration = None
+        self.rowcount = None
+        self.error = None
+
+    def __repr__(self) -> str:
+        return (
+            f"QueryEvent(sql={self.sql!r}, parameter_count={self.parameter_count}, "
+            f"duration={self.duration}, rowcount={self.rowcount}, connection_id={self.connection_id})"
+        )
+
+
+# END class QueryEvent
+
+
+def _parameters_size(parameters) -> (int, int):
+    # 仅估算平铺的参数序列, 其它返回None
+    if parameters is None:
+        return 0, 0
+    elif isinstance(parameters, dict):
+        parameters = parameters.values()
+    elif not isinstance(parameters, (list, tuple)):
+        return None, None
+
+    size = 0
+    for value in parameters:
+        if isinstance(value, (str, bytes, bytearray)):
+            size += len(value)
+        elif isinstance(value, memoryview):
+            size += value.nbytes
+        else:
+            size += 8
+
+    return len(parameters), size
+
+
+_FINGERPRINT_RULES = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"(%s|\?)(\s*,\s*(%s|\?))+"), "?+"),
+    (re.compile(r"(\(\?\+?\))(\s*,\s*\(\?\+?\))+"), "(?+)+"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def fingerprint(sql: str) -> str:
+    """
+    语句指纹: 去掉字面量, 合并 IN 列表与多行VALUES
+
+    Returns:
+        str: 如 SELECT * FROM t WHERE id IN (?+)
+    """
+    for pattern, repl in _FINGERPRINT_RULES:
+        sql = pattern.sub(repl, sql)
+    return sql.strip()
+
+
+class SlowQueryLog:
+    """
+    慢查询日志
+
+    Args:
+        threshold (float): 秒, 超过即记录
+        logger (logging.Logger, optional): 默认 logging.getLogger("PyDO.slow")
+    """
+
+    def __init__(self, threshold: float = 1.0, logger: logging.Logger = None) -> None:
+        self.threshold = threshold
+        self.logger = logger or logging.getLogger("PyDO.slow")
+
+    def __call__(self, event: QueryEvent) -> None:
+        if event.duration is not None and event.duration >= self.threshold:
+            self.logger.warning(
+                "slow query %.3fs rows=%s params=%s conn=%s: %s",
+                event.duration,
+                event.rowcount,
+                event.parameter_count,
+                event.connection_id,
+                event.sql,
+            )
+
+    def install(self, pydo):
+        pydo.addListener("after_execute", self)
+        return self
+
+
+# END class SlowQueryLog
+
+
+class QueryMetrics:
+    """
+    按语句指纹统计的延迟直方图
+
+    Args:
+        buckets (list): 直方图上界(秒)
+    """
+
+    DEFAULT_BUCKETS = (
+        0.0005,
+        0.001,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1,
+        2.5,
+        5,
+        10,
+    )
+
+    def __init__(self, buckets: list = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        # fingerprint => [各桶计数..., +Inf计数, 总耗时, 总行数, 错误数]
+        self._stats = dict()
+        self._counters = dict()
+        self._lock = threading.Lock()
+
+    def _get(self, sql: str) -> list:
+        key = fingerprint(sql)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = [0] * (len(self.buckets) + 4)
+        return stats
+
+    def record(self, event: QueryEvent) -> None:
+        index = bisect.bisect_left(self.buckets, event.duration)
+        with self._lock:
+            stats = self._get(event.sql)
+            stats[index] += 1
+            stats[-3] += event.duration
+            if event.rowcount is not None and event.rowcount > 0:
+                stats[-2] += event.rowcount
+
+    def record_error(self, event: QueryEvent) -> None:
+        with self._lock:
+            self._get(event.sql)[-1] += 1
+
+    def incr(self, name: str, value: int = 1) -> None:
+        # 自定义计数, 导出为 pydo_<name>_total
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def record_retry(self, event: QueryEvent) -> None:
+        self.incr("query_retries")
+
+    def record_reconnect(self, event: QueryEvent) -> None:
+        self.incr("reconnects")
+
+    def install(self, pydo):
+        pydo.addListener("after_execute", self.record)
+        pydo.addListener("error", self.record_error)
+        pydo.addListener("retry", self.record_retry)
+        pydo.addListener("reconnect", self.record_reconnect)
+        return self
+
+    def snapshot(self) -> dict:
+        """
+        Returns:
+            dict: fingerprint => dict(count, sum, rows, errors, buckets)
+        """
+        with self._lock:
+            result = dict()
+            for key, stats in self._stats.items():
+                counts = stats[: len(self.buckets) + 1]
+                result[key] = dict(
+                    count=sum(counts),
+                    sum=stats[-3],
+                    rows=stats[-2],
+                    errors=stats[-1],
+                    buckets=dict(zip(self.buckets + (float("inf"),), counts)),
+                )
+            return result
+
+    def prometheus(self, prefix: str = "pydo") -> str:
+        """
+        导出 Prometheus 文本格式
+            see: https://prometheus.io/docs/instrumenting/exposition_formats/
+
+        Returns:
+            str
+        """
+        lines = [
+            f"# HELP {prefix}_query_duration_seconds Query latency by statement fingerprint",
+            f"# TYPE {prefix}_query_duration_seconds histogram",
+        ]
+        errors, rows = [], []
+        for key, stats in self.snapshot().items():
+            label = _label(key)
+            cumulative = 0
+            for bound, count in stats["buckets"].items():
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f'{prefix}_query_duration_seconds_bucket{{fingerprint="{label}",le="{le}"}} {cumulative}'
+                )
+            lines.append(
+                f'{prefix}_query_duration_seconds_sum{{fingerprint="{label}"}} {stats["sum"]}'
+            )
+            lines.append(
+                f'{prefix}_query_duration_seconds_count{{fingerprint="{label}"}} {stats["count"]}'
+            )
+            rows.append(
+                f'{prefix}_query_rows_total{{fingerprint="{label}"}} {stats["rows"]}'
+            )
+            errors.append(
+                f'{prefix}_query_errors_total{{fingerprint="{label}"}} {stats["errors"]}'
+            )
+
+        lines += [f"# TYPE {prefix}_query_rows_total counter"] + rows
+        lines += [f"# TYPE {prefix}_query_errors_total counter"] + errors
+        with self._lock:
+            for name, value in self._counters.items():
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                lines.append(f"{prefix}_{name}_total {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._counters.clear()
+
+
+# END class QueryMetrics
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
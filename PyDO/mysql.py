@@ -4,14 +4,31 @@ pymysql
 """
 
 from .base import BasePyDO  #
+from .bulk import copy_text_line  #
 
-import pymysql, dsnparse  #
+import pymysql, dsnparse, tempfile  #
+from pymysql.constants import FIELD_TYPE, SERVER_STATUS  #
 from urllib.parse import parse_qs  #
 
 
+def _escape_memoryview(value, mapping=None) -> str:
+    return pymysql.converters.escape_bytes(value.tobytes(), mapping)
+
+
+# pymysql 不能转义 memoryview 参数, 按 bytes 转义
+_CONVERSIONS = dict(pymysql.converters.conversions)
+_CONVERSIONS[memoryview] = _escape_memoryview
+
+
 class MySQLPyDO(BasePyDO):
     # sql占位符
     _placeholder = "%s"
+    # 预处理语句占位符上限
+    _max_parameters = 65535
+    # LOAD DATA 每段行数
+    _bulk_load_rows = 100000
+    # 随机排序函数
+    _random_function = "RAND()"
 
     attrs = dict(
         # 提交模式
@@ -23,19 +40,26 @@ class MySQLPyDO(BasePyDO):
         ),
     )
 
-    def __init__(self, dsn: str, timeout: int = 10) -> None:
+    def __init__(self, dsn: str, timeout: int = 10, **kwargs) -> None:
         super().__init__(dsn)
+        self._timeout = timeout
+        self._kwargs = kwargs
+        self._connect = self._open_connect()
+
+    def _open_connect(self):
         cursor_factory = self.getCursorFactory(self.attrs["FETCH_MODE"]["DEFAULT"])
         auto_commit = self.attrs["AUTO_COMMIT"]["DEFAULT"]
 
-        r = dsnparse.parse(dsn)
+        r = dsnparse.parse(self.dsn)
         # juset for charset
         query_params = parse_qs(r.query)
         charset = query_params.get("charset", [None])[0]
         if charset is None:
             charset = "utf8mb4"
 
-        self._connect = pymysql.connect(
+        kwargs = dict(self._kwargs)
+        kwargs.setdefault("conv", _CONVERSIONS)
+        return pymysql.connect(
             user=r.username,  # The first four arguments is based on DB-API 2.0 recommendation.
             password=r.password,
             host=r.host,
@@ -44,10 +68,11 @@ class MySQLPyDO(BasePyDO):
             charset=charset,
             # sql_mode=None,
             # read_default_file=None,
-            connect_timeout=timeout,
+            connect_timeout=self._timeout,
             autocommit=auto_commit,
             # server_public_key=None,
             cursorclass=cursor_factory,
+            **kwargs,
         )
 
     # END init
@@ -77,19 +102,38 @@ class MySQLPyDO(BasePyDO):
 
     # END version
 
-    ##查询DQL/DML Start
-    def exec(self, sql: str, parameters=None) -> int:
-        # 执行一条 SQL 语句，并返回受影响的行数
-        sql = self.sql_placeholder(sql)
-        parameters = self.parameters_mutate(parameters)
+    def ping(self) -> bool:
+        try:
+            self._connect.ping(reconnect=False)
+        except Exception:
+            return False
 
-        cur = self.cursor()
-        if parameters is None:
-            rowcount = cur.execute(sql)
-        else:
-            rowcount = cur.execute(sql, parameters)
+        return True
 
-        return self._lazycommit(rowcount)
+    def _pending_transaction(self) -> bool:
+        # 最近一次响应的服务端状态
+        return bool(self._connect.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS)
+
+    def _is_disconnect(self, error: Exception) -> bool:
+        # InterfaceError: 连接已关闭; 2006/2013/2055: 服务端断开或查询中连接丢失
+        if isinstance(error, pymysql.err.InterfaceError):
+            return True
+        return isinstance(error, pymysql.err.OperationalError) and error.args[:1] in [
+            (2006,),
+            (2013,),
+            (2055,),
+        ]
+
+    def _is_retryable(self, error: Exception) -> bool:
+        # 1213: 死锁; 1205: 锁等待超时
+        return isinstance(error, pymysql.err.MySQLError) and error.args[:1] in [
+            (1213,),
+            (1205,),
+        ]
+
+    ##查询DQL/DML Start
+    def exec(self, sql: str, parameters=None) -> int:
+        return self._lazycommit(super().exec(sql, parameters))
 
     def table_insert_on_duplicate_update(
         self, table: str, params: dict, params_update: dict
@@ -104,14 +148,69 @@ class MySQLPyDO(BasePyDO):
         places = list(map(lambda x: self._placeholder, fields))
         sql = f"INSERT INTO {table} ({', '.join(fields)}) VALUES ({', '.join(places)}) ON DUPLICATE KEY UPDATE {', '.join(fields_update)}"
 
-        cur = self.cursor()
-        cur.execute(sql, values)
+        cur = self._execute(self.cursor(), sql, values)
 
         # autocommit
         return self._lazycommit(cur.rowcount)
 
+    def _columns_sql(self, table: str) -> (str, list):
+        # 库名.表名, 未指定库名时为当前库
+        schema, _, name = table.rpartition(".")
+        sql = (
+            "SELECT column_name, column_type, is_nullable = 'YES', column_key = 'PRI' "
+            "FROM information_schema.columns "
+            "WHERE table_schema = COALESCE(%s, DATABASE()) AND table_name = %s "
+            "ORDER BY ordinal_position"
+        )
+        return sql, [schema or None, name]
+
+    def _stream_cursor(self, batch_size: int):
+        # 无缓冲游标, 逐批从服务端读取
+        # see: https://pymysql.readthedocs.io/en/latest/modules/cursors.html#pymysql.cursors.SSCursor
+        _connect = self.connect()
+        if issubclass(_connect.cursorclass, pymysql.cursors.DictCursorMixin):
+            return _connect.cursor(pymysql.cursors.SSDictCursor)
+
+        return _connect.cursor(pymysql.cursors.SSCursor)
+
     ##查询DQL End
 
+    ##快捷的table操作 Start
+    def table_bulk_load(self, table: str, rows, columns: list = None) -> int:
+        """
+        大批量导入: LOAD DATA LOCAL INFILE
+            - 需连接时开启 local_infile=True, 否则使用多行VALUES分批插入
+            - pymysql 仅支持从文件读取, 每 _bulk_load_rows 行编码到临时文件后导入
+            - 多个分段在同一事务中执行
+        """
+        # pymysql 不公开该选项(Connection._local_infile), 以连接参数为准
+        if not self._kwargs.get("local_infile"):
+            return super().table_bulk_load(table, rows, columns)
+
+        columns, parameters = self._bulk_rows(table, rows, columns)
+
+        sql = f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET {self.connect().charset}"
+        if columns is not None:
+            sql += f" ({', '.join(columns)})"
+
+        def load():
+            rowcount = 0
+            cur = self.cursor()
+            for chunk in self._chunk_rows(parameters, self._bulk_load_rows):
+                with tempfile.NamedTemporaryFile(suffix=".tsv") as buffer:
+                    buffer.writelines(
+                        copy_text_line(row, bytes_hex=False) for row in chunk
+                    )
+                    buffer.flush()
+                    rowcount += self._execute(cur, sql, (buffer.name,)).rowcount
+            return rowcount
+
+        return self._atomic(load)
+
+    # END table_bulk_load
+
+    ##快捷的table操作 End
+
     ##事务包装 Start
     def beginTransaction(self):
         self.connect().begin()
@@ -120,6 +219,15 @@ class MySQLPyDO(BasePyDO):
     ##事务包装 End
 
     ##配置 Start
+    def setAutoCommit(self, mode):
+        self.connect().autocommit(mode)
+
+    def _tuple_cursor(self):
+        return self.connect().cursor(pymysql.cursors.Cursor)
+
+    def _column_typecode(self, column) -> str:
+        return _TYPECODES.get(column[1])
+
     def getCursorFactory(self, mode=None):
         # TODO test
         # https://pymysql.readthedocs.io/en/latest/modules/cursors.html
@@ -132,6 +240,8 @@ class MySQLPyDO(BasePyDO):
                 # cursor_factory = pymysql.cursors.SSCursor
             case "namedtuple":
                 cursor_factory = pymysql.cursors.SSDictCursor
+            case "columns":
+                cursor_factory = pymysql.cursors.Cursor
 
         return cursor_factory
 
@@ -141,3 +251,16 @@ class MySQLPyDO(BasePyDO):
 
 
 # END class
+
+# 列式结果的字段类型 => array typecode
+# see: pymysql.constants.FIELD_TYPE
+_TYPECODES = {
+    FIELD_TYPE.TINY: "q",
+    FIELD_TYPE.SHORT: "q",
+    FIELD_TYPE.LONG: "q",
+    FIELD_TYPE.INT24: "q",
+    FIELD_TYPE.LONGLONG: "q",
+    FIELD_TYPE.YEAR: "q",
+    FIELD_TYPE.FLOAT: "d",
+    FIELD_TYPE.DOUBLE: "d",
+}
@@ -0,0 +1,203 @@
+"""
+多进程分区并行扫描
+    - 按分区字段把表切为N个范围: min/max 等分(数值字段) 或 抽样分位数
+    - 每个worker进程通过 Database(dsn) 打开一个连接, iter_query 流式读取各自的范围
+    - fn 在worker进程中处理一个分区的行迭代器, 返回值在主进程中 reduce 合并
+
+    Usage:
+        def count_paid(rows):  # 需为模块级函数, 可被pickle
+            return sum(1 for row in rows if row["paid"])
+
+        total = db.table_parallel_scan("orders", "id", count_paid, workers=8, reduce=operator.add)
+
+    - 分区字段需有索引, NULL值不会被扫描到
+    - SQLite 需为文件数据库, :memory: 无法跨进程共享
+"""
+
+import functools, numbers, os  #
+from concurrent.futures import ProcessPoolExecutor  #
+
+# worker进程内的PyDO对象, 同一进程处理多个分区时复用
+_worker_pydo = None
+
+
+def partition_ranges(
+    pydo,
+    table: str,
+    key: str,
+    partitions: int,
+    params: dict = {},
+    split: str = "minmax",
+    sample_size: int = 10000,
+) -> list:
+    """
+    把分区字段的值域切分为partitions个范围
+
+    Args:
+        pydo: PyDO对象
+        table (str): 表名
+        key (str): 分区字段
+        partitions (int): 分区数
+        params (dict): key = value 条件, 同 table_select
+        split (str): minmax(数值字段按最小/最大值等分, 非数值时改为quantile) / quantile(抽样分位数, 适合分布不均)
+        sample_size (int): quantile 的抽样行数
+
+    Returns:
+        list: [(下界, 上界)], 左闭右开, 首个下界与末个上界为None(不限)
+    """
+    if split not in ["minmax", "quantile"]:
+        raise ValueError(f"unsupport split:{split}, use minmax or quantile")
+
+    cuts = None
+    if split == "minmax":
+        row = _fetch_tuples(pydo, table, f"MIN({key}), MAX({key})", params)[0]
+        if row[0] is None:
+            # 空表
+            return []
+        if _is_number(row[0]) and _is_number(row[1]):
+            cuts = _minmax_cuts(row[0], row[1], partitions)
+
+    if cuts is None:
+        sample = _fetch_tuples(
+            pydo,
+            table,
+            key,
+            params,
+            f" ORDER BY {pydo._random_function} LIMIT {int(sample_size)}",
+        )
+        values = sorted(row[0] for row in sample if row[0] is not None)
+        if len(values) == 0:
+            return []
+        cuts = [values[len(values) * i // partitions] for i in range(1, partitions)]
+
+    bounds = [None] + sorted(set(cuts)) + [None]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+# END partition_ranges
+
+
+def _minmax_cuts(low, high, partitions: int) -> list:
+    # 去掉与下界重合的切分点, 首个分区从 None 开始
+    if isinstance(low, int) and isinstance(high, int):
+        cuts = [low + (high - low) * i // partitions for i in range(1, partitions)]
+    else:
+        cuts = [low + (high - low) * i / partitions for i in range(1, partitions)]
+    return [cut for cut in cuts if cut > low]
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, numbers.Number) and not isinstance(value, bool)
+
+
+def _fetch_tuples(pydo, table: str, columns: str, params: dict, tail: str = "") -> list:
+    sql, parameters = pydo._table_select_sql(table, params)
+    sql = sql.replace("SELECT *", f"SELECT {columns}", 1) + tail
+    cur = pydo._tuple_cursor()
+    pending = pydo._pending_transaction()
+    try:
+        pydo._execute(cur, sql, pydo.parameters_mutate(parameters))
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+
+    # 结束 SELECT 隐式开启的事务, 不丢弃调用方未提交的写入
+    pydo._end_read(pending)
+    return rows
+
+
+def range_sql(
+    pydo, table: str, key: str, bounds: tuple, params: dict = {}
+) -> (str, list):
+    """
+    一个分区的查询语句
+
+    Returns:
+        (str, list): SQL, 参数
+    """
+    sql, parameters = pydo._table_select_sql(table, params)
+    low, high = bounds
+    condition = list()
+    if low is not None:
+        condition.append(f"{key} >= {pydo._placeholder}")
+        parameters.append(low)
+    if high is not None:
+        condition.append(f"{key} < {pydo._placeholder}")
+        parameters.append(high)
+    if condition:
+        sql += (" AND " if params else "WHERE ") + " AND ".join(condition)
+
+    return sql, parameters
+
+
+def parallel_scan(
+    pydo,
+    table: str,
+    key: str,
+    fn,
+    workers: int = None,
+    reduce=None,
+    params: dict = {},
+    split: str = "minmax",
+    batch_size: int = 1000,
+    partitions: int = None,
+    connect_kwargs: dict = None,
+    mp_context=None,
+):
+    """
+    多进程分区扫描, 见 BasePyDO.table_parallel_scan
+
+    Args:
+        pydo: 用于计算分区的PyDO对象, worker以其dsn连接
+        fn (callable): fn(rows) 处理一个分区, rows 为行的迭代器; 需可pickle
+        workers (int, optional): 进程数, 默认 os.cpu_count()
+        reduce (callable, optional): reduce(a, b) 合并各分区结果, 为None时返回各分区结果的list
+        partitions (int, optional): 分区数, 默认等于workers, 数据倾斜时可设为workers的数倍
+        connect_kwargs (dict, optional): worker中 Database(dsn, **connect_kwargs)
+        mp_context (optional): multiprocessing context, 如 multiprocessing.get_context("spawn")
+
+    Returns:
+        reduce 的结果, 或按范围顺序的各分区结果list
+    """
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(
+        workers,
+        mp_context=mp_context,
+        initializer=_init_worker,
+        initargs=(pydo.dsn, connect_kwargs or {}),
+    ) as executor:
+        partitions = partitions or workers
+        ranges = partition_ranges(pydo, table, key, partitions, params, split)
+        statements = [range_sql(pydo, table, key, bounds, params) for bounds in ranges]
+        results = list(
+            executor.map(
+                _scan_partition,
+                [sql for sql, _ in statements],
+                [parameters for _, parameters in statements],
+                [fn] * len(statements),
+                [batch_size] * len(statements),
+            )
+        )
+
+    if reduce is None:
+        return results
+    return functools.reduce(reduce, results) if results else None
+
+
+# END parallel_scan
+
+
+def _init_worker(dsn: str, connect_kwargs: dict) -> None:
+    # 每个worker进程一个连接, 随进程退出关闭
+    from . import Database  #
+
+    global _worker_pydo
+    _worker_pydo = Database(dsn, **connect_kwargs)
+
+
+def _scan_partition(sql: str, parameters: list, fn, batch_size: int):
+    rows = _worker_pydo.iter_query(sql, parameters, batch_size)
+    try:
+        return fn(rows)
+    finally:
+        rows.close()
@@ -0,0 +1,500 @@
+"""
+PyDO 连接池
+    - 每个池内连接都是一个独立的PyDO对象(独立的 _connect 与 _cursor)
+    - 借出时做健康检查(pre_ping), 空闲超时回收, 支持 overflow 临时连接
+    - 等待借出超时抛出 PoolTimeoutError
+
+    Usage:
+        db = Database(dsn, pool=dict(min_size=2, max_size=10, max_overflow=5))
+        db.fetch_all("SELECT * FROM users WHERE id = %s", [1])  # 单次调用自动借还
+
+        with db.connection() as conn:  # 多条语句使用同一连接
+            conn.query(...)
+            conn.cursor().fetchall()
+
+        users = db.table_get_many("users", "id", ids)  # 多批 IN 查询在多个连接上并发
+"""
+
+import inspect, threading, time  #
+from collections import deque  #
+from concurrent.futures import ThreadPoolExecutor  #
+from contextlib import contextmanager  #
+
+from .metrics import EVENTS  #
+
+
+class PoolTimeoutError(TimeoutError):
+    """等待借出连接超时"""
+
+
+class ConnectionPool:
+    """
+    线程安全的PyDO对象池
+
+    Args:
+        factory (callable): 创建PyDO对象的工厂, 无参数
+        min_size (int): 常驻连接数, 空闲回收不会低于此值
+        max_size (int): 池内保留的最大连接数
+        max_overflow (int): 超出max_size可临时创建的连接数, 归还时直接关闭
+        timeout (float): 等待借出的最长秒数, None为一直等待
+        idle_timeout (float): 空闲超过该秒数的连接会被关闭, None为不回收
+        pre_ping (bool): 借出前是否做健康检查
+    """
+
+    def __init__(
+        self,
+        factory,
+        min_size: int = 1,
+        max_size: int = 10,
+        max_overflow: int = 0,
+        timeout: float = 30.0,
+        idle_timeout: float = 300.0,
+        pre_ping: bool = True,
+    ) -> None:
+        if max_size < 1 or min_size < 0 or min_size > max_size or max_overflow < 0:
+            raise ValueError(
+                f"invalid pool size: min_size={min_size}, max_size={max_size}, max_overflow={max_overflow}"
+            )
+
+        self._factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.pre_ping = pre_ping
+
+        # 空闲连接 (pydo, 归还时间), 右侧为最近归还
+        self._idle = deque()
+        # 已创建的连接数(含借出与overflow)
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        for _ in range(min_size):
+            self._idle.append((self._factory(), time.monotonic()))
+            self._size += 1
+
+    # END init
+
+    def acquire(self, timeout: float = None):
+        """
+        借出一个PyDO对象
+
+        Args:
+            timeout (float, optional): 覆盖默认的等待时间
+
+        Raises:
+            PoolTimeoutError: 等待超时
+
+        Returns:
+            PyDO: 独占使用, 用完需 release
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            pydo, expired = None, []
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("connection pool is closed")
+
+                    expired += self._evict_idle()
+                    if self._idle:
+                        # LIFO, 优先复用刚归还的热连接
+                        pydo = self._idle.pop()[0]
+                        break
+                    if self._size < self.max_size + self.max_overflow:
+                        # 先占位, 在锁外创建连接
+                        self._size += 1
+                        break
+
+                    remaining = (
+                        None if deadline is None else deadline - time.monotonic()
+                    )
+                    if remaining is not None and remaining <= 0:
+                        raise PoolTimeoutError(
+                            f"no connection available within {timeout}s (size={self._size})"
+                        )
+                    self._cond.wait(remaining)
+
+            self._close_all(expired)
+
+            if pydo is None:
+                return self._create()
+
+            if not self.pre_ping or pydo.ping():
+                return pydo
+
+            # 健康检查失败: 关闭后重新借
+            self._discard(pydo)
+
+    # END acquire
+
+    def release(self, pydo, discard: bool = False) -> None:
+        """
+        归还PyDO对象
+            - 未结束的事务会被回滚
+            - overflow 连接与池关闭后的连接直接关闭
+
+        Args:
+            pydo: acquire 得到的对象
+            discard (bool): 强制关闭该连接(如已损坏)
+        """
+        if not discard:
+            try:
+                if pydo.inTransaction():
+                    pydo.rollBack()
+                pydo.cursor_close()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            if not discard and not self._closed and self._size <= self.max_size:
+                self._idle.append((pydo, time.monotonic()))
+                self._cond.notify()
+                return
+
+        self._discard(pydo)
+
+    # END release
+
+    @contextmanager
+    def connection(self, timeout: float = None):
+        pydo = self.acquire(timeout)
+        try:
+            yield pydo
+        finally:
+            self.release(pydo)
+
+    def close(self) -> None:
+        """关闭池及所有空闲连接, 借出中的连接在归还时关闭"""
+        with self._cond:
+            self._closed = True
+            idle = [pydo for pydo, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+
+        self._close_all(idle)
+
+    def status(self) -> dict:
+        with self._cond:
+            return dict(
+                size=self._size,
+                idle=len(self._idle),
+                in_use=self._size - len(self._idle),
+                max_size=self.max_size,
+                max_overflow=self.max_overflow,
+            )
+
+    def _create(self):
+        try:
+            return self._factory()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def _discard(self, pydo) -> None:
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+        self._close_all([pydo])
+
+    def _evict_idle(self) -> list:
+        # 需持有锁调用, 返回待关闭的连接(在锁外关闭)
+        expired = []
+        if self.idle_timeout is None:
+            return expired
+
+        now = time.monotonic()
+        while (
+            self._idle
+            and self._size > self.min_size
+            and now - self._idle[0][1] > self.idle_timeout
+        ):
+            expired.append(self._idle.popleft()[0])
+            self._size -= 1
+
+        return expired
+
+    @staticmethod
+    def _close_all(pydos: list) -> None:
+        for pydo in pydos:
+            try:
+                pydo.close()
+            except Exception:
+                pass
+
+
+# END class ConnectionPool
+
+
+class PooledPyDO:
+    """
+    连接池模式的PyDO
+        - 与PyDO相同的 fetch_*/table_* 等方法, 每次调用自动借出/归还连接
+        - beginTransaction 会把连接绑定到当前线程, 直到 commit/rollBack
+        - query 返回的游标属于借出的连接, 需在 connection() 内使用
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        timeout: float = 5.0,
+        min_size: int = 1,
+        max_size: int = 10,
+        max_overflow: int = 0,
+        wait_timeout: float = 30.0,
+        idle_timeout: float = 300.0,
+        pre_ping: bool = True,
+        **kwargs,
+    ) -> None:
+        from . import Database, driver_class  #
+
+        self.dsn = dsn
+        self._class = driver_class(dsn)
+        if self._class.__name__ == "SqlitePyDO":
+            # 池内连接会在不同线程间借用
+            kwargs.setdefault("check_same_thread", False)
+
+        self.pool = ConnectionPool(
+            lambda: Database(dsn, timeout=timeout, **kwargs),
+            min_size=min_size,
+            max_size=max_size,
+            max_overflow=max_overflow,
+            timeout=wait_timeout,
+            idle_timeout=idle_timeout,
+            pre_ping=pre_ping,
+        )
+        self._local = threading.local()
+        # 借出时同步到每个PyDO对象的共享设置, 如结果缓存
+        self._shared = dict()
+        # 连接级设置(返回格式/提交模式): 设置名 => (方法, 参数), 借出时在未同步的连接上重放
+        self._settings = dict()
+        self._settings_version = 0
+        # 并发查询(table_get_many)的线程池, 首次使用时创建
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    # END init
+
+    @contextmanager
+    def connection(self):
+        """
+        在当前线程独占一个连接, 可嵌套, 内层复用外层连接
+
+        Yields:
+            PyDO: 借出的PyDO对象
+        """
+        pinned = getattr(self._local, "pydo", None)
+        if pinned is not None:
+            yield pinned
+            return
+
+        pydo = self._acquire()
+        self._local.pydo = pydo
+        try:
+            yield pydo
+        finally:
+            self._local.pydo = None
+            self.pool.release(pydo)
+
+    # END connection
+
+    def _acquire(self):
+        pydo = self.pool.acquire()
+        for attribute, value in self._shared.items():
+            setattr(pydo, attribute, value)
+        self._apply_settings(pydo)
+        return pydo
+
+    def _apply_settings(self, pydo) -> None:
+        # 新建的连接与设置变更前归还的空闲连接, 在借出时重放全部连接级设置
+        version = self._settings_version
+        if getattr(pydo, "_pool_settings_version", 0) == version:
+            return
+        for method, args in list(self._settings.values()):
+            getattr(pydo, method)(*args)
+        pydo._pool_settings_version = version
+
+    def _configure(self, name: str, method: str, *args) -> bool:
+        # 记录连接级设置, 当前线程已借出的连接立即生效, 其它连接在借出时生效
+        self._settings[name] = (method, args)
+        self._settings_version += 1
+        with self.connection() as pydo:
+            self._apply_settings(pydo)
+        return True
+
+    def setAttribute(self, attribute, value) -> bool:
+        if attribute in ["FETCH_MODE", "AUTO_COMMIT"]:
+            return self._configure(attribute, "setAttribute", attribute, value)
+
+        # 其它配置为全局配置
+        with self.connection() as pydo:
+            return pydo.setAttribute(attribute, value)
+
+    def setFetchMode(self, mode=None):
+        self._configure("FETCH_MODE", "setFetchMode", mode)
+
+    def setAutoCommit(self, mode):
+        self._configure("AUTO_COMMIT", "setAutoCommit", mode)
+
+    def setResultCache(self, cache=None):
+        # 所有池内连接共用同一结果缓存
+        self._shared["_result_cache"] = cache
+
+    def addListener(self, event: str, callback) -> None:
+        # 所有池内连接共用同一组埋点回调
+        if event not in EVENTS:
+            raise ValueError(f"unsupport event:{event}, use one of {EVENTS}")
+        self._shared.setdefault("_listeners", dict()).setdefault(event, []).append(
+            callback
+        )
+
+    def removeListener(self, event: str, callback) -> None:
+        listeners = self._shared.get("_listeners", {}).get(event, [])
+        if callback in listeners:
+            listeners.remove(callback)
+
+    def table_get_many(
+        self,
+        table: str,
+        key: str,
+        values,
+        params: dict = {},
+        chunk_size: int = None,
+        multiple: bool = False,
+    ) -> dict:
+        """
+        同 PyDO.table_get_many, 多批时每批借出一个连接并发查询
+            - 事务中或使用临时表时, 在当前连接上顺序执行
+        """
+        keys = list(dict.fromkeys(values))
+        with self.connection() as pydo:
+            size = pydo._get_many_batch(params, chunk_size)
+            sequential = (
+                len(keys) <= size
+                or pydo.inTransaction()
+                or len(keys) >= int(pydo.attrs["TEMP_TABLE_KEYS"]["DEFAULT"])
+            )
+            if sequential:
+                return pydo.table_get_many(table, key, keys, params, size, multiple)
+
+        def fetch(chunk):
+            with self.connection() as pydo:
+                return pydo.table_get_many(table, key, chunk, params, size, multiple)
+
+        result = dict()
+        # 各批key不重复, 直接合并
+        for part in self._get_executor().map(
+            fetch, self._class._chunk_rows(keys, size)
+        ):
+            result.update(part)
+        return result
+
+    # END table_get_many
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    self.pool.max_size, thread_name_prefix="pydo-pool"
+                )
+            return self._executor
+
+    def __getattr__(self, name):
+        attr = getattr(self._class, name)
+        if not callable(attr):
+            return attr
+
+        if inspect.isgeneratorfunction(attr):
+            # 生成器(如 iter_query)在迭代期间独占连接, 结束后归还
+            def stream(*args, **kwargs):
+                pinned = getattr(self._local, "pydo", None)
+                if pinned is not None:
+                    yield from getattr(pinned, name)(*args, **kwargs)
+                    return
+
+                pydo = self._acquire()
+                try:
+                    yield from getattr(pydo, name)(*args, **kwargs)
+                finally:
+                    self.pool.release(pydo)
+
+            stream.__name__ = name
+            return stream
+
+        def method(*args, **kwargs):
+            with self.connection() as pydo:
+                return getattr(pydo, name)(*args, **kwargs)
+
+        method.__name__ = name
+        return method
+
+    ##事务包装 Start
+    def beginTransaction(self):
+        if getattr(self._local, "pydo", None) is not None:
+            self._local.pydo.beginTransaction()
+            return
+
+        pydo = self._acquire()
+        try:
+            pydo.beginTransaction()
+        except BaseException:
+            self.pool.release(pydo)
+            raise
+        self._local.pydo = pydo
+        self._local.owned = True
+
+    def commit(self):
+        self._end_transaction("commit")
+
+    def rollBack(self):
+        self._end_transaction("rollBack")
+
+    def inTransaction(self):
+        pydo = getattr(self._local, "pydo", None)
+        return pydo is not None and pydo.inTransaction()
+
+    @contextmanager
+    def transaction(self):
+        """事务上下文, 期间当前线程固定使用同一连接, 嵌套时使用 SAVEPOINT"""
+        with self.connection() as pydo:
+            with pydo.transaction():
+                yield self
+
+    @contextmanager
+    def batch(self, commit_every: int = 1000):
+        """批量提交上下文, 期间当前线程固定使用同一连接"""
+        with self.connection() as pydo:
+            with pydo.batch(commit_every):
+                yield self
+
+    def _end_transaction(self, action: str):
+        pydo = getattr(self._local, "pydo", None)
+        if pydo is None:
+            raise RuntimeError("not in transaction")
+
+        try:
+            getattr(pydo, action)()
+        finally:
+            # 仅释放由 beginTransaction 借出的连接, connection() 内的交给上下文
+            if getattr(self._local, "owned", False):
+                self._local.pydo = None
+                self._local.owned = False
+                self.pool.release(pydo)
+
+    ##事务包装 End
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self.pool.close()
+
+
+# END class PooledPyDO
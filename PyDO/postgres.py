@@ -2,24 +2,38 @@
 Psycopg2 对象
     link: https://www.psycopg.org/docs/usage.html
 
+    - 连接池: 见 pool.PooledPyDO, Database(dsn, pool=dict(...))
+
     - #TODO:
-        - 1 连接池
-            https://www.psycopg.org/docs/pool.html
-        - 2 JSON数据
+        - 1 JSON数据
             要操作PostgreSQL数据库中的JSON数据类型，您需要在psycopg2中使用以下函数之一：
             psycopg2.extras.Json
             psycopg2.extras.Jsonb
 """
 from .base import BasePyDO  #
+from .bulk import LineStream, copy_stream, copy_text_line  #
+from .statement import statement_cache  #
 
-import psycopg2  #
+import itertools, operator, psycopg2  #
 from psycopg2 import extras  #
-from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT, ISOLATION_LEVEL_DEFAULT  #
+from psycopg2.extensions import (
+    ISOLATION_LEVEL_AUTOCOMMIT,
+    ISOLATION_LEVEL_DEFAULT,
+    TRANSACTION_STATUS_IDLE,
+)  #
 
 
 class PostgresPyDO(BasePyDO):
     # sql占位符
     _placeholder = "%s"
+    # 绑定参数上限
+    _max_parameters = 65535
+    # COPY 每次读取的字节数
+    _copy_buffer_size = 1 << 20
+    # 命名游标序号
+    _stream_counter = itertools.count()
+    # ON CONFLICT 需冲突字段
+    _conflict_required = True
 
     attrs = dict(
         # 提交模式
@@ -31,11 +45,17 @@ class PostgresPyDO(BasePyDO):
         ),
     )
 
-    def __init__(self, dsn: str) -> None:
+    def __init__(self, dsn: str, **kwargs) -> None:
         super().__init__(dsn)
+        self._kwargs = kwargs
+        self._connect = self._open_connect()
+
+    def _open_connect(self):
         ##返回格式
         cursor_factory = self.getCursorFactory(self.attrs["FETCH_MODE"]["DICT"])
-        self._connect = psycopg2.connect(dsn=dsn, cursor_factory=cursor_factory)
+        return psycopg2.connect(
+            dsn=self.dsn, cursor_factory=cursor_factory, **self._kwargs
+        )
 
     # END init
 
@@ -48,10 +68,47 @@ class PostgresPyDO(BasePyDO):
 
     # END version
 
+    def ping(self) -> bool:
+        if self._connect.closed:
+            return False
+
+        return super().ping()
+
+    def _pending_transaction(self) -> bool:
+        # 含隐式开启的事务与事务中出错(INERROR)
+        return self._connect.get_transaction_status() != TRANSACTION_STATUS_IDLE
+
+    def _is_disconnect(self, error: Exception) -> bool:
+        # 服务端断开后 connection.closed 非0
+        return isinstance(
+            error, (psycopg2.OperationalError, psycopg2.InterfaceError)
+        ) and (self._connect is None or self._connect.closed != 0)
+
+    def _is_retryable(self, error: Exception) -> bool:
+        # 40001: serialization_failure; 40P01: deadlock_detected
+        return getattr(error, "pgcode", None) in ["40001", "40P01"]
+
     ##查询DQL/DML Start
     def exec(self, sql: str, parameters=None) -> int:
         return self._lazycommit(super().exec(sql, parameters))
 
+    def _stream_cursor(self, batch_size: int):
+        # 命名游标即服务端游标, 自动提交模式下需 withhold
+        # see: https://www.psycopg.org/docs/usage.html#server-side-cursors
+        _connect = self.connect()
+        cur = _connect.cursor(
+            name=f"pydo_stream_{next(self._stream_counter)}",
+            withhold=_connect.autocommit,
+        )
+        cur.itersize = batch_size
+        return cur
+
+    def _stream_close(self):
+        # 结束命名游标所在的隐式事务
+        if not self.inTransaction() and not self.connect().autocommit:
+            self.connect().commit()
+            self._flush_dirty()
+
     ##查询DQL/DML End
 
     ##快捷的table操作 Start
@@ -59,48 +116,257 @@ class PostgresPyDO(BasePyDO):
     def table_insert(self, table: str, row, returning: list = []) -> int:
         return self.table_inserts(table, row, returning)
 
-    def table_inserts(self, table: str, rows: dict, returning: list = []) -> any:
-        # 预设插入数据行数
-        len_rows = 0
+    def table_inserts(
+        self,
+        table: str,
+        rows: dict | list,
+        returning: list = [],
+        use_replace: bool = False,
+        use_ignore: bool = False,
+    ) -> any:
+        """
+        table快捷插入, 支持 RETURNING
 
-        if isinstance(rows, dict):
-            fields = list(rows.keys())
-            len_rows = 1
-        elif isinstance(rows, list):
-            fields = list(rows[0].keys())
-            len_rows = len(fields)
-        else:
-            raise ValueError(f"param:rows only suport dict and list")
+        Returns:
+            int: 无returning时返回修改的行数
+            dict/list: returning 的结果, dict输入返回单行
+        """
+        fields, encoder = self._insert_fields(table, rows)
+        head, tail = self._insert_sql(table, fields, use_replace, use_ignore)
 
-        places = list(map(lambda x: self._placeholder, fields))
-        sql = f"INSERT INTO {table} ({', '.join(fields)}) values ({', '.join(places)})"
+        if len(returning) == 0:
+            return self._insert_values(head, fields, rows, tail, encoder=encoder)
 
         # sql add returning
-        use_return = False
-        if len(returning) > 0:
-            use_return = True
-            sql = f"{sql} RETURNING {', '.join(returning)}"
+        tail = f"{tail} RETURNING {', '.join(returning)}"
+        result = self._insert_values(
+            head, fields, rows, tail, returning=True, encoder=encoder
+        )
+        if len(result) == 0:
+            return 0
+
+        return result[0] if isinstance(rows, dict) else result
+
+    def _insert_sql(
+        self,
+        table: str,
+        fields: list,
+        use_replace: bool = False,
+        use_ignore: bool = False,
+    ) -> (str, str):
+        if use_replace:
+            raise ValueError(
+                "PostgreSQL not support REPLACE, use table_inserts_on_duplicate_update"
+            )
+
+        tail = " ON CONFLICT DO NOTHING" if use_ignore else ""
+        return f"INSERT INTO {table} ({', '.join(fields)})", tail
+
+    def table_inserts_on_duplicate_update(
+        self,
+        table: str,
+        rows: dict | list,
+        conflict: str | list = None,
+        update: list = None,
+    ) -> int:
+        """
+        ON CONFLICT ... DO UPDATE
+            - 同一语句中conflict字段重复的行会报错, 多行数据按conflict去重, 保留最后一行
+        """
+        if isinstance(rows, list) and len(rows) > 1:
+            keys = [conflict] if isinstance(conflict, str) else conflict
+            if keys is None:
+                keys = self._primary_key(table)
+            if all(key in rows[0] for key in keys):
+                getter = operator.itemgetter(*keys)
+                rows = list({getter(row): row for row in rows}.values())
+
+        return super().table_inserts_on_duplicate_update(table, rows, conflict, update)
+
+    def _upsert_sql(
+        self, table: str, fields: list, conflict: list = None, update: list = None
+    ) -> (str, str):
+        return self._on_conflict_sql(table, fields, conflict, update)
+
+    ##大对象(large object) Start
+    def blob_open(self, table: str, column: str, rowid: int, readonly: bool = True):
+        raise NotImplementedError(
+            "PostgreSQL bytea not support incremental I/O, use large object: lo_create/lo_iter"
+        )
+
+    def lo_create(self, data=None) -> int:
+        """
+        新建大对象并按块写入data, 数据不会整块进入内存(文件对象)
+
+        Args:
+            data (optional): bytes-like 或有 read 方法的文件对象
+
+        Returns:
+            int: oid, 存入 oid 类型的字段
+        """
+        chunk_size = int(self.attrs["BLOB_CHUNK"]["DEFAULT"])
+
+        def create():
+            lobj = self.connect().lobject(0, "wb")
+            try:
+                if data is not None:
+                    copy_stream(data, lobj, chunk_size)
+                return lobj.oid
+            finally:
+                lobj.close()
 
-        # exec
+        return self._atomic(create)
+
+    def lo_open(self, oid: int, mode: str = "rb"):
+        """
+        打开大对象, 需在事务中使用并在事务结束前 close
+
+        Returns:
+            psycopg2 lobject: read/write/seek/tell/truncate
+            see: https://www.psycopg.org/docs/extensions.html#psycopg2.extensions.lobject
+        """
+        return self.connect().lobject(oid, mode)
+
+    def lo_read(self, oid: int, offset: int = 0, size: int = -1) -> bytes:
+        lobj = self.connect().lobject(oid, "rb")
+        try:
+            lobj.seek(offset)
+            return lobj.read(size)
+        finally:
+            lobj.close()
+            self._stream_close()
+
+    def lo_iter(self, oid: int, chunk_size: int = None):
+        """
+        按块流式读取大对象
+
+        Yields:
+            bytes: 每块不超过 chunk_size(默认 BLOB_CHUNK) 字节
+        """
+        chunk_size = int(chunk_size or self.attrs["BLOB_CHUNK"]["DEFAULT"])
+        lobj = self.connect().lobject(oid, "rb")
+        try:
+            while True:
+                chunk = lobj.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            lobj.close()
+            self._stream_close()
+
+    def lo_write(self, oid: int, data, offset: int = 0) -> int:
+        """从offset处写入已有大对象, 可超出原长度"""
+        chunk_size = int(self.attrs["BLOB_CHUNK"]["DEFAULT"])
+
+        def write():
+            lobj = self.connect().lobject(oid, "wb")
+            try:
+                lobj.seek(offset)
+                return copy_stream(data, lobj, chunk_size)
+            finally:
+                lobj.close()
+
+        return self._atomic(write)
+
+    def lo_unlink(self, oid: int) -> None:
+        # 删除大对象; 删除引用它的行不会自动删除大对象
+        self._atomic(lambda: self.connect().lobject(oid, "n").unlink())
+
+    ##大对象(large object) End
+
+    def _columns_sql(self, table: str) -> (str, list):
+        # to_regclass: 表不存在时为NULL, 不会中断当前事务
+        sql = (
+            "SELECT a.attname, format_type(a.atttypid, a.atttypmod), NOT a.attnotnull, "
+            "COALESCE(a.attnum = ANY(i.indkey), false) FROM pg_attribute a "
+            "LEFT JOIN pg_index i ON i.indrelid = a.attrelid AND i.indisprimary "
+            "WHERE a.attrelid = to_regclass(%s) AND a.attnum > 0 AND NOT a.attisdropped "
+            "ORDER BY a.attnum"
+        )
+        return sql, [table]
+
+    def table_bulk_load(self, table: str, rows, columns: list = None) -> int:
+        """
+        大批量导入: COPY ... FROM STDIN, 由生成器流式编码为 text 格式
+            see: https://www.psycopg.org/docs/cursor.html#cursor.copy_expert
+        """
+        columns, parameters = self._bulk_rows(table, rows, columns)
+
+        sql = f"COPY {table}"
+        if columns is not None:
+            sql += f" ({', '.join(columns)})"
+        sql += " FROM STDIN"
+
+        stream = LineStream(copy_text_line(row) for row in parameters)
         cur = self.cursor()
-        rows = self.parameters_mutate(rows)
-        if len_rows > 1:
-            cur.executemany(sql, rows)
-        else:
-            cur.execute(sql, rows)
+        try:
+            self._execute(
+                cur,
+                sql,
+                stream,
+                lambda sql, stream: cur.copy_expert(
+                    sql, stream, self._copy_buffer_size
+                ),
+            )
+        except BaseException:
+            if not self.inTransaction():
+                self.connect().rollback()
+                self._flush_dirty()
+            raise
 
-        # lazycommit
-        self._lazycommit(cur.rowcount)
+        return self._lazycommit(stream.lines)
 
-        if cur.rowcount == 0 or use_return is False:
-            return 0
+    def _update_rows(
+        self, table: str, keys: list, fields: list, parameters, chunk_size: int = None
+    ) -> int:
+        """
+        UPDATE ... FROM (VALUES ...) 分批更新
+            - VALUES 前 UNION 一个空的 SELECT, 使各列按目标表字段类型解析
+        """
+        columns = keys + fields
+        batch = int(chunk_size or self.attrs["INSERT_BATCH"]["DEFAULT"])
+        size = max(1, min(batch, self._max_parameters // len(columns)))
 
-        # returning
-        return cur.fetchall() if len_rows > 1 else cur.fetchone()
+        def update_sql(length: int) -> str:
+            places = f"({', '.join([self._placeholder] * len(columns))})"
+            updation = ", ".join(f"{field} = pydo_v.{field}" for field in fields)
+            condition = " AND ".join(f"pydo_t.{k} = pydo_v.{k}" for k in keys)
+            return (
+                f"UPDATE {table} AS pydo_t SET {updation} "
+                f"FROM (SELECT {', '.join(columns)} FROM {table} WHERE false "
+                f"UNION ALL VALUES {', '.join([places] * length)}) AS pydo_v "
+                f"WHERE {condition}"
+            )
+
+        rowcount, cur = 0, self.cursor()
+        for chunk in self._chunk_rows(parameters, size):
+            sql = statement_cache.get(
+                (
+                    "updates",
+                    self._placeholder,
+                    table,
+                    tuple(keys),
+                    tuple(fields),
+                    len(chunk),
+                ),
+                lambda: update_sql(len(chunk)),
+            )
+            self._execute(cur, sql, list(itertools.chain.from_iterable(chunk)))
+            rowcount += cur.rowcount
+
+        return rowcount
 
     ##快捷的table操作 End
 
     ##配置 Start
+    def _tuple_cursor(self):
+        return self.connect().cursor(cursor_factory=psycopg2.extensions.cursor)
+
+    def _column_typecode(self, column) -> str:
+        # type_code 为类型OID, see: pg_type
+        return _TYPECODES.get(column.type_code)
+
     def getCursorFactory(self, mode=None):
         ##see: https://www.psycopg.org/docs/extras.html
         cursor_factory = None
@@ -123,3 +389,14 @@ class PostgresPyDO(BasePyDO):
 
 
 # END class
+
+# 列式结果的类型OID => array typecode
+_TYPECODES = {
+    16: "b",  # bool
+    20: "q",  # int8
+    21: "q",  # int2
+    23: "q",  # int4
+    26: "q",  # oid
+    700: "d",  # float4
+    701: "d",  # float8
+}
@@ -0,0 +1,475 @@
+"""
+读写分离
+    - 一个主库 + 多个只读从库, 每个节点是一个 PyDO/PooledPyDO 对象
+    - 只读方法(fetch_*/table_select/table_get_many/iter_query...)按负载均衡发往从库, 其余发往主库
+    - query() 发往主库, 之后 cursor() 取到的是同一连接的游标
+    - 事务/batch() 中, 以及当前线程写入后 sticky_seconds 秒内, 读请求固定发往主库(读到自己的写入)
+    - 从库执行失败且健康检查不通过时摘除 eject_seconds 秒, 本次读请求改发其它从库或主库
+
+    Usage:
+        db = Database(
+            "mysql://u:p@primary/app",
+            replicas=["mysql://u:p@replica1/app", ("mysql://u:p@replica2/app", 2)],
+            pool=dict(max_size=10),
+            routing=dict(balance="least_outstanding", sticky_seconds=1.0),
+        )
+        db.fetch_all("SELECT * FROM users")  # 从库
+        db.table_update("users", {"id": 1}, {"name": "x"})  # 主库
+        db.table_select("users", {"id": 1})  # sticky_seconds 内仍读主库
+
+        with db.primary() as conn:  # 强制读主库
+            conn.table_select("users", {"id": 1})
+"""
+
+import inspect, random, re, threading, time  #
+from contextlib import contextmanager  #
+
+from .cache import is_write_sql  #
+from .metrics import EVENTS  #
+
+# 可发往从库的方法
+READ_METHODS = frozenset(
+    [
+        "fetch_all",
+        "fetch_one",
+        "fetch_columns",
+        "iter_query",
+        "table_select",
+        "table_get_many",
+        "table_paginate",
+        "table_parallel_scan",
+    ]
+)
+
+# 首个参数为SQL的方法, 写语句与加锁读发往主库
+_SQL_METHODS = frozenset(
+    ["query", "fetch_all", "fetch_one", "fetch_columns", "iter_query"]
+)
+
+# 加锁读: SELECT ... FOR UPDATE / FOR SHARE / LOCK IN SHARE MODE
+_LOCKING_READ = re.compile(
+    r"\bFOR\s+(UPDATE|SHARE|NO\s+KEY\s+UPDATE|KEY\s+SHARE)\b|\bLOCK\s+IN\s+SHARE\s+MODE\b",
+    re.IGNORECASE,
+)
+
+BALANCES = ("least_outstanding", "weighted")
+
+
+class Replica:
+    """
+    一个从库节点
+
+    Args:
+        pydo: PyDO/PooledPyDO 对象
+        weight (float): 权重
+    """
+
+    def __init__(self, pydo, weight: float = 1) -> None:
+        if weight <= 0:
+            raise ValueError(f"invalid replica weight:{weight}")
+
+        self.pydo = pydo
+        self.weight = weight
+        # 执行中的请求数
+        self.outstanding = 0
+        # 摘除截止时间, None为可用
+        self.ejected_until = None
+        self.failures = 0
+
+    def available(self, now: float) -> bool:
+        # 摘除到期后重新参与负载均衡, 再次失败会再被摘除
+        return self.ejected_until is None or now >= self.ejected_until
+
+
+# END class Replica
+
+
+class RoutingPyDO:
+    """
+    读写分离的PyDO, 对外与PyDO/PooledPyDO方法相同
+
+    Args:
+        dsn (str): 主库 data source name
+        replicas (list): 从库, 元素为 dsn 或 (dsn, weight)
+        balance (str): least_outstanding(按 执行中请求数/权重 最小, 默认) / weighted(按权重随机)
+        sticky_seconds (float): 写入后该线程读主库的秒数, 0为不固定
+        eject_seconds (float): 故障从库的摘除秒数
+        timeout (float): 连接超时
+        pool (dict | bool, optional): 每个节点的连接池参数, 同 Database; 多线程使用时需开启
+        kwargs: 透传给驱动的 connect 方法
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        replicas: list,
+        balance: str = "least_outstanding",
+        sticky_seconds: float = 1.0,
+        eject_seconds: float = 30.0,
+        timeout: float = 5.0,
+        pool: dict | bool = None,
+        **kwargs,
+    ) -> None:
+        from . import Database, driver_class  #
+
+        if balance not in BALANCES:
+            raise ValueError(f"unsupport balance:{balance}, use one of {BALANCES}")
+
+        self.dsn = dsn
+        self._class = driver_class(dsn)
+        self.balance = balance
+        self.sticky_seconds = sticky_seconds
+        self.eject_seconds = eject_seconds
+
+        self.primary_pydo = Database(dsn, timeout=timeout, pool=pool, **kwargs)
+        self.replicas = list()
+        for replica in replicas:
+            replica_dsn, weight = (
+                replica if isinstance(replica, (tuple, list)) else (replica, 1)
+            )
+            self.replicas.append(
+                Replica(
+                    Database(replica_dsn, timeout=timeout, pool=pool, **kwargs), weight
+                )
+            )
+
+        self._lock = threading.Lock()
+        # 线程内状态: pinned(固定主库的嵌套层数), written(最后写入时间)
+        self._local = threading.local()
+
+    # END init
+
+    ##路由 Start
+    def _pinned(self) -> bool:
+        # 是否必须读主库
+        if getattr(self._local, "pinned", 0) > 0 or self.primary_pydo.inTransaction():
+            return True
+
+        written = getattr(self._local, "written", None)
+        return written is not None and time.monotonic() - written < self.sticky_seconds
+
+    def _mark_write(self) -> None:
+        if self.sticky_seconds:
+            self._local.written = time.monotonic()
+
+    def _is_read(self, name: str, args: tuple, kwargs: dict) -> bool:
+        if name in _SQL_METHODS:
+            sql = args[0] if args else kwargs.get("sql", "")
+            if is_write_sql(sql) or _LOCKING_READ.search(sql):
+                return False
+            return True
+
+        if name == "table_get_many":
+            # key数达到 TEMP_TABLE_KEYS 时需建临时表, 只读从库上无法执行
+            values = args[2] if len(args) > 2 else kwargs["values"]
+            limit = int(self.primary_pydo.attrs["TEMP_TABLE_KEYS"]["DEFAULT"])
+            return len(values) < limit or len(dict.fromkeys(values)) < limit
+
+        return name in READ_METHODS
+
+    @staticmethod
+    def _list_values(args: tuple, kwargs: dict) -> (tuple, dict):
+        # table_get_many 的 values 可为生成器, 先转为list再判断key数
+        if len(args) > 2:
+            return args[:2] + (list(args[2]),) + args[3:], kwargs
+        return args, dict(kwargs, values=list(kwargs["values"]))
+
+    def _choose(self, exclude: list):
+        """
+        选择一个从库并占用, 无可用从库时返回None
+
+        Returns:
+            Replica: 需在执行结束后 _done
+        """
+        with self._lock:
+            now = time.monotonic()
+            candidates = [
+                replica
+                for replica in self.replicas
+                if replica not in exclude and replica.available(now)
+            ]
+            if not candidates:
+                return None
+
+            if self.balance == "weighted":
+                replica = random.choices(candidates, [r.weight for r in candidates])[0]
+            else:
+                least = min(r.outstanding / r.weight for r in candidates)
+                replica = random.choice(
+                    [r for r in candidates if r.outstanding / r.weight == least]
+                )
+            replica.outstanding += 1
+            return replica
+
+    # END _choose
+
+    def _done(self, replica: Replica) -> None:
+        # 执行成功, 摘除到期后的从库恢复可用
+        with self._lock:
+            replica.outstanding -= 1
+            replica.ejected_until = None
+            replica.failures = 0
+
+    def _failed(self, replica: Replica) -> bool:
+        """
+        执行失败后检查从库, 连接不可用时摘除
+
+        Returns:
+            bool: 是否已摘除, 是则本次请求可改发其它节点
+        """
+        try:
+            healthy = replica.pydo.ping()
+        except Exception:
+            healthy = False
+
+        with self._lock:
+            replica.outstanding -= 1
+            if healthy:
+                return False
+            replica.failures += 1
+            replica.ejected_until = time.monotonic() + self.eject_seconds
+        return True
+
+    # END _failed
+
+    def _read(self, name: str, args: tuple, kwargs: dict):
+        # 依次尝试从库, 被摘除的从库不再重试, 全部不可用时读主库
+        tried = list()
+        while True:
+            replica = self._choose(tried)
+            if replica is None:
+                return getattr(self.primary_pydo, name)(*args, **kwargs)
+
+            tried.append(replica)
+            try:
+                result = getattr(replica.pydo, name)(*args, **kwargs)
+            except Exception:
+                if self._failed(replica):
+                    continue
+                raise
+            self._done(replica)
+            return result
+
+    # END _read
+
+    def _stream(self, name: str, args: tuple, kwargs: dict):
+        # 生成器在迭代期间占用从库; 已返回行后失败不再改发, 避免重复数据
+        tried = list()
+        while True:
+            replica = self._choose(tried)
+            if replica is None:
+                yield from getattr(self.primary_pydo, name)(*args, **kwargs)
+                return
+
+            tried.append(replica)
+            started = False
+            try:
+                for row in getattr(replica.pydo, name)(*args, **kwargs):
+                    started = True
+                    yield row
+            except GeneratorExit:
+                self._done(replica)
+                raise
+            except Exception:
+                if self._failed(replica) and not started:
+                    continue
+                raise
+            self._done(replica)
+            return
+
+    # END _stream
+
+    def __getattr__(self, name):
+        attr = getattr(self.primary_pydo, name)
+        if not callable(attr):
+            return attr
+
+        if name == "query":
+            # 结果留在执行节点的游标上, 与 cursor()/cursor_close() 一样使用主库
+
+            def query(*args, **kwargs):
+                try:
+                    return attr(*args, **kwargs)
+                finally:
+                    if not self._is_read(name, args, kwargs):
+                        self._mark_write()
+
+            query.__name__ = name
+            return query
+
+        if name in READ_METHODS:
+            generator = inspect.isgeneratorfunction(getattr(self._class, name))
+
+            def route(*args, **kwargs):
+                if name == "table_get_many":
+                    args, kwargs = self._list_values(args, kwargs)
+                if not self._pinned() and self._is_read(name, args, kwargs):
+                    if generator:
+                        return self._stream(name, args, kwargs)
+                    return self._read(name, args, kwargs)
+
+                # 临时表方式的 table_get_many 只是读主库, 不是写入
+                if name != "table_get_many" and not self._is_read(name, args, kwargs):
+                    self._mark_write()
+                return getattr(self.primary_pydo, name)(*args, **kwargs)
+
+            route.__name__ = name
+            return route
+
+        if name == "exec" or name.startswith("table_") or name == "retry_transaction":
+
+            def write(*args, **kwargs):
+                try:
+                    return getattr(self.primary_pydo, name)(*args, **kwargs)
+                finally:
+                    self._mark_write()
+
+            write.__name__ = name
+            return write
+
+        return attr
+
+    # END __getattr__
+
+    @contextmanager
+    def primary(self):
+        """
+        上下文内当前线程的读请求固定发往主库
+
+        Yields:
+            RoutingPyDO: self
+        """
+        self._local.pinned = getattr(self._local, "pinned", 0) + 1
+        try:
+            yield self
+        finally:
+            self._local.pinned -= 1
+
+    ##路由 End
+
+    ##事务包装 Start
+    def beginTransaction(self):
+        self.primary_pydo.beginTransaction()
+        self._local.pinned = getattr(self._local, "pinned", 0) + 1
+        self._local.begun = True
+
+    def commit(self):
+        self._end_transaction("commit")
+
+    def rollBack(self):
+        self._end_transaction("rollBack")
+
+    def inTransaction(self):
+        return self.primary_pydo.inTransaction()
+
+    @contextmanager
+    def transaction(self):
+        """事务上下文, 期间当前线程的读写都发往主库"""
+        with self.primary():
+            try:
+                with self.primary_pydo.transaction():
+                    yield self
+            finally:
+                self._mark_write()
+
+    @contextmanager
+    def batch(self, commit_every: int = 1000):
+        """批量提交上下文, 期间当前线程的读写都发往主库"""
+        with self.primary():
+            try:
+                with self.primary_pydo.batch(commit_every):
+                    yield self
+            finally:
+                self._mark_write()
+
+    def _end_transaction(self, action: str):
+        try:
+            getattr(self.primary_pydo, action)()
+        finally:
+            if getattr(self._local, "begun", False):
+                self._local.begun = False
+                self._local.pinned -= 1
+            self._mark_write()
+
+    ##事务包装 End
+
+    ##配置 Start
+    def _nodes(self) -> list:
+        return [self.primary_pydo] + [replica.pydo for replica in self.replicas]
+
+    def setAttribute(self, attribute, value) -> bool:
+        result = True
+        for pydo in self._nodes():
+            result = pydo.setAttribute(attribute, value) is not False and result
+        return result
+
+    def setFetchMode(self, mode=None):
+        for pydo in self._nodes():
+            pydo.setFetchMode(mode)
+
+    def setResultCache(self, cache=None):
+        # 所有节点共用同一结果缓存, 主库写入即失效从库读到的缓存
+        for pydo in self._nodes():
+            pydo.setResultCache(cache)
+
+    def addListener(self, event: str, callback) -> None:
+        if event not in EVENTS:
+            raise ValueError(f"unsupport event:{event}, use one of {EVENTS}")
+        for pydo in self._nodes():
+            pydo.addListener(event, callback)
+
+    def removeListener(self, event: str, callback) -> None:
+        for pydo in self._nodes():
+            pydo.removeListener(event, callback)
+
+    ##配置 End
+
+    def check_replicas(self) -> int:
+        """
+        对所有从库做健康检查, 可定时调用以提前摘除/恢复从库
+
+        Returns:
+            int: 可用从库数
+        """
+        available = 0
+        for replica in self.replicas:
+            try:
+                healthy = replica.pydo.ping()
+            except Exception:
+                healthy = False
+
+            with self._lock:
+                if healthy:
+                    replica.ejected_until = None
+                    replica.failures = 0
+                    available += 1
+                else:
+                    replica.failures += 1
+                    replica.ejected_until = time.monotonic() + self.eject_seconds
+        return available
+
+    # END check_replicas
+
+    def status(self) -> list:
+        """
+        Returns:
+            list: 每个从库的 weight/outstanding/ejected/failures
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [
+                dict(
+                    weight=replica.weight,
+                    outstanding=replica.outstanding,
+                    ejected=not replica.available(now),
+                    failures=replica.failures,
+                )
+                for replica in self.replicas
+            ]
+
+    def close(self):
+        for pydo in self._nodes():
+            pydo.close()
+
+
+# END class RoutingPyDO
@@ -0,0 +1,240 @@
+"""
+表结构缓存
+    - 每个表的字段(名称/类型/可空/主键)首次使用时从数据库读取一次, 按 (dsn, 表名) 缓存, 连接池内共用
+        SQLite: pragma_table_info; MySQL: information_schema.columns; PostgreSQL: pg_attribute
+    - 开启后 table_* 方法在执行前校验字段名, 拼写错误不必等服务端报错
+    - dict行按表的字段顺序取值(itemgetter), 行内key顺序不同也不会错位
+    - 按字段类型选择参数转换(adapter), 如 JSON 字段的 dict/list => json字符串, 无需转换的字段不做任何处理
+
+    Usage:
+        db.setAttribute("SCHEMA_CACHE", True)  # 默认关闭
+        db.table_schema("users").names  # ('id', 'name', ...)
+        db.refresh_schema("users")  # 经 exec 执行的 ALTER/DROP/CREATE TABLE 会自动失效该表
+"""
+
+import decimal, difflib, json, operator, re, threading, time, uuid  #
+from collections import namedtuple  #
+
+# 一个字段, type 为小写的声明类型
+Column = namedtuple("Column", "name type nullable primary_key")
+
+# 改变表结构的语句, 取出表名
+_DDL_PATTERN = re.compile(
+    r"^\s*(?:ALTER|DROP|CREATE|RENAME)\s+(?:TEMP\w*\s+)?TABLE\s+"
+    r"(?:IF\s+(?:NOT\s+)?EXISTS\s+)?([^\s(]+)",
+    re.IGNORECASE,
+)
+
+
+class TableSchema:
+    """
+    一个表的字段信息
+
+    Args:
+        table (str): 表名
+        columns (list): [Column], 按字段位置
+    """
+
+    def __init__(self, table: str, columns: list) -> None:
+        self.table = table
+        self.columns = columns
+        self.names = tuple(column.name for column in columns)
+        # 小写字段名 => 位置, 字段名比较不区分大小写
+        self.index = {name.lower(): i for i, name in enumerate(self.names)}
+        self.primary_key = [column.name for column in columns if column.primary_key]
+        self.loaded_at = time.monotonic()
+        # (pydo类, 字段) => 行编码函数
+        self._encoders = dict()
+
+    def validate(self, fields) -> None:
+        """
+        Raises:
+            ValueError: 表中不存在的字段
+        """
+        unknown = [field for field in fields if field.lower() not in self.index]
+        if not unknown:
+            return
+
+        hints = list()
+        for field in unknown:
+            close = difflib.get_close_matches(field, self.names, 1)
+            hints.append(f"{field} (did you mean {close[0]}?)" if close else field)
+        raise ValueError(f"unknown column of {self.table}: {', '.join(hints)}")
+
+    def order(self, fields) -> list:
+        """校验后按表的字段顺序排列, 同一组字段得到同一条SQL"""
+        self.validate(fields)
+        return sorted(fields, key=lambda field: self.index[field.lower()])
+
+    def encoder(self, pydo, fields: list):
+        """
+        dict行 => 参数序列的编码函数
+
+        Args:
+            pydo: 由 pydo._column_adapter 选择每个字段的 adapter
+            fields (list): 取值顺序
+
+        Returns:
+            callable: encode(row)
+        """
+        key = (type(pydo), tuple(fields))
+        encode = self._encoders.get(key)
+        if encode is not None:
+            return encode
+
+        adapters = self._adapters(pydo, fields)
+        if len(fields) == 1:
+            (field,) = fields
+            getter = lambda row: (row[field],)
+        else:
+            getter = operator.itemgetter(*fields)
+
+        if not adapters:
+            encode = getter
+        else:
+
+            def encode(row):
+                values = list(getter(row))
+                for i, adapter in adapters:
+                    values[i] = adapter(values[i])
+                return tuple(values)
+
+        self._encoders[key] = encode
+        return encode
+
+    # END encoder
+
+    def adapt_rows(self, pydo, columns: list, rows):
+        """
+        对tuple行的迭代器按字段应用 adapter, 无需转换时原样返回
+        """
+        adapters = self._adapters(pydo, columns)
+        if not adapters:
+            return rows
+
+        def adapt(row):
+            values = list(row)
+            for i, adapter in adapters:
+                values[i] = adapter(values[i])
+            return tuple(values)
+
+        return map(adapt, rows)
+
+    def _adapters(self, pydo, fields: list) -> list:
+        # [(位置, adapter)], 只含需要转换的字段
+        adapters = list()
+        for i, field in enumerate(fields):
+            adapter = pydo._column_adapter(self.columns[self.index[field.lower()]])
+            if adapter is not None:
+                adapters.append((i, adapter))
+        return adapters
+
+    def __repr__(self) -> str:
+        return f"TableSchema({self.table!r}, {list(self.names)})"
+
+
+# END class TableSchema
+
+
+class SchemaCache:
+    """
+    线程安全的表结构缓存, key 为 (dsn, 表名)
+
+    表不存在(或为MySQL临时表等查不到的表)时返回None, 不做校验;
+    该结果同样在 ttl 后重新读取, ttl 为None时不缓存, 之后建的表可以被发现
+    """
+
+    def __init__(self) -> None:
+        # (dsn, 表名) => TableSchema, 表不存在时 columns 为空
+        self._tables = dict()
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def get(self, pydo, table: str, ttl: float = None):
+        """
+        Args:
+            pydo: 缓存未命中时由 pydo._load_columns(table) 读取
+            ttl (float, optional): 超过该秒数重新读取, None为不过期
+
+        Returns:
+            TableSchema | None
+        """
+        key = (pydo.dsn, table)
+        found = self._tables.get(key)
+        if found is not None:
+            # 表不存在时 columns 为空
+            if ttl is None:
+                fresh = bool(found.columns)
+            else:
+                fresh = time.monotonic() - found.loaded_at < ttl
+            if fresh:
+                return found if found.columns else None
+
+        schema = TableSchema(table, pydo._load_columns(table))
+        with self._lock:
+            self._tables[key] = schema
+            self.loads += 1
+        return schema if schema.columns else None
+
+    def invalidate(self, dsn: str = None, table: str = None) -> None:
+        """
+        Args:
+            dsn (str, optional): None为全部数据库
+            table (str, optional): None为该数据库的全部表
+        """
+        with self._lock:
+            for key in list(self._tables):
+                if (dsn is None or key[0] == dsn) and (
+                    table is None or key[1] == table
+                ):
+                    del self._tables[key]
+
+    def invalidate_sql(self, dsn: str, sql: str) -> None:
+        # ALTER/DROP/CREATE TABLE 执行后失效该表
+        if not self._tables:
+            return
+        matched = _DDL_PATTERN.match(sql)
+        if matched:
+            self.invalidate(dsn, matched.group(1).strip('`"[]'))
+
+    def stats(self) -> dict:
+        return dict(tables=len(self._tables), loads=self.loads)
+
+
+# END class SchemaCache
+
+# 全局缓存
+schema_cache = SchemaCache()
+
+
+##字段类型 => adapter Start
+def adapt_json(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def adapt_uuid(value):
+    return str(value) if isinstance(value, uuid.UUID) else value
+
+
+def adapt_decimal(value):
+    # sqlite3 不能绑定 Decimal
+    return float(value) if isinstance(value, decimal.Decimal) else value
+
+
+def column_adapter(column_type: str):
+    """
+    通用的字段类型 => adapter, 驱动相关的见 PyDO._column_adapter
+
+    Returns:
+        callable | None: None为无需转换
+    """
+    if "json" in column_type:
+        return adapt_json
+    if column_type == "uuid":
+        return adapt_uuid
+    return None
+
+
+##字段类型 => adapter End
@@ -0,0 +1,559 @@
+"""
+水平分片(hash sharding)
+    - N个数据库(SQLite文件/MySQL库...)各存一部分行, 按分片字段的值路由: shard_fn(value, N) => 分片序号
+    - 默认 shard_fn 为 crc32(str(value)) % N, 跨进程稳定(内置 hash() 对 str 每个进程不同)
+    - table_* 方法按分片字段路由; 条件中无分片字段时并行发往全部分片后合并结果
+    - 多分片排序查询(orderbydesc/order_by)按排序字段归并, 再取 limit; iter_query/table_paginate 流式归并
+
+    Usage:
+        db = ShardedPyDO(["sqlite:///u0.db", "sqlite:///u1.db"], shard_key="user_id")
+        db.table_inserts("orders", rows)  # 按 user_id 分组写入各分片
+        db.table_select("orders", {"user_id": 1}, limit=-1)  # 单分片
+        db.table_select("orders", {"status": 2}, orderbydesc="ts", limit=10)  # 全部分片, 归并后取前10
+        db.shard(user_id).fetch_all("SELECT ...")  # 指定分片执行任意SQL
+
+    - 跨分片的写入不是原子操作; 需要事务时使用 with db.transaction(user_id) 在单个分片内完成
+"""
+
+import heapq, itertools, zlib  #
+from concurrent.futures import ThreadPoolExecutor  #
+
+from .base import BasePyDO  #
+from .bulk import iter_row_tuples  #
+from .metrics import EVENTS  #
+
+
+def crc32_shard(value, shards: int) -> int:
+    """默认分片函数"""
+    if isinstance(value, bytes):
+        return zlib.crc32(value) % shards
+    return zlib.crc32(str(value).encode("utf-8")) % shards
+
+
+class ShardedPyDO:
+    """
+    分片PyDO
+
+    Args:
+        dsns (list): 各分片的 dsn 或 PyDO/PooledPyDO 对象, 顺序即分片序号, 不可随意调整
+        shard_key (str | dict): 分片字段, 或 {表名: 分片字段}
+        shard_fn (callable, optional): shard_fn(value, N) => 分片序号, 默认 crc32_shard
+        workers (int, optional): 并行查询的线程数, 默认分片数
+        timeout (float): 连接超时
+        pool (dict | bool, optional): 每个分片的连接池参数, 同 Database; 多线程使用时需开启
+        kwargs: 透传给驱动的 connect 方法
+    """
+
+    def __init__(
+        self,
+        dsns: list,
+        shard_key: str | dict = "id",
+        shard_fn=None,
+        workers: int = None,
+        timeout: float = 5.0,
+        pool: dict | bool = None,
+        **kwargs,
+    ) -> None:
+        from . import Database  #
+
+        if len(dsns) == 0:
+            raise ValueError("ShardedPyDO need at least one shard")
+
+        self.shard_key = shard_key
+        self.shard_fn = shard_fn or crc32_shard
+        self.shards = list()
+        for dsn in dsns:
+            if not isinstance(dsn, str):
+                self.shards.append(dsn)
+                continue
+
+            options = dict(kwargs)
+            if dsn.startswith("sqlite") and not pool:
+                # 并行查询在线程池中使用各分片连接
+                options.setdefault("check_same_thread", False)
+            self.shards.append(Database(dsn, timeout=timeout, pool=pool, **options))
+
+        self._workers = workers or len(self.shards)
+        self._executor = None
+
+    # END init
+
+    ##路由 Start
+    def shard_index(self, value) -> int:
+        index = self.shard_fn(value, len(self.shards))
+        if not 0 <= index < len(self.shards):
+            raise ValueError(
+                f"shard_fn return {index}, out of range [0, {len(self.shards)})"
+            )
+        return index
+
+    def shard(self, value):
+        """
+        分片字段值所在的分片
+
+        Returns:
+            PyDO: 该分片的PyDO对象
+        """
+        return self.shards[self.shard_index(value)]
+
+    def _key(self, table: str) -> str:
+        if isinstance(self.shard_key, str):
+            return self.shard_key
+        if table not in self.shard_key:
+            raise ValueError(f"no shard key for table:{table}")
+        return self.shard_key[table]
+
+    def _group(self, values, getter=None) -> dict:
+        # 分片序号 => 该分片的值, 保持原顺序
+        groups = dict()
+        for value in values:
+            key = value if getter is None else getter(value)
+            groups.setdefault(self.shard_index(key), []).append(value)
+        return groups
+
+    def _group_rows(self, table: str, rows, columns: list = None) -> dict:
+        key = self._key(table)
+        if isinstance(rows, dict):
+            rows = [rows]
+
+        def getter(row):
+            if isinstance(row, dict):
+                if key not in row:
+                    raise ValueError(f"row of {table} missing shard key:{key}")
+                return row[key]
+            if columns is None or key not in columns:
+                raise ValueError(
+                    f"tuple rows of {table} need columns with shard key:{key}"
+                )
+            return row[columns.index(key)]
+
+        return self._group(rows, getter)
+
+    def _param_groups(self, table: str, params: dict) -> dict:
+        """
+        按条件中的分片字段拆分
+
+        Returns:
+            dict: 分片序号 => 该分片的条件, 条件无分片字段时为全部分片
+        """
+        key = self._key(table)
+        if key not in params:
+            return {index: params for index in range(len(self.shards))}
+
+        value = params[key]
+        if not isinstance(value, list):
+            return {self.shard_index(value): params}
+
+        return {
+            index: {**params, key: values}
+            for index, values in self._group(list(dict.fromkeys(value))).items()
+        }
+
+    def _all(self, fn) -> dict:
+        return {index: fn for index in range(len(self.shards))}
+
+    def _fanout(self, calls: dict) -> list:
+        """
+        在多个分片上执行
+
+        Args:
+            calls (dict): 分片序号 => fn(pydo)
+
+        Returns:
+            list: 按分片序号排列的结果
+        """
+        items = sorted(calls.items())
+        if len(items) == 1:
+            index, fn = items[0]
+            return [fn(self.shards[index])]
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                self._workers, thread_name_prefix="pydo-shard"
+            )
+        futures = [self._executor.submit(fn, self.shards[index]) for index, fn in items]
+        return [future.result() for future in futures]
+
+    # END _fanout
+
+    ##路由 End
+
+    ##查询DQL Start
+    def exec(self, sql: str, parameters=None) -> int:
+        """在全部分片上执行, 如 CREATE TABLE; 单分片使用 shard(value).exec"""
+        return sum(self._fanout(self._all(lambda pydo: pydo.exec(sql, parameters))))
+
+    def fetch_all(
+        self, sql: str, parameters=None, order_by=None, limit: int = None
+    ) -> list:
+        """
+        全部分片并行查询后合并
+
+        Args:
+            order_by (optional): 各分片结果已按此排序(SQL中的 ORDER BY)时归并排序, 同 table_paginate
+            limit (int, optional): 合并后最多返回的行数
+
+        Returns:
+            list: 行
+        """
+        results = self._fanout(self._all(lambda pydo: pydo.fetch_all(sql, parameters)))
+        return self._merge(results, BasePyDO._order_keys(order_by), limit)
+
+    def fetch_one(self, sql: str, parameters=None, order_by=None):
+        # 无 order_by 时返回序号最小的有结果分片的第一行; 聚合查询(COUNT...)需自行合并 fetch_all 的结果
+        rows = self.fetch_all(sql, parameters, order_by, 1)
+        return rows[0] if rows else None
+
+    def iter_query(
+        self, sql: str, parameters=None, batch_size: int = 1000, order_by=None
+    ):
+        """
+        流式查询全部分片
+            - 无 order_by 时依次读取各分片
+            - 有 order_by 时同时打开各分片的流式游标, 按排序字段归并
+
+        Yields:
+            row: 与 FETCH_MODE 一致的行
+        """
+        streams = [pydo.iter_query(sql, parameters, batch_size) for pydo in self.shards]
+        yield from self._merge_streams(streams, BasePyDO._order_keys(order_by))
+
+    ##查询DQL End
+
+    ##快捷的table操作 Start
+    def table_insert(self, table: str, row) -> int:
+        ((index, _),) = self._group_rows(table, row).items()
+        return self.shards[index].table_insert(table, row)
+
+    def table_inserts(self, table: str, rows: dict | list, **kwargs) -> int:
+        """按分片字段分组, 各分片并行 table_inserts, 返回修改行数之和"""
+        return self._write_rows("table_inserts", table, rows, **kwargs)
+
+    def table_replaces(self, table: str, rows: dict | list) -> int:
+        return self._write_rows("table_replaces", table, rows)
+
+    def table_inserts_ignore(self, table: str, rows: dict | list) -> int:
+        return self._write_rows("table_inserts_ignore", table, rows)
+
+    def table_inserts_on_duplicate_update(
+        self,
+        table: str,
+        rows: dict | list,
+        conflict: str | list = None,
+        update: list = None,
+    ) -> int:
+        return self._write_rows(
+            "table_inserts_on_duplicate_update",
+            table,
+            rows,
+            conflict=conflict,
+            update=update,
+        )
+
+    def table_upsert(
+        self,
+        table: str,
+        rows: dict | list,
+        conflict: str | list = None,
+        update: list = None,
+    ) -> int:
+        return self.table_inserts_on_duplicate_update(table, rows, conflict, update)
+
+    def table_bulk_load(self, table: str, rows, columns: list = None) -> int:
+        if isinstance(rows, dict):
+            # 列式数据先转为行再分组
+            columns, rows = iter_row_tuples(rows, columns)
+        return self._write_rows("table_bulk_load", table, rows, columns=columns)
+
+    def table_updates(
+        self,
+        table: str,
+        key_fields: str | list,
+        rows: dict | list,
+        chunk_size: int = None,
+    ) -> int:
+        groups = self._group_rows(table, rows)
+        calls = {
+            index: lambda pydo, part=part: pydo.table_updates(
+                table, key_fields, part, chunk_size
+            )
+            for index, part in groups.items()
+        }
+        return sum(self._fanout(calls))
+
+    def _write_rows(self, method: str, table: str, rows, **kwargs) -> int:
+        groups = self._group_rows(table, rows, kwargs.get("columns"))
+        calls = {
+            index: lambda pydo, part=part: getattr(pydo, method)(table, part, **kwargs)
+            for index, part in groups.items()
+        }
+        return sum(self._fanout(calls))
+
+    # END _write_rows
+
+    def table_select(self, table: str, params: dict = {}, orderbydesc=None, limit=1):
+        """
+        同 PyDO.table_select, 条件含分片字段时只查对应分片, 否则并行查询全部分片
+            - orderbydesc + limit: 各分片各取前limit行, 归并排序后取前limit行
+
+        Returns:
+            limit =1: 单个结果集(dict)
+            limit >1: 全部结果集(list)
+        """
+        groups = self._param_groups(table, params)
+        order = self._select_order(orderbydesc)
+        one = limit == 1
+
+        def select(pydo, part):
+            rows = pydo.table_select(table, part, orderbydesc, limit)
+            if one:
+                return [] if rows is None else [rows]
+            return rows
+
+        calls = {
+            index: lambda pydo, part=part: select(pydo, part)
+            for index, part in groups.items()
+        }
+        rows = self._merge(
+            self._fanout(calls),
+            order,
+            None if limit in [None, -1, "-1"] else int(limit),
+        )
+        if one:
+            return rows[0] if rows else None
+        return rows
+
+    # END table_select
+
+    def table_get_many(
+        self,
+        table: str,
+        key: str,
+        values,
+        params: dict = {},
+        chunk_size: int = None,
+        multiple: bool = False,
+    ) -> dict:
+        """
+        同 PyDO.table_get_many
+            - key 为分片字段时按分片分组, 各分片只查自己的key
+            - 否则每个分片查询全部key
+            - 各分片并行查询, 结果合并为一个dict
+        """
+        keys = list(dict.fromkeys(values))
+        if key == self._key(table):
+            groups = self._group(keys)
+        else:
+            groups = {index: keys for index in range(len(self.shards))}
+
+        calls = {
+            index: lambda pydo, part=part: pydo.table_get_many(
+                table, key, part, params, chunk_size, multiple
+            )
+            for index, part in groups.items()
+        }
+        result = dict()
+        for part in self._fanout(calls):
+            if not multiple:
+                result.update(part)
+                continue
+            for value, rows in part.items():
+                result.setdefault(value, []).extend(rows)
+        return result
+
+    # END table_get_many
+
+    def table_paginate(
+        self,
+        table: str,
+        params: dict = {},
+        order_by: str | list | tuple = None,
+        page_size: int = 1000,
+        start: tuple = None,
+    ):
+        """
+        同 PyDO.table_paginate, 各分片分别keyset分页, 按 order_by 流式归并
+
+        Yields:
+            row: 与 FETCH_MODE 一致的行
+        """
+        groups = self._param_groups(table, params)
+        streams = [
+            self.shards[index].table_paginate(table, part, order_by, page_size, start)
+            for index, part in sorted(groups.items())
+        ]
+        yield from self._merge_streams(streams, BasePyDO._order_keys(order_by))
+
+    def table_update(
+        self, table: str, whereParams: dict, updateParams: dict, limit=1
+    ) -> int:
+        if self._key(table) in updateParams:
+            raise ValueError(f"can not update shard key:{self._key(table)}")
+
+        groups = self._param_groups(table, whereParams)
+        calls = {
+            index: lambda pydo, part=part: pydo.table_update(
+                table, part, updateParams, limit
+            )
+            for index, part in groups.items()
+        }
+        return sum(self._fanout(calls))
+
+    def table_delete(self, table: str, params: dict = {}, limit: int = None) -> int:
+        # 条件无分片字段时各分片分别 LIMIT
+        groups = self._param_groups(table, params)
+        calls = {
+            index: lambda pydo, part=part: pydo.table_delete(table, part, limit)
+            for index, part in groups.items()
+        }
+        return sum(self._fanout(calls))
+
+    def table_delete_many(
+        self, table: str, key_fields: str | list, values, chunk_size: int = None
+    ) -> int:
+        values = list(dict.fromkeys(values))
+        key = self._key(table)
+        if key_fields == key:
+            groups = self._group(values)
+        elif not isinstance(key_fields, str) and key in key_fields:
+            position = list(key_fields).index(key)
+            groups = self._group(values, lambda value: value[position])
+        else:
+            groups = {index: values for index in range(len(self.shards))}
+
+        calls = {
+            index: lambda pydo, part=part: pydo.table_delete_many(
+                table, key_fields, part, chunk_size
+            )
+            for index, part in groups.items()
+        }
+        return sum(self._fanout(calls))
+
+    ##快捷的table操作 End
+
+    ##合并 Start
+    @staticmethod
+    def _select_order(orderbydesc) -> list:
+        # table_select 的 orderbydesc => [(字段, ASC/DESC)]
+        if orderbydesc is None:
+            return []
+        if isinstance(orderbydesc, str):
+            return [(orderbydesc, "DESC")]
+        return BasePyDO._order_keys(orderbydesc)
+
+    @staticmethod
+    def _sort_key(order: list):
+        # 行 => 可比较的排序值, DESC 字段取反序
+        if len(order) == 0:
+            return None
+
+        def sort_key(row) -> tuple:
+            return tuple(
+                (
+                    _Descending(_row_value(row, k))
+                    if direction == "DESC"
+                    else _row_value(row, k)
+                )
+                for k, direction in order
+            )
+
+        return sort_key
+
+    def _merge(self, results: list, order: list, limit: int = None) -> list:
+        sort_key = self._sort_key(order)
+        if sort_key is None:
+            rows = itertools.chain.from_iterable(results)
+        else:
+            rows = heapq.merge(*results, key=sort_key)
+        return list(rows if limit is None else itertools.islice(rows, limit))
+
+    def _merge_streams(self, streams: list, order: list):
+        sort_key = self._sort_key(order)
+        try:
+            if sort_key is None:
+                for stream in streams:
+                    yield from stream
+            else:
+                yield from heapq.merge(*streams, key=sort_key)
+        finally:
+            for stream in streams:
+                stream.close()
+
+    ##合并 End
+
+    ##事务包装 Start
+    def transaction(self, value):
+        """
+        单个分片内的事务
+
+        Args:
+            value: 分片字段值
+
+        Usage:
+            with db.transaction(user_id) as shard:
+                shard.table_inserts("orders", rows)
+        """
+        return self.shard(value).transaction()
+
+    ##事务包装 End
+
+    ##配置 Start
+    def setAttribute(self, attribute, value) -> bool:
+        result = True
+        for pydo in self.shards:
+            result = pydo.setAttribute(attribute, value) is not False and result
+        return result
+
+    def setFetchMode(self, mode=None):
+        for pydo in self.shards:
+            pydo.setFetchMode(mode)
+
+    def setResultCache(self, cache=None):
+        for pydo in self.shards:
+            pydo.setResultCache(cache)
+
+    def addListener(self, event: str, callback) -> None:
+        if event not in EVENTS:
+            raise ValueError(f"unsupport event:{event}, use one of {EVENTS}")
+        for pydo in self.shards:
+            pydo.addListener(event, callback)
+
+    def removeListener(self, event: str, callback) -> None:
+        for pydo in self.shards:
+            pydo.removeListener(event, callback)
+
+    ##配置 End
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        for pydo in self.shards:
+            pydo.close()
+
+
+# END class ShardedPyDO
+
+
+class _Descending:
+    """反序比较, 用于归并降序字段"""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value) -> None:
+        self.value = value
+
+    def __lt__(self, other) -> bool:
+        return other.value < self.value
+
+    def __eq__(self, other) -> bool:
+        return self.value == other.value
+
+
+def _row_value(row, key: str):
+    # dict/sqlite3.Row 按字段名, namedtuple 按属性; 普通tuple行没有字段名
+    if isinstance(row, tuple):
+        if not hasattr(row, "_fields"):
+            raise ValueError("ordered merge need dict/row/namedtuple FETCH_MODE")
+        return getattr(row, key)
+    return row[key]
@@ -15,16 +15,66 @@ SQLite3 对象
         - 为了操作 JSON 数据类型，你需要安装 sqlite-json1 模块。你可以使用 pip install sqlite-json1 来安装这个模块
             # Query the database
             cursor.execute('SELECT json_extract(data, "$.name") FROM mytable')
+
+    - 性能配置: DSN参数 或 profile 参数设置 PRAGMA
+        sqlite:///data.db?journal_mode=WAL&synchronous=NORMAL&mmap_size=268435456
+        Database("sqlite:///data.db", profile="performance")
+        Database("sqlite:///data.db", profile=dict(journal_mode="WAL", cache_size=-65536))
+
+    - BLOB增量读写(Python 3.11+): 大字段按块读写, 不整块加载到内存
+        rowid = db.blob_insert("files", "data", open("big.bin", "rb"), size, {"name": "big.bin"})
+        for chunk in db.blob_iter("files", "data", rowid): ...
+
+    - 只读连接: 与写连接并存的并发读
+        reader = db.reader()  # mode=ro URI 连接
+        readers = Database("sqlite:///data.db?mode=ro", pool=dict(max_size=8))
 """
 
 from .base import BasePyDO  #
-
-import sqlite3  #
+from .bulk import copy_stream, stream_size  #
+from .schema import adapt_decimal  #
+
+import itertools, re, sqlite3  #
+from collections import namedtuple  #
+from functools import lru_cache  #
+from urllib.parse import parse_qsl, quote, urlencode  #
+
+# 预设的 PRAGMA 组合
+SQLITE_PROFILES = dict(
+    default=dict(),
+    # 读多写少: WAL 读写互不阻塞, 256M mmap, 64M 页缓存
+    performance=dict(
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        mmap_size=268435456,
+        cache_size=-65536,
+        temp_store="MEMORY",
+        busy_timeout=5000,
+    ),
+)
+# 可通过DSN/profile设置的 PRAGMA, 按此顺序执行
+_PRAGMAS = (
+    "journal_mode",
+    "synchronous",
+    "mmap_size",
+    "cache_size",
+    "temp_store",
+    "busy_timeout",
+    "foreign_keys",
+    "wal_autocheckpoint",
+)
+# 数据库文件级的 PRAGMA, 只读连接跳过
+_WRITE_PRAGMAS = ("journal_mode", "wal_autocheckpoint")
+# sqlite URI 参数, 见 https://www.sqlite.org/uri.html
+_URI_OPTIONS = ("mode", "cache", "immutable", "nolock", "vfs", "psow")
+_PRAGMA_VALUE = re.compile(r"^-?[\w]+$")
 
 
 class SqlitePyDO(BasePyDO):
     # sql占位符
     _placeholder = "?"
+    # ON CONFLICT 需冲突字段
+    _conflict_required = True
 
     attrs = dict(
         # 提交模式
@@ -36,16 +86,103 @@ class SqlitePyDO(BasePyDO):
         ),
     )
 
-    def __init__(self, dsn: str, timeout: float = 5.0) -> None:
+    def __init__(
+        self, dsn: str, timeout: float = 5.0, profile: str | dict = None, **kwargs
+    ) -> None:
+        """
+        Args:
+            dsn (str): sqlite:///file?pragma=value&mode=ro
+            timeout (float): 等待锁的秒数
+            profile (str | dict, optional): SQLITE_PROFILES 中的名称, 或 PRAGMA dict; DSN参数优先
+            kwargs: 透传给 sqlite3.connect
+        """
         super().__init__(dsn)
 
-        file = dsn.replace("sqlite:///", "")
-        self._connect = sqlite3.connect(file, timeout=timeout)
+        file, options = self.parse_dsn(dsn)
+        if isinstance(profile, str):
+            if profile not in SQLITE_PROFILES:
+                raise ValueError(
+                    f"unsupport sqlite profile:{profile}, use one of {list(SQLITE_PROFILES)}"
+                )
+            profile = SQLITE_PROFILES[profile]
+        pragmas = dict(profile or {})
+        uri = dict()
+        for k, v in options.items():
+            if k in _URI_OPTIONS:
+                uri[k] = v
+            elif k in _PRAGMAS:
+                pragmas[k] = v
+            else:
+                raise ValueError(f"unsupport sqlite dsn option:{k}")
+
+        self._timeout = timeout
+        self._pragmas = pragmas
+        self._kwargs = kwargs
+        self.read_only = uri.get("mode") == "ro"
+        self._file = file
+        if uri:
+            self._file = f"file:{quote(file)}?{urlencode(uri)}"
+
+        self._connect = self._open_connect()
         ##设置dict返回格式
         self.setAttribute("FETCH_MODE", self.attrs["FETCH_MODE"]["DICT"])
 
     # END init
 
+    def _open_connect(self):
+        kwargs = self._kwargs
+        if self._file.startswith("file:"):
+            kwargs = dict(kwargs, uri=True)
+
+        _connect = sqlite3.connect(self._file, timeout=self._timeout, **kwargs)
+        if hasattr(_connect, "getlimit"):  # python3.11+
+            self._max_parameters = _connect.getlimit(
+                sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER
+            )
+        self._apply_pragmas(_connect, self._pragmas)
+        return _connect
+
+    @staticmethod
+    def parse_dsn(dsn: str) -> (str, dict):
+        """
+        Returns:
+            (str, dict): 文件路径, DSN参数
+        """
+        file = dsn.replace("sqlite:///", "")
+        file, _, query = file.partition("?")
+        return file, dict(parse_qsl(query))
+
+    def _apply_pragmas(self, _connect, pragmas: dict) -> None:
+        cur = _connect.cursor()
+        cur.row_factory = None
+        try:
+            for name in _PRAGMAS:
+                if name not in pragmas or (self.read_only and name in _WRITE_PRAGMAS):
+                    continue
+                value = str(pragmas[name])
+                if not _PRAGMA_VALUE.match(value):
+                    raise ValueError(f"invalid value for PRAGMA {name}: {value}")
+                cur.execute(f"PRAGMA {name} = {value}").fetchall()
+        finally:
+            cur.close()
+
+    def reader(self, **kwargs):
+        """
+        打开同一数据库文件的只读连接(mode=ro), 沿用当前的 PRAGMA 设置
+            - WAL 模式下读连接不会被写事务阻塞
+
+        Returns:
+            SqlitePyDO: 只读PyDO
+        """
+        file, options = self.parse_dsn(self.dsn)
+        options["mode"] = "ro"
+        return SqlitePyDO(
+            f"sqlite:///{file}?{urlencode(options)}",
+            timeout=self._timeout,
+            profile=self._pragmas,
+            **dict(self._kwargs, **kwargs),
+        )
+
     def version(self):
         cur = self.cursor()
         cur.execute("SELECT SQLITE_VERSION() as version")
@@ -53,21 +190,183 @@ class SqlitePyDO(BasePyDO):
         version = row["version"] if isinstance(row, dict) else row[0]
         return f"SQLite {version} (pysqlite2-{sqlite3.version})"
 
+    def _is_disconnect(self, error: Exception) -> bool:
+        # 连接已被 close()
+        return isinstance(error, sqlite3.ProgrammingError) and "closed database" in str(
+            error
+        )
+
+    def _is_retryable(self, error: Exception) -> bool:
+        # SQLITE_BUSY/SQLITE_LOCKED: 超过 timeout 仍未拿到锁
+        code = getattr(error, "sqlite_errorcode", None)  # python3.11+
+        return code is not None and code & 0xFF in [
+            sqlite3.SQLITE_BUSY,
+            sqlite3.SQLITE_LOCKED,
+        ]
+
+    def _pending_transaction(self) -> bool:
+        # 未提交的DML会隐式开启事务
+        return self._connect.in_transaction
+
     ##查询DQL/DML Start
     def exec(self, sql: str, parameters=None) -> int:
         return self._lazycommit(super().exec(sql, parameters))
 
-    def fetch_all(self, sql: str, parameters=None):
-        return self.query(sql, parameters).fetchall()
-
-    def fetch_one(self, sql: str, parameters=None):
-        return self.query(sql, parameters).fetchone()
-
     ##查询DQL/DML End
 
     ##快捷的table操作 Start
-    def table_inserts(self, table: str, rows: dict) -> int:
-        return self._lazycommit(super().table_inserts(table, rows))
+    def _insert_sql(
+        self,
+        table: str,
+        fields: list,
+        use_replace: bool = False,
+        use_ignore: bool = False,
+    ) -> (str, str):
+        action = "INSERT"
+        if use_replace:
+            action += " OR REPLACE"
+        elif use_ignore:
+            action += " OR IGNORE"
+
+        return f"{action} INTO {table} ({', '.join(fields)})", ""
+
+    def _upsert_sql(
+        self, table: str, fields: list, conflict: list = None, update: list = None
+    ) -> (str, str):
+        # UPSERT 需 SQLite 3.24+
+        return self._on_conflict_sql(table, fields, conflict, update)
+
+    def blob_open(self, table: str, column: str, rowid: int, readonly: bool = True):
+        # sqlite3.Blob, see: https://docs.python.org/3/library/sqlite3.html#sqlite3.Connection.blobopen
+        _connect = self.connect()
+        if not hasattr(_connect, "blobopen"):
+            raise NotImplementedError("incremental blob I/O need Python 3.11+")
+        return _connect.blobopen(table, column, rowid, readonly=readonly)
+
+    def blob_insert(
+        self, table: str, column: str, data, size: int = None, params: dict = {}
+    ) -> int:
+        """
+        插入一行, BLOB字段以 zeroblob(size) 预分配后按块写入data
+
+        Args:
+            table (str): 表名
+            column (str): BLOB字段
+            data: bytes-like 或有 read 方法的文件对象
+            size (int, optional): BLOB字节数, bytes-like 默认为其长度, 文件对象默认为剩余长度
+            params (dict): 其它字段
+
+        Returns:
+            int: 新行的 rowid
+        """
+        if size is None:
+            size = stream_size(data)
+
+        fields = list(params) + [column]
+        places = [self._placeholder] * len(params) + [f"zeroblob({self._placeholder})"]
+        sql = f"INSERT INTO {table} ({', '.join(fields)}) VALUES ({', '.join(places)})"
+        chunk_size = int(self.attrs["BLOB_CHUNK"]["DEFAULT"])
+
+        def insert():
+            cur = self._execute(self.cursor(), sql, list(params.values()) + [int(size)])
+            rowid = cur.lastrowid
+            with self.blob_open(table, column, rowid, readonly=False) as blob:
+                copy_stream(data, blob, chunk_size)
+            return rowid
+
+        return self._atomic(insert)
+
+    # END blob_insert
+
+    def _columns_sql(self, table: str) -> (str, list):
+        # pragma_table_info 表值函数需 SQLite 3.16+
+        return (
+            'SELECT name, type, "notnull" = 0, pk > 0 FROM pragma_table_info(?) ORDER BY cid',
+            [table],
+        )
+
+    def _column_adapter(self, column):
+        # REAL/NUMERIC 亲和的字段: sqlite3 不能绑定 Decimal
+        if any(
+            name in column.type
+            for name in ["real", "floa", "doub", "numeric", "decimal"]
+        ):
+            return adapt_decimal
+        return super()._column_adapter(column)
+
+    def table_bulk_load(self, table: str, rows, columns: list = None) -> int:
+        """
+        大批量导入: 同一事务内 executemany 复用预编译语句, 流式消费rows
+            - 非事务中调用时, 导入期间临时设置 synchronous=OFF
+        """
+        columns, parameters = self._bulk_rows(table, rows, columns)
+        first = next(parameters, None)
+        if first is None:
+            return 0
+
+        sql = f"INSERT INTO {table}"
+        if columns is not None:
+            sql += f" ({', '.join(columns)})"
+        sql += f" VALUES ({', '.join([self._placeholder] * len(first))})"
+
+        def execute():
+            cur = self.cursor()
+            self._execute(
+                cur, sql, itertools.chain([first], parameters), cur.executemany
+            )
+            return cur.rowcount
+
+        if self.inTransaction() or self.connect().in_transaction:
+            return self._atomic(execute)
+
+        # PRAGMA synchronous 在事务中无效, 需在BEGIN前设置
+        pragma = self.connect().cursor()
+        pragma.row_factory = None
+        synchronous = pragma.execute("PRAGMA synchronous").fetchone()[0]
+        pragma.execute("PRAGMA synchronous = OFF")
+        try:
+            return self._atomic(execute)
+        finally:
+            pragma.execute(f"PRAGMA synchronous = {int(synchronous)}")
+            pragma.close()
+
+    def _update_rows(
+        self, table: str, keys: list, fields: list, parameters, chunk_size: int = None
+    ) -> int:
+        """
+        每批 executemany 导入临时表, 再 UPDATE ... FROM 临时表
+            - UPDATE FROM 需 SQLite 3.33+, 更早版本使用 CASE 分批更新
+        """
+        if sqlite3.sqlite_version_info < (3, 33, 0):
+            return super()._update_rows(table, keys, fields, parameters, chunk_size)
+
+        columns = keys + fields
+        size = int(chunk_size or self.attrs["INSERT_BATCH"]["DEFAULT"])
+        tmp = f"pydo_rows_{next(self._temp_counter)}"
+        insert = f"INSERT INTO {tmp} VALUES ({', '.join([self._placeholder] * len(columns))})"
+        update = (
+            f"UPDATE {table} SET "
+            + ", ".join(f"{field} = pydo_v.{field}" for field in fields)
+            + f" FROM {tmp} AS pydo_v WHERE "
+            + " AND ".join(f"{table}.{k} = pydo_v.{k}" for k in keys)
+        )
+
+        cur = self.cursor()
+        self._execute(
+            cur,
+            f"CREATE TEMP TABLE {tmp} AS SELECT {', '.join(columns)} FROM {table} WHERE 0",
+        )
+        try:
+            rowcount = 0
+            for chunk in self._chunk_rows(parameters, size):
+                self._execute(cur, insert, chunk, cur.executemany)
+                self._execute(cur, update)
+                rowcount += cur.rowcount
+                self._execute(cur, f"DELETE FROM {tmp}")
+        finally:
+            self._execute(cur, f"DROP TABLE {tmp}")
+
+        return rowcount
 
     ##快捷的table操作 End
 
@@ -105,18 +404,28 @@ class SqlitePyDO(BasePyDO):
     ##事务包装 Start
     def beginTransaction(self):
         cursor = self.cursor()
-        cursor.execute("BEGIN TRANSACTION")
+        if not self.connect().in_transaction:
+            # 已有隐式事务(未提交的DML)时直接沿用
+            cursor.execute("BEGIN TRANSACTION")
         self.in_transaction = True
 
     def rollBack(self):
-        cursor = self.cursor()
-        cursor.execute("ROLLBACK")
-        self.in_transaction = False
-        self.cursor_close()
+        try:
+            self.cursor().execute("ROLLBACK")
+        finally:
+            self.in_transaction = False
+            self._end_batch()
+            self._flush_dirty()
+            self.cursor_close()
 
     ##事务 End
 
     ##配置 Start
+    def _tuple_cursor(self):
+        cur = self.connect().cursor()
+        cur.row_factory = None
+        return cur
+
     def getCursorFactory(self, mode=None):
         cursor_factory = None
         match mode:
@@ -140,15 +449,51 @@ class SqlitePyDO(BasePyDO):
 # END class
 
 
+##行工厂 Start
+# 按 cursor.description 缓存列名与namedtuple类, 每个结果集只计算一次
+_ROW_FACTORY_CACHE_SIZE = 256
+# 最近一次的 (description, fields/class), 同一结果集的 description 是同一对象
+_last_row_fields = (None, None)
+_last_row_class = (None, None)
+
+
+@lru_cache(maxsize=_ROW_FACTORY_CACHE_SIZE)
+def _description_fields(description) -> tuple:
+    return tuple(column[0] for column in description)
+
+
+@lru_cache(maxsize=_ROW_FACTORY_CACHE_SIZE)
+def _fields_namedtuple(fields: tuple):
+    return namedtuple("Row", fields, rename=True)
+
+
+def _row_fields(cursor) -> tuple:
+    global _last_row_fields
+
+    description = cursor.description
+    last = _last_row_fields
+    if last[0] is description:
+        return last[1]
+
+    fields = _description_fields(description)
+    _last_row_fields = (description, fields)
+    return fields
+
+
 def dict_factory(cursor, row):
     # see: https://docs.python.org/3/library/sqlite3.html#sqlite3-howto-row-factory
-    fields = [column[0] for column in cursor.description]
-    return {key: value for key, value in zip(fields, row)}
+    return dict(zip(_row_fields(cursor), row))
 
 
 def namedtuple_factory(cursor, row):
-    from collections import namedtuple  #
+    global _last_row_class
+
+    last = _last_row_class
+    if last[0] is not cursor.description:
+        cls = _fields_namedtuple(_row_fields(cursor))
+        last = _last_row_class = (cursor.description, cls)
+
+    return last[1]._make(row)
+
 
-    fields = [column[0] for column in cursor.description]
-    cls = namedtuple("Row", fields)
-    return cls._make(row)
+##行工厂 End
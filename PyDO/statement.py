@@ -0,0 +1,96 @@
+"""
+编译后SQL语句的LRU缓存
+    - table_* 快捷方法按 (操作, 表名, 字段, orderby, limit) 缓存拼接好的SQL
+    - sql_placeholder 按SQL文本缓存占位符替换结果, 使用单独的缓存(rewrite_placeholder),
+      exec/query 的任意SQL不会挤掉 table_* 的语句
+    - hits/misses 计数可导出: statement_cache.stats(), rewrite_placeholder.cache_info()
+"""
+
+import functools, threading  #
+from collections import OrderedDict  #
+
+
+class StatementCache:
+    """
+    线程安全的LRU缓存
+
+    Args:
+        maxsize (int): 最多缓存的语句数
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """
+        取缓存的语句, 未命中时调用 build() 编译并缓存
+
+        Args:
+            key (tuple): 可hash的缓存键
+            build (callable): 无参数, 返回编译结果
+
+        Returns:
+            编译结果
+        """
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+            else:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+
+        value = build()
+        with self._lock:
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+        return value
+
+    # END get
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return dict(
+                hits=self.hits,
+                misses=self.misses,
+                size=len(self._data),
+                maxsize=self.maxsize,
+                hit_rate=self.hits / total if total else 0.0,
+            )
+
+
+# END class StatementCache
+
+# 进程内共享, 键中包含占位符/驱动类, 各驱动互不影响
+statement_cache = StatementCache()
+
+
+@functools.lru_cache(maxsize=4096)
+def rewrite_placeholder(sql: str, old: str, new: str) -> str:
+    # 同一SQL文本只替换一次; lru_cache 由C实现, 命中时不需要加锁
+    return sql.replace(old, new)
+
+
+def freeze(value):
+    # list/dict 参数转为可hash的缓存键
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(x) for x in value)
+    elif isinstance(value, dict):
+        return tuple((k, freeze(v)) for k, v in value.items())
+
+    return value
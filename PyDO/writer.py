@@ -0,0 +1,226 @@
+"""
+后台批量写入(write-behind)
+    - 多线程调用 write() 把行放入有界队列, 后台线程合并为批量插入, 每批一个事务
+    - 满 max_rows 行或第一行等待超过 max_latency_ms 即写入
+    - 队列满时 write() 阻塞(背压), 超时抛出 TimeoutError
+    - close() 写完队列中的全部行后返回, 进程退出时自动 close
+
+    Usage:
+        writer = BufferedWriter(db, "events", max_rows=1000, max_latency_ms=100)
+        writer.write({"type": 1, "ts": now})  # 任意线程
+        ...
+        writer.close()
+
+    - SQLite 连接默认不能跨线程使用, 传入 dsn 由后台线程自行创建连接, 或使用连接池
+"""
+
+import atexit, logging, queue, threading, time  #
+
+# 通知后台线程退出
+_STOP = object()
+
+
+class BufferedWriter:
+    """
+    后台批量写入器
+
+    Args:
+        pydo: PyDO/PooledPyDO 对象, 或 dsn(在后台线程中 Database(dsn) 创建连接)
+        table (str): 表名
+        max_rows (int): 每批最多行数
+        max_latency_ms (float): 一行在缓冲中最长等待毫秒数
+        max_queue (int, optional): 队列容量, 默认 max_rows * 10
+        method (str): 写入方法, 签名为 method(table, rows), 如 table_inserts/table_upsert/table_bulk_load
+        on_error (callable, optional): on_error(exception, rows), 默认记录日志后丢弃该批
+        metrics (QueryMetrics, optional): 累加 writer_rows/writer_flushes/writer_errors 计数
+    """
+
+    def __init__(
+        self,
+        pydo,
+        table: str,
+        max_rows: int = 1000,
+        max_latency_ms: float = 100,
+        max_queue: int = None,
+        method: str = "table_inserts",
+        on_error=None,
+        metrics=None,
+    ) -> None:
+        if max_rows < 1:
+            raise ValueError(f"invalid max_rows:{max_rows}")
+
+        self.pydo = pydo
+        self.table = table
+        self.max_rows = max_rows
+        self.max_latency = max_latency_ms / 1000
+        self.method = method
+        self.on_error = on_error
+        self.metrics = metrics
+        self.logger = logging.getLogger("PyDO.writer")
+
+        self._queue = queue.Queue(max_queue or max_rows * 10)
+        self._flush_now = threading.Event()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._stats = dict(
+            rows=0,
+            flushes=0,
+            failed_rows=0,
+            last_flush_seconds=0.0,
+            max_flush_seconds=0.0,
+            flush_seconds=0.0,
+        )
+
+        self._thread = threading.Thread(
+            target=self._run, name=f"pydo-writer-{table}", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    # END init
+
+    def write(self, row: dict, timeout: float = None) -> None:
+        """
+        写入一行, 队列满时阻塞
+
+        Args:
+            row (dict): 行数据
+            timeout (float, optional): 最长等待秒数, None为一直等待
+
+        Raises:
+            TimeoutError: 等待超时
+        """
+        if self._closed or not self._thread.is_alive():
+            raise RuntimeError("buffered writer is closed")
+        try:
+            self._queue.put(row, timeout=timeout)
+        except queue.Full:
+            raise TimeoutError(
+                f"buffered writer queue is full ({self._queue.maxsize} rows)"
+            ) from None
+
+    def writes(self, rows, timeout: float = None) -> None:
+        for row in rows:
+            self.write(row, timeout)
+
+    def flush(self) -> None:
+        """立即写入并等待已放入队列的行全部写完"""
+        self._flush_now.set()
+        try:
+            self._queue.join()
+        finally:
+            self._flush_now.clear()
+
+    def close(self, timeout: float = None) -> None:
+        """写完队列中的全部行后停止后台线程, 可重复调用"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+
+        atexit.unregister(self.close)
+        self._flush_now.set()
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: queue_depth, rows, flushes, failed_rows, last/max/avg_flush_seconds
+        """
+        with self._lock:
+            stats = dict(self._stats, queue_depth=self._queue.qsize())
+        flush_seconds = stats.pop("flush_seconds")
+        stats["avg_flush_seconds"] = (
+            flush_seconds / stats["flushes"] if stats["flushes"] else 0.0
+        )
+        return stats
+
+    def _run(self) -> None:
+        pydo = self.pydo
+        if isinstance(pydo, str):
+            from . import Database  #
+
+            pydo = Database(pydo)
+
+        try:
+            stop = False
+            while not stop:
+                row = self._queue.get()
+                if row is _STOP:
+                    self._queue.task_done()
+                    break
+
+                rows = [row]
+                deadline = time.monotonic() + self.max_latency
+                while len(rows) < self.max_rows:
+                    remaining = (
+                        0 if self._flush_now.is_set() else deadline - time.monotonic()
+                    )
+                    try:
+                        row = self._queue.get(timeout=max(0, remaining))
+                    except queue.Empty:
+                        break
+                    if row is _STOP:
+                        stop = True
+                        self._queue.task_done()
+                        break
+                    rows.append(row)
+
+                self._flush(pydo, rows)
+                for _ in rows:
+                    self._queue.task_done()
+        finally:
+            if pydo is not self.pydo:
+                pydo.close()
+
+    # END _run
+
+    def _flush(self, pydo, rows: list) -> None:
+        # 一批一个事务
+        start = time.perf_counter()
+        try:
+            pydo.beginTransaction()
+            try:
+                getattr(pydo, self.method)(self.table, rows)
+            except BaseException:
+                pydo.rollBack()
+                raise
+            pydo.commit()
+        except Exception as e:
+            with self._lock:
+                self._stats["failed_rows"] += len(rows)
+            if self.metrics is not None:
+                self.metrics.incr("writer_errors")
+            if self.on_error is None:
+                self.logger.exception(
+                    "flush %d rows to %s failed", len(rows), self.table
+                )
+                return
+            try:
+                self.on_error(e, rows)
+            except Exception:
+                # 回调异常不能终止后台线程
+                self.logger.exception("on_error callback failed")
+            return
+
+        duration = time.perf_counter() - start
+        with self._lock:
+            stats = self._stats
+            stats["rows"] += len(rows)
+            stats["flushes"] += 1
+            stats["last_flush_seconds"] = duration
+            stats["max_flush_seconds"] = max(stats["max_flush_seconds"], duration)
+            stats["flush_seconds"] += duration
+        if self.metrics is not None:
+            self.metrics.incr("writer_rows", len(rows))
+            self.metrics.incr("writer_flushes")
+
+
+# END class BufferedWriter
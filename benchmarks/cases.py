@@ -0,0 +1,171 @@
+"""
+基准用例
+    - 每个用例 fn(db, scale) 返回 {指标: 数值}
+    - 指标方向见 METRICS: higher 越大越好, lower 越小越好
+"""
+
+import random, time  #
+
+from PyDO.base import BasePyDO  #
+from PyDO.cost import PYDO_ATTRIBUTE  #
+
+TABLE = "pydo_bench"
+
+# 指标名后缀 => 方向
+METRICS = {
+    "_us": "lower",
+    "_ms": "lower",
+    "_per_s": "higher",
+}
+
+
+def direction(metric: str) -> str:
+    for suffix, way in METRICS.items():
+        if metric.endswith(suffix):
+            return way
+    return "lower"
+
+
+def rows(start: int, count: int):
+    return [
+        dict(id=i, name=f"name-{i}", score=i * 0.5, flag=i % 2)
+        for i in range(start, start + count)
+    ]
+
+
+def reset(db, count: int = 0) -> None:
+    db.exec(f"DROP TABLE IF EXISTS {TABLE}")
+    db.exec(
+        f"CREATE TABLE {TABLE} (id INTEGER PRIMARY KEY, name VARCHAR(64), "
+        "score DOUBLE PRECISION, flag INTEGER)"
+    )
+    if count > 0:
+        db.table_bulk_load(TABLE, rows(0, count))
+
+
+def best_of(repeat: int, fn) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+##用例 Start
+def table_select(db, scale: dict) -> dict:
+    # 单行主键查询延迟
+    count = scale["rows"]
+    reset(db, count)
+    rng = random.Random(42)
+    keys = [rng.randrange(count) for _ in range(scale["lookups"])]
+
+    latencies = []
+    for key in keys:
+        start = time.perf_counter()
+        db.table_select(TABLE, {"id": key})
+        latencies.append(time.perf_counter() - start)
+
+    return dict(
+        p50_us=percentile(latencies, 0.50) * 1e6,
+        p99_us=percentile(latencies, 0.99) * 1e6,
+        lookups_per_s=len(keys) / sum(latencies),
+    )
+
+
+def table_inserts(db, scale: dict) -> dict:
+    # 不同批量大小的插入吞吐
+    result = dict()
+    for batch in scale["batches"]:
+        total = max(batch, scale["insert_rows"] // batch * batch)
+        data = rows(0, total)
+        chunks = [data[i : i + batch] for i in range(0, total, batch)]
+
+        def insert():
+            reset(db)
+            for chunk in chunks:
+                db.table_inserts(TABLE, chunk)
+
+        elapsed = best_of(scale["repeat"], insert)
+        result[f"batch{batch}_rows_per_s"] = total / elapsed
+
+    return result
+
+
+def fetch_all(db, scale: dict) -> dict:
+    # 各 FETCH_MODE 全表扫描
+    count = scale["rows"]
+    reset(db, count)
+    result = dict()
+    for name, mode in PYDO_ATTRIBUTE["FETCH_MODE"].items():
+        if name == "DEFAULT":
+            continue
+        db.setAttribute("FETCH_MODE", mode)
+        elapsed = best_of(
+            scale["repeat"], lambda: db.fetch_all(f"SELECT id, name, score, flag FROM {TABLE}")
+        )
+        result[f"{name.lower()}_rows_per_s"] = count / elapsed
+
+    db.setAttribute("FETCH_MODE", PYDO_ATTRIBUTE["FETCH_MODE"]["DICT"])
+    return result
+
+
+def parameters_mutate(db, scale: dict) -> dict:
+    # 纯Python参数转换开销, 与数据库无关
+    data = rows(0, scale["insert_rows"])
+    elapsed = best_of(scale["repeat"], lambda: BasePyDO.parameters_mutate(data))
+    return dict(per_1k_rows_us=elapsed / len(data) * 1000 * 1e6)
+
+
+def commit(db, scale: dict) -> dict:
+    # 每条语句自动提交 vs 单事务
+    count = scale["commits"]
+    data = rows(0, count)
+
+    reset(db)
+    start = time.perf_counter()
+    for row in data:
+        db.table_insert(TABLE, row)
+    autocommit = time.perf_counter() - start
+
+    reset(db)
+    start = time.perf_counter()
+    db.beginTransaction()
+    for row in data:
+        db.table_insert(TABLE, row)
+    db.commit()
+    transaction = time.perf_counter() - start
+
+    return dict(
+        autocommit_per_s=count / autocommit,
+        transaction_per_s=count / transaction,
+        commit_ms=(autocommit - transaction) / count * 1e3,
+    )
+
+
+##用例 End
+
+CASES = dict(
+    table_select=table_select,
+    table_inserts=table_inserts,
+    fetch_all=fetch_all,
+    parameters_mutate=parameters_mutate,
+    commit=commit,
+)
+
+SCALES = dict(
+    quick=dict(
+        rows=20000, lookups=2000, insert_rows=20000, batches=[1, 100, 1000],
+        commits=200, repeat=2,
+    ),
+    full=dict(
+        rows=1000000, lookups=20000, insert_rows=200000,
+        batches=[1, 10, 100, 1000, 10000], commits=2000, repeat=3,
+    ),
+)
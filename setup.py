@@ -17,6 +17,6 @@ if __name__ == '__main__':
         install_requires=['dsnparse'],
         # test dirs
         packages=find_packages(
-            exclude=['packages', 'test'],
+            exclude=['packages', 'test', 'tests', 'tests.*'],
         ),
     )
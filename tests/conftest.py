@@ -0,0 +1,47 @@
+"""
+测试夹具: 每个用例一个临时SQLite文件, 用例结束后恢复全局配置
+"""
+
+import copy  #
+
+import pytest  #
+
+from PyDO import Database  #
+from PyDO.cost import PYDO_ATTRIBUTE  #
+from PyDO.schema import schema_cache  #
+from PyDO.statement import statement_cache  #
+
+USERS_SQL = (
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT NOT NULL, score REAL)"
+)
+
+
+@pytest.fixture(autouse=True)
+def attributes():
+    # PYDO_ATTRIBUTE 为所有PyDO对象共用的全局配置
+    saved = copy.deepcopy(PYDO_ATTRIBUTE)
+    yield
+    PYDO_ATTRIBUTE.clear()
+    PYDO_ATTRIBUTE.update(saved)
+    schema_cache.invalidate()
+    statement_cache.clear()
+
+
+@pytest.fixture
+def dsn(tmp_path):
+    return f"sqlite:///{tmp_path / 'test.db'}"
+
+
+@pytest.fixture
+def db(dsn):
+    pydo = Database(dsn)
+    pydo.exec(USERS_SQL)
+    yield pydo
+    pydo.close()
+
+
+def make_users(count: int, start: int = 1) -> list:
+    return [
+        {"id": i, "name": f"user{i}", "score": float(i)}
+        for i in range(start, start + count)
+    ]
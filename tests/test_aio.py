@@ -0,0 +1,68 @@
+import asyncio  #
+
+import pytest  #
+
+from PyDO.aio import AsyncPyDO  #
+
+from .conftest import USERS_SQL, make_users  #
+
+
+def run(dsn, main, **pool):
+    async def wrapper():
+        async with AsyncPyDO(dsn, pool=dict(pool, max_size=2)) as db:
+            await db.exec(USERS_SQL)
+            await db.table_inserts("users", make_users(10))
+            return await main(db)
+
+    return asyncio.run(wrapper())
+
+
+def test_fetch_and_stream(dsn):
+    async def main(db):
+        row = await db.table_select("users", {"id": 1})
+        stream = db.iter_query("SELECT id FROM users", batch_size=3)
+        rows = [row async for row in stream]
+        return row, rows, db.pool_status()
+
+    row, rows, status = run(dsn, main)
+    assert row["name"] == "user1"
+    assert [r["id"] for r in rows] == list(range(1, 11))
+    assert status["in_use"] == 0
+
+
+def test_transaction(dsn):
+    async def main(db):
+        with pytest.raises(ValueError):
+            async with db.transaction() as conn:
+                await conn.exec("DELETE FROM users")
+                raise ValueError
+        async with db.transaction() as conn:
+            await conn.table_insert("users", {"id": 100, "name": "tx"})
+        return await db.fetch_one("SELECT COUNT(*) AS n FROM users")
+
+    assert run(dsn, main) == {"n": 11}
+
+
+def test_transaction_required(dsn):
+    async def main(db):
+        with pytest.raises(RuntimeError):
+            await db.beginTransaction()
+
+    run(dsn, main)
+
+
+def test_holders_do_not_starve(dsn):
+    # 连接全被事务占用时, 其它调用在事件循环上排队, 不占用线程池
+    async def main(db):
+        async def holder():
+            async with db.transaction() as conn:
+                await asyncio.sleep(0.1)
+                return await conn.fetch_one("SELECT COUNT(*) AS n FROM users")
+
+        async def reader():
+            await asyncio.sleep(0.02)
+            return await db.fetch_one("SELECT COUNT(*) AS n FROM users")
+
+        return await asyncio.gather(holder(), holder(), reader(), reader())
+
+    assert run(dsn, main, wait_timeout=1) == [{"n": 10}] * 4
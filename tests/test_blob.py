@@ -0,0 +1,53 @@
+import hashlib, io, os  #
+
+import pytest  #
+
+FILES_SQL = "CREATE TABLE files (id INTEGER PRIMARY KEY, name TEXT, data BLOB)"
+PAYLOAD = os.urandom(100000)
+
+
+@pytest.fixture
+def files(db):
+    db.exec(FILES_SQL)
+    db.setAttribute("BLOB_CHUNK", 4096)
+    return db
+
+
+def test_blob_insert_and_read(files):
+    rowid = files.blob_insert("files", "data", PAYLOAD, params={"name": "a"})
+    assert files.table_select("files", {"id": rowid})["name"] == "a"
+    assert files.blob_read("files", "data", rowid) == PAYLOAD
+    assert files.blob_read("files", "data", rowid, 10, 5) == PAYLOAD[10:15]
+    assert not files.inTransaction()
+
+
+def test_blob_insert_from_file(files):
+    rowid = files.blob_insert("files", "data", io.BytesIO(PAYLOAD))
+    digest = hashlib.sha256()
+    chunks = 0
+    for chunk in files.blob_iter("files", "data", rowid):
+        digest.update(chunk)
+        chunks += 1
+    assert digest.digest() == hashlib.sha256(PAYLOAD).digest()
+    assert chunks == len(range(0, len(PAYLOAD), 4096))
+
+
+def test_blob_write(files):
+    rowid = files.blob_insert("files", "data", PAYLOAD)
+    assert files.blob_write("files", "data", rowid, memoryview(b"XYZ"), offset=100) == 3
+    assert files.blob_read("files", "data", rowid, 99, 5) == (
+        PAYLOAD[99:100] + b"XYZ" + PAYLOAD[103:104]
+    )
+
+    with pytest.raises(ValueError):
+        files.blob_write("files", "data", rowid, b"toolong", offset=len(PAYLOAD) - 2)
+    assert not files.inTransaction()
+
+
+def test_memoryview_parameter(files):
+    files.exec(
+        "INSERT INTO files (name, data) VALUES (%s, %s)", ["m", memoryview(b"abc")]
+    )
+    assert files.fetch_one("SELECT data FROM files WHERE name = 'm'") == {
+        "data": b"abc"
+    }
@@ -0,0 +1,51 @@
+import io  #
+
+import pytest  #
+
+from PyDO.bulk import copy_stream, copy_text_line, iter_row_tuples, stream_size  #
+
+
+def test_iter_row_tuples_dict_rows():
+    columns, rows = iter_row_tuples([{"a": 1, "b": 2}, {"b": 4, "a": 3}])
+    assert columns == ["a", "b"]
+    assert list(rows) == [(1, 2), (3, 4)]
+
+
+def test_iter_row_tuples_passes_sequences_through():
+    first, second = (1, 2), [3, 4]
+    columns, rows = iter_row_tuples([first, second])
+    assert columns is None
+    assert list(rows) == [first, second]
+
+
+def test_iter_row_tuples_strict():
+    _, rows = iter_row_tuples([{"a": 1}, {"a": 2, "b": 3}])
+    with pytest.raises(ValueError):
+        list(rows)
+
+    # 指定columns时默认忽略多出的字段
+    _, rows = iter_row_tuples([{"a": 1, "b": 2}], ["a"])
+    assert list(rows) == [(1,)]
+
+
+def test_iter_row_tuples_columnar():
+    columns, rows = iter_row_tuples({"a": [1, 2], "b": ["x", "y"]})
+    assert columns == ["a", "b"]
+    assert list(rows) == [(1, "x"), (2, "y")]
+
+
+def test_copy_text_line_escapes():
+    line = copy_text_line((1, None, "a\tb\\c", True, b"\x01\xff"))
+    assert line == b"1\t\\N\ta\\tb\\\\c\t1\t\\\\x01ff\n"
+    assert copy_text_line((b"ab",), bytes_hex=False) == b"ab\n"
+
+
+def test_copy_stream_and_stream_size():
+    target = io.BytesIO()
+    assert copy_stream(b"abcdefg", target, 3) == 7
+    assert target.getvalue() == b"abcdefg"
+
+    source = io.BytesIO(b"0123456789")
+    source.seek(4)
+    assert stream_size(source) == 6
+    assert stream_size(memoryview(b"abc")) == 3
@@ -0,0 +1,74 @@
+import threading  #
+
+import pytest  #
+
+from PyDO import Database  #
+from PyDO.cache import DiskBackend, ResultCache, sql_tables  #
+
+from .conftest import USERS_SQL, make_users  #
+
+SQL = "SELECT name FROM users WHERE id = %s"
+
+
+@pytest.fixture
+def cache():
+    return ResultCache(ttl=60)
+
+
+def test_sql_tables():
+    assert sql_tables("SELECT * FROM a JOIN b ON a.id = b.id") == {"a", "b"}
+    assert sql_tables("UPDATE users SET name = 'x'") == {"users"}
+
+
+def test_hit_and_write_invalidation(db, cache):
+    db.table_inserts("users", make_users(2))
+    db.setResultCache(cache)
+
+    assert db.fetch_one(SQL, [1]) == {"name": "user1"}
+    assert db.fetch_one(SQL, [1]) == {"name": "user1"}
+    assert cache.stats()["hits"] == 1
+
+    db.table_update("users", {"id": 1}, {"name": "changed"})
+    assert db.fetch_one(SQL, [1]) == {"name": "changed"}
+
+
+def test_invalidation_at_commit(dsn, cache):
+    pooled = Database(dsn, pool=dict(min_size=2, max_size=2))
+    pooled.exec(USERS_SQL)
+    pooled.table_inserts("users", make_users(1))
+    pooled.setResultCache(cache)
+    pooled.fetch_one(SQL, [1])
+
+    pooled.beginTransaction()
+    pooled.table_update("users", {"id": 1}, {"name": "changed"})
+    # 提交前另一个连接读到并缓存旧值
+    thread = threading.Thread(target=pooled.fetch_one, args=(SQL, [1]))
+    thread.start()
+    thread.join()
+    pooled.commit()
+
+    assert pooled.fetch_one(SQL, [1]) == {"name": "changed"}
+    pooled.close()
+
+
+def test_invalidation_at_rollback(db, cache):
+    db.table_inserts("users", make_users(1))
+    db.setResultCache(cache)
+
+    db.query("UPDATE users SET name = 'dirty' WHERE id = 1")
+    assert db.fetch_one(SQL, [1]) == {"name": "dirty"}
+    db.rollBack()
+    assert db.fetch_one(SQL, [1]) == {"name": "user1"}
+
+
+def test_disk_backend(db, tmp_path):
+    db.table_inserts("users", make_users(1))
+    cache = ResultCache(DiskBackend(str(tmp_path / "cache.db")), ttl=60)
+    db.setResultCache(cache)
+
+    assert db.fetch_one(SQL, [1]) == {"name": "user1"}
+    assert db.fetch_one(SQL, [1]) == {"name": "user1"}
+    assert cache.stats()["hits"] == 1
+
+    db.table_delete("users", {"id": 1})
+    assert db.fetch_one(SQL, [1]) is None
@@ -0,0 +1,92 @@
+import array  #
+
+import pytest  #
+
+from .conftest import make_users  #
+
+
+def count(db, table: str = "users") -> int:
+    return db.fetch_one(f"SELECT COUNT(*) AS n FROM {table}")["n"]
+
+
+def test_inserts_split_into_batches(db):
+    db.setAttribute("INSERT_BATCH", 2)
+    assert db.table_inserts("users", make_users(5)) == 5
+    assert count(db) == 5
+
+
+def test_insert_single_row_returns_id(db):
+    assert db.table_insert("users", {"name": "a"}) == 1
+    assert db.table_insert("users", {"name": "b"}) == 2
+
+
+def test_inserts_rows_with_different_key_order(db):
+    db.table_inserts(
+        "users",
+        [{"id": 1, "name": "a", "score": 1}, {"score": 2, "id": 2, "name": "b"}],
+    )
+    assert db.fetch_all("SELECT id, name, score FROM users ORDER BY id") == [
+        {"id": 1, "name": "a", "score": 1.0},
+        {"id": 2, "name": "b", "score": 2.0},
+    ]
+
+
+@pytest.mark.parametrize(
+    "rows",
+    [
+        [{"id": 1, "name": "a"}, {"id": 2}],
+        [{"id": 1, "name": "a"}, {"id": 2, "name": "b", "score": 1}],
+        [{"id": 1, "name": "a"}, {"id": 2, "nmae": "b"}],
+    ],
+)
+def test_inserts_reject_mismatched_keys(db, rows):
+    with pytest.raises(ValueError):
+        db.table_inserts("users", rows)
+    assert count(db) == 0
+
+
+def test_upsert_updates_on_conflict(db):
+    db.table_inserts("users", make_users(2))
+    rows = [{"id": 2, "name": "new", "score": 0}, {"id": 3, "name": "c", "score": 3}]
+    db.table_upsert("users", rows, conflict=["id"], update=["name"])
+    assert db.table_select("users", {"id": 2}) == {"id": 2, "name": "new", "score": 2.0}
+    assert count(db) == 3
+
+
+def test_inserts_ignore_and_replace(db):
+    db.table_inserts("users", make_users(1))
+    db.table_inserts_ignore("users", {"id": 1, "name": "x", "score": 0})
+    assert db.table_select("users", {"id": 1})["name"] == "user1"
+    db.table_replaces("users", {"id": 1, "name": "x", "score": 0})
+    assert db.table_select("users", {"id": 1})["name"] == "x"
+
+
+def test_bulk_load_generator_tuples(db):
+    rows = ((i, f"u{i}", i) for i in range(1, 101))
+    assert db.table_bulk_load("users", rows, ["id", "name", "score"]) == 100
+    assert count(db) == 100
+
+
+def test_bulk_load_dict_rows(db):
+    assert db.table_bulk_load("users", make_users(10)) == 10
+    assert count(db) == 10
+
+
+def test_bulk_load_columnar(db):
+    data = {
+        "id": array.array("q", [1, 2, 3]),
+        "name": ["a", "b", "c"],
+        "score": array.array("d", [1.5, 2.5, 3.5]),
+    }
+    assert db.table_bulk_load("users", data) == 3
+    assert db.fetch_one("SELECT score FROM users WHERE id = 2") == {"score": 2.5}
+
+
+def test_bulk_load_columnar_length_mismatch(db):
+    with pytest.raises(ValueError):
+        db.table_bulk_load("users", {"id": [1, 2], "name": ["a"]})
+
+
+def test_parameters_mutate_orders_by_first_row(db):
+    rows = [{"a": 1, "b": 2}, {"b": 4, "a": 3}]
+    assert db.parameters_mutate(rows) == [(1, 2), (3, 4)]
@@ -0,0 +1,45 @@
+import logging  #
+
+from PyDO.metrics import QueryMetrics, SlowQueryLog, fingerprint  #
+
+from .conftest import make_users  #
+
+
+def test_fingerprint():
+    assert fingerprint("SELECT * FROM t WHERE id = 1 AND name = 'x'") == (
+        "SELECT * FROM t WHERE id = ? AND name = ?"
+    )
+    assert fingerprint("SELECT *  FROM t WHERE id IN (?, ?, ?)") == (
+        "SELECT * FROM t WHERE id IN (?+)"
+    )
+
+
+def test_query_metrics(db):
+    metrics = QueryMetrics().install(db)
+    db.table_inserts("users", make_users(5))
+    for i in range(1, 6):
+        db.fetch_one("SELECT * FROM users WHERE id = %s", [i])
+
+    stats = metrics.snapshot()["SELECT * FROM users WHERE id = ?"]
+    assert stats["count"] == 5
+    assert stats["errors"] == 0
+
+    text = metrics.prometheus()
+    assert "# TYPE pydo_query_duration_seconds histogram" in text
+    assert 'le="+Inf"' in text
+
+
+def test_query_metrics_errors(db):
+    metrics = QueryMetrics().install(db)
+    try:
+        db.exec("SELECT * FROM nope")
+    except Exception:
+        pass
+    assert sum(value["errors"] for value in metrics.snapshot().values()) == 1
+
+
+def test_slow_query_log(db, caplog):
+    SlowQueryLog(threshold=0.0).install(db)
+    with caplog.at_level(logging.WARNING, logger="PyDO.slow"):
+        db.fetch_all("SELECT * FROM users")
+    assert any("SELECT * FROM users" in record.message for record in caplog.records)
@@ -0,0 +1,61 @@
+import pytest  #
+
+from PyDO.parallel import partition_ranges  #
+
+from .conftest import make_users  #
+
+
+def count_scores(rows) -> tuple:
+    # 需为模块级函数, 可被pickle
+    count = total = 0
+    for row in rows:
+        count += 1
+        total += row["score"]
+    return count, total
+
+
+def add(a: tuple, b: tuple) -> tuple:
+    return a[0] + b[0], a[1] + b[1]
+
+
+@pytest.fixture
+def users(db):
+    db.table_inserts("users", make_users(1000))
+    return db
+
+
+def test_partition_ranges(users):
+    ranges = partition_ranges(users, "users", "id", 4)
+    assert len(ranges) == 4
+    assert ranges[0][0] is None
+    assert ranges[-1][1] is None
+    for left, right in zip(ranges, ranges[1:]):
+        assert left[1] == right[0]
+
+
+def test_parallel_scan(users):
+    result = users.table_parallel_scan(
+        "users", "id", count_scores, workers=2, reduce=add
+    )
+    assert result == (1000, float(sum(range(1, 1001))))
+
+
+def test_parallel_scan_quantile_and_params(users):
+    results = users.table_parallel_scan(
+        "users",
+        "id",
+        count_scores,
+        workers=2,
+        split="quantile",
+        partitions=3,
+        params={"id": [1, 2, 3]},
+    )
+    assert sum(count for count, _ in results) == 3
+
+
+def test_parallel_scan_keeps_pending_writes(users):
+    users.query("INSERT INTO users (id, name) VALUES (5000, 'pending')")
+    users.table_parallel_scan("users", "id", count_scores, workers=2, reduce=add)
+    assert users.connect().in_transaction
+    users.commit()
+    assert users.table_select("users", {"id": 5000})["name"] == "pending"
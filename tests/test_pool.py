@@ -0,0 +1,86 @@
+import threading  #
+
+import pytest  #
+
+from PyDO import Database  #
+from PyDO.pool import PoolTimeoutError, PooledPyDO  #
+
+from .conftest import USERS_SQL, make_users  #
+
+
+@pytest.fixture
+def pooled(dsn):
+    pydo = Database(dsn, pool=dict(min_size=1, max_size=2, wait_timeout=0.2))
+    pydo.exec(USERS_SQL)
+    pydo.table_inserts("users", make_users(10))
+    yield pydo
+    pydo.close()
+
+
+def test_pool_reuses_connections(pooled):
+    assert isinstance(pooled, PooledPyDO)
+    for i in range(1, 6):
+        assert pooled.table_select("users", {"id": i})["name"] == f"user{i}"
+    status = pooled.pool.status()
+    assert status["in_use"] == 0
+    assert status["size"] == 1
+
+
+def test_fetch_mode_applies_to_every_connection(pooled):
+    pooled.setAttribute("FETCH_MODE", None)
+    results = set()
+
+    def work():
+        for _ in range(20):
+            results.add(type(pooled.fetch_one("SELECT * FROM users WHERE id = 1")))
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {tuple}
+
+    pooled.setFetchMode("dict")
+    assert pooled.fetch_one("SELECT id FROM users WHERE id = 1") == {"id": 1}
+
+
+def test_acquire_timeout(pooled):
+    held = [pooled.pool.acquire(), pooled.pool.acquire()]
+    with pytest.raises(PoolTimeoutError):
+        pooled.pool.acquire(timeout=0.05)
+    for pydo in held:
+        pooled.pool.release(pydo)
+    assert pooled.pool.status()["in_use"] == 0
+
+
+def test_transaction_binds_connection(pooled):
+    with pooled.transaction():
+        pooled.table_update("users", {"id": 1}, {"name": "changed"})
+        assert pooled.table_select("users", {"id": 1})["name"] == "changed"
+        assert pooled.pool.status()["in_use"] == 1
+
+    assert pooled.pool.status()["in_use"] == 0
+    assert pooled.table_select("users", {"id": 1})["name"] == "changed"
+
+
+def test_transaction_rollback(pooled):
+    with pytest.raises(KeyError):
+        with pooled.transaction():
+            pooled.table_delete("users", {"id": 1})
+            raise KeyError("x")
+    assert pooled.table_select("users", {"id": 1})["name"] == "user1"
+
+
+def test_connection_pins_one_pydo(pooled):
+    with pooled.connection() as conn:
+        with pooled.connection() as inner:
+            assert inner is conn
+        conn.query("SELECT id FROM users ORDER BY id")
+        assert conn.cursor().fetchone()["id"] == 1
+
+
+def test_table_get_many_parallel_chunks(pooled):
+    result = pooled.table_get_many("users", "id", range(1, 11), chunk_size=3)
+    assert sorted(result) == list(range(1, 11))
+    assert pooled.pool.status()["in_use"] == 0
@@ -0,0 +1,142 @@
+import pytest  #
+
+from PyDO.statement import rewrite_placeholder, statement_cache  #
+
+from .conftest import make_users  #
+
+
+@pytest.fixture
+def users(db):
+    db.table_inserts("users", make_users(20))
+    return db
+
+
+@pytest.mark.parametrize(
+    "mode, expect",
+    [
+        (None, (1, "user1", 1.0)),
+        ("dict", {"id": 1, "name": "user1", "score": 1.0}),
+    ],
+)
+def test_fetch_mode(users, mode, expect):
+    users.setAttribute("FETCH_MODE", mode)
+    assert users.fetch_one("SELECT * FROM users WHERE id = %s", [1]) == expect
+
+
+def test_fetch_mode_namedtuple_and_row(users):
+    users.setFetchMode("namedtuple")
+    row = users.fetch_one("SELECT id, name FROM users WHERE id = 1")
+    assert (row.id, row.name) == (1, "user1")
+
+    users.setFetchMode("row")
+    row = users.fetch_one("SELECT id, name FROM users WHERE id = 1")
+    assert (row["id"], row["name"]) == (1, "user1")
+
+
+def test_iter_query_streams_in_batches(users):
+    rows = list(users.iter_query("SELECT id FROM users ORDER BY id", batch_size=3))
+    assert [row["id"] for row in rows] == list(range(1, 21))
+
+
+def test_iter_query_does_not_disturb_shared_cursor(users):
+    stream = users.iter_query("SELECT id FROM users ORDER BY id", batch_size=2)
+    assert next(stream)["id"] == 1
+    assert users.fetch_one("SELECT COUNT(*) AS n FROM users")["n"] == 20
+    assert next(stream)["id"] == 2
+    stream.close()
+
+
+def test_fetch_columns(users):
+    columns = users.fetch_columns(
+        "SELECT id, name, score FROM users WHERE id <= 3", use_numpy=False
+    )
+    assert list(columns["id"]) == [1, 2, 3]
+    assert list(columns["name"]) == ["user1", "user2", "user3"]
+    assert list(columns["score"]) == [1.0, 2.0, 3.0]
+
+    users.setAttribute("FETCH_MODE", "columns")
+    result = users.fetch_all("SELECT id FROM users WHERE id <= 2")
+    assert list(result["id"]) == [1, 2]
+
+
+def test_statement_cache_reuses_built_sql(users):
+    users.table_select("users", {"id": 1})
+    misses = statement_cache.stats()["misses"]
+    users.table_select("users", {"id": 2})
+    stats = users.statementCacheStats()
+    assert stats["misses"] == misses
+    assert stats["hits"] >= 1
+
+
+def test_raw_sql_bypasses_statement_cache(users):
+    users.table_select("users", {"id": 1})
+    before = statement_cache.stats()
+    for i in range(50):
+        users.fetch_one(f"SELECT name FROM users WHERE id = {i} AND score > %s", [0])
+    after = statement_cache.stats()
+    assert (after["size"], after["misses"]) == (before["size"], before["misses"])
+    assert rewrite_placeholder.cache_info().currsize > 0
+
+
+def test_table_select_in_list(users):
+    rows = users.table_select("users", {"id": [1, 2, 3]}, limit=10)
+    assert sorted(row["id"] for row in rows) == [1, 2, 3]
+    assert users.table_select("users", {"id": []}, limit=10) == []
+
+
+def test_table_get_many(users):
+    users.setAttribute("IN_BATCH", 3)
+    result = users.table_get_many("users", "id", [1, 5, 5, 7, 99])
+    assert sorted(result) == [1, 5, 7]
+    assert result[5]["name"] == "user5"
+
+
+def test_table_get_many_temp_table(users):
+    users.setAttribute("TEMP_TABLE_KEYS", 5)
+    result = users.table_get_many("users", "id", range(1, 11))
+    assert sorted(result) == list(range(1, 11))
+    tables = users.fetch_all("SELECT name FROM sqlite_temp_master WHERE type = 'table'")
+    assert tables == []
+
+
+def test_table_get_many_multiple(users):
+    users.table_update("users", {"id": 2}, {"name": "user1"})
+    result = users.table_get_many("users", "name", ["user1"], multiple=True)
+    assert sorted(row["id"] for row in result["user1"]) == [1, 2]
+
+
+def test_table_updates(users):
+    rows = [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}, {"id": 99, "name": "z"}]
+    assert users.table_updates("users", "id", rows, chunk_size=2) == 2
+    assert users.table_select("users", {"id": 2})["name"] == "b"
+
+
+def test_table_delete_many(users):
+    assert users.table_delete_many("users", "id", [1, 2, 3, 3], chunk_size=2) == 3
+    assert users.fetch_one("SELECT COUNT(*) AS n FROM users")["n"] == 17
+
+
+def test_table_delete_many_composite_key(users):
+    deleted = users.table_delete_many("users", ["id", "name"], [(1, "user1"), (2, "x")])
+    assert deleted == 1
+
+
+def test_table_paginate(users):
+    rows = list(users.table_paginate("users", {}, "id", page_size=6))
+    assert [row["id"] for row in rows] == list(range(1, 21))
+
+    rows = list(users.table_paginate("users", {}, "id", page_size=6, start=(15,)))
+    assert [row["id"] for row in rows] == list(range(16, 21))
+
+
+def test_table_paginate_mixed_order(users):
+    users.exec("UPDATE users SET score = id % 3")
+    order = [("score", "DESC"), "id"]
+    rows = list(users.table_paginate("users", {}, order, page_size=4))
+    expect = sorted(range(1, 21), key=lambda i: (-(i % 3), i))
+    assert [row["id"] for row in rows] == expect
+
+
+def test_table_paginate_needs_order(users):
+    with pytest.raises(ValueError):
+        list(users.table_paginate("users", {}))
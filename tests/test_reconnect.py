@@ -0,0 +1,48 @@
+import pytest  #
+
+from PyDO.metrics import QueryMetrics  #
+
+from .conftest import make_users  #
+
+
+@pytest.fixture
+def idle(db):
+    db.table_inserts("users", make_users(3))
+    # 每次执行前都做空闲检查
+    db.setAttribute("PING_INTERVAL", 0)
+    return db
+
+
+def test_ping_keeps_pending_writes(idle):
+    idle.query("INSERT INTO users (id, name) VALUES (4, 'user4')")
+    assert idle.ping()
+    assert idle.fetch_one("SELECT COUNT(*) AS n FROM users")["n"] == 4
+    assert idle.connect().in_transaction
+    idle.commit()
+
+
+def test_idle_reconnect_for_private_cursors(idle):
+    idle.original_connect().close()
+    assert [row["id"] for row in idle.iter_query("SELECT id FROM users")] == [1, 2, 3]
+
+    idle.original_connect().close()
+    assert list(idle.fetch_columns("SELECT id FROM users")["id"]) == [1, 2, 3]
+
+
+def test_read_retried_after_disconnect(db):
+    db.table_inserts("users", make_users(3))
+    metrics = QueryMetrics().install(db)
+    db.cursor()
+    db.original_connect().close()
+
+    assert db.fetch_one("SELECT COUNT(*) AS n FROM users")["n"] == 3
+    assert "pydo_reconnects_total 1" in metrics.prometheus()
+
+
+def test_retry_disabled(db):
+    db.setAttribute("RETRY", False)
+    db.cursor()
+    db.original_connect().close()
+    with pytest.raises(Exception):
+        db.fetch_one("SELECT 1")
+    assert db.fetch_one("SELECT 1 AS x") == {"x": 1}
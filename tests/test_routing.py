@@ -0,0 +1,85 @@
+import time  #
+
+import pytest  #
+
+from PyDO import Database  #
+from PyDO.routing import RoutingPyDO  #
+
+from .conftest import USERS_SQL  #
+
+
+@pytest.fixture
+def routed(tmp_path):
+    dsns = []
+    for tag in ["primary", "replica"]:
+        dsn = f"sqlite:///{tmp_path / tag}.db"
+        pydo = Database(dsn)
+        pydo.exec(USERS_SQL)
+        pydo.table_insert("users", {"id": 1, "name": tag})
+        pydo.close()
+        dsns.append(dsn)
+
+    pydo = Database(dsns[0], replicas=[dsns[1]], routing=dict(sticky_seconds=0.1))
+    yield pydo
+    pydo.close()
+
+
+def name(pydo) -> str:
+    return pydo.fetch_one("SELECT name FROM users WHERE id = 1")["name"]
+
+
+def test_reads_go_to_replica(routed):
+    assert isinstance(routed, RoutingPyDO)
+    assert name(routed) == "replica"
+    assert routed.table_select("users", {"id": 1})["name"] == "replica"
+    assert [row["name"] for row in routed.iter_query("SELECT name FROM users")] == [
+        "replica"
+    ]
+
+
+def test_writes_go_to_primary_and_stick(routed):
+    routed.table_insert("users", {"id": 2, "name": "new"})
+    assert name(routed) == "primary"
+    time.sleep(0.15)
+    assert name(routed) == "replica"
+    assert routed.primary_pydo.table_select("users", {"id": 2})["name"] == "new"
+
+
+def test_primary_and_transaction(routed):
+    with routed.primary():
+        assert name(routed) == "primary"
+    with routed.transaction():
+        assert name(routed) == "primary"
+    time.sleep(0.15)
+    assert name(routed) == "replica"
+
+
+def test_temp_table_get_many_uses_primary(routed):
+    routed.setAttribute("TEMP_TABLE_KEYS", 2)
+    result = routed.table_get_many("users", "id", [1, 2, 3])
+    assert result[1]["name"] == "primary"
+
+    routed.setAttribute("TEMP_TABLE_KEYS", 20000)
+    assert routed.table_get_many("users", "id", [1, 2, 3])[1]["name"] == "replica"
+
+
+def test_status(routed):
+    status = routed.status()
+    assert len(status) == 1
+    assert status[0]["ejected"] is False
+    assert routed.check_replicas() == 1
+
+
+def test_invalid_balance(tmp_path):
+    dsn = f"sqlite:///{tmp_path / 'a.db'}"
+    with pytest.raises(ValueError):
+        RoutingPyDO(dsn, [dsn], balance="random")
+
+
+def test_query_and_cursor_use_the_same_node(routed):
+    routed.query("SELECT name FROM users WHERE id = 1")
+    assert routed.cursor().fetchall() == [{"name": "primary"}]
+    assert name(routed) == "replica"
+
+    routed.query("UPDATE users SET name = 'changed' WHERE id = 1")
+    assert name(routed) == "changed"
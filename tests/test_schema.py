@@ -0,0 +1,94 @@
+import decimal, time  #
+
+import pytest  #
+
+from PyDO import Database  #
+from PyDO.schema import schema_cache  #
+
+from .conftest import make_users  #
+
+
+@pytest.fixture
+def checked(db):
+    db.setAttribute("SCHEMA_CACHE", True)
+    return db
+
+
+def test_table_schema(db):
+    assert db.table_schema("users").names == ("id", "name", "score")
+    assert db.table_schema("nope") is None
+
+
+@pytest.mark.parametrize(
+    "call",
+    [
+        lambda pydo: pydo.table_inserts("users", {"id": 1, "nmae": "x"}),
+        lambda pydo: pydo.table_select("users", {"idd": 1}),
+        lambda pydo: pydo.table_update("users", {"id": 1}, {"scroe": 1}),
+        lambda pydo: list(pydo.table_paginate("users", {}, "ids")),
+    ],
+)
+def test_unknown_column(checked, call):
+    with pytest.raises(ValueError, match="did you mean"):
+        call(checked)
+
+
+def test_key_order_and_decimal(checked):
+    rows = [
+        {"score": decimal.Decimal("1.5"), "name": "a", "id": 1},
+        {"id": 2, "name": "b", "score": 2},
+    ]
+    assert checked.table_inserts("users", rows) == 2
+    assert checked.table_select("users", {"id": 1}) == {
+        "id": 1,
+        "name": "a",
+        "score": 1.5,
+    }
+
+
+def test_mismatched_keys_rejected(checked):
+    with pytest.raises(ValueError):
+        checked.table_inserts("users", [{"id": 1, "name": "a"}, {"id": 2}])
+    assert checked.fetch_one("SELECT COUNT(*) AS n FROM users")["n"] == 0
+
+
+def test_missing_table_expires(checked, dsn):
+    checked.attrs["SCHEMA_CACHE"]["TTL"] = 0.05
+    assert checked.table_schema("later") is None
+
+    other = Database(dsn)
+    other.exec("CREATE TABLE later (id INTEGER PRIMARY KEY)")
+    other.close()
+    time.sleep(0.06)
+    assert checked.table_schema("later").names == ("id",)
+
+
+def test_ddl_invalidates(checked):
+    assert checked.table_schema("users").names == ("id", "name", "score")
+    checked.exec("ALTER TABLE users ADD COLUMN extra TEXT")
+    assert checked.table_schema("users").names[-1] == "extra"
+    assert checked.table_inserts("users", make_users(1)) == 1
+
+
+def test_refresh_schema(checked):
+    checked.table_schema("users")
+    loads = schema_cache.loads
+    checked.table_schema("users")
+    assert schema_cache.loads == loads
+
+    checked.refresh_schema("users")
+    checked.table_schema("users")
+    assert schema_cache.loads == loads + 1
+
+
+def test_upsert_primary_key_follows_ddl(db):
+    db.exec("CREATE TABLE kv (k TEXT PRIMARY KEY, n INTEGER, v INTEGER)")
+    db.table_upsert("kv", [{"k": "a", "n": 1, "v": 1}, {"k": "a", "n": 2, "v": 2}])
+    assert db.fetch_all("SELECT n, v FROM kv") == [{"n": 2, "v": 2}]
+
+    # 同样的字段, 主键改为 (k, n)
+    db.exec("DROP TABLE kv")
+    db.exec("CREATE TABLE kv (k TEXT, n INTEGER, v INTEGER, PRIMARY KEY (k, n))")
+    db.table_upsert("kv", [{"k": "a", "n": 1, "v": 1}, {"k": "a", "n": 2, "v": 2}])
+    db.table_upsert("kv", {"k": "a", "n": 2, "v": 3})
+    assert db.fetch_all("SELECT v FROM kv ORDER BY n") == [{"v": 1}, {"v": 3}]
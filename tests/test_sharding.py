@@ -0,0 +1,87 @@
+import pytest  #
+
+from PyDO.sharding import ShardedPyDO, crc32_shard  #
+
+ORDERS_SQL = "CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER, ts INTEGER)"
+
+
+@pytest.fixture
+def sharded(tmp_path):
+    pydo = ShardedPyDO(
+        [f"sqlite:///{tmp_path / f'shard{i}.db'}" for i in range(3)],
+        shard_key="user_id",
+    )
+    pydo.exec(ORDERS_SQL)
+    pydo.table_inserts("orders", ROWS)
+    yield pydo
+    pydo.close()
+
+
+ROWS = [{"id": i, "user_id": i % 7, "ts": (i * 37) % 101} for i in range(1, 201)]
+
+
+def test_rows_distributed_by_shard_key(sharded):
+    counts = [
+        shard.fetch_one("SELECT COUNT(*) AS n FROM orders")["n"]
+        for shard in sharded.shards
+    ]
+    assert sum(counts) == 200
+    for index, shard in enumerate(sharded.shards):
+        for row in shard.fetch_all("SELECT user_id FROM orders"):
+            assert crc32_shard(row["user_id"], 3) == index
+
+
+def test_table_select_single_shard(sharded):
+    rows = sharded.table_select("orders", {"user_id": 3}, limit=-1)
+    assert sorted(row["id"] for row in rows) == [
+        row["id"] for row in ROWS if row["user_id"] == 3
+    ]
+
+
+def test_table_select_merges_order_and_limit(sharded):
+    rows = sharded.table_select("orders", {}, orderbydesc="ts", limit=10)
+    expect = sorted(row["ts"] for row in ROWS)[::-1][:10]
+    assert [row["ts"] for row in rows] == expect
+
+
+def test_fetch_all_order_by_limit(sharded):
+    rows = sharded.fetch_all(
+        "SELECT * FROM orders WHERE ts < %s ORDER BY ts", [50], order_by="ts", limit=5
+    )
+    assert [row["ts"] for row in rows] == sorted(
+        row["ts"] for row in ROWS if row["ts"] < 50
+    )[:5]
+
+
+def test_table_get_many(sharded):
+    result = sharded.table_get_many("orders", "user_id", [1, 2, 99], multiple=True)
+    assert sorted(result) == [1, 2]
+    assert len(result[1]) == sum(1 for row in ROWS if row["user_id"] == 1)
+
+
+def test_iter_query_and_paginate_merge(sharded):
+    rows = sharded.iter_query("SELECT * FROM orders ORDER BY id", order_by="id")
+    assert [row["id"] for row in rows] == list(range(1, 201))
+
+    rows = list(sharded.table_paginate("orders", {}, [("ts", "DESC"), "id"], 30))
+    assert [(row["ts"], row["id"]) for row in rows] == sorted(
+        ((row["ts"], row["id"]) for row in ROWS), key=lambda key: (-key[0], key[1])
+    )
+
+
+def test_update_of_shard_key_rejected(sharded):
+    with pytest.raises(ValueError):
+        sharded.table_update("orders", {"id": 1}, {"user_id": 2})
+
+
+def test_shard_and_transaction(sharded):
+    shard = sharded.shard(5)
+    assert shard is sharded.shards[crc32_shard(5, 3)]
+    with sharded.transaction(5) as pydo:
+        pydo.table_insert("orders", {"id": 500, "user_id": 5, "ts": 0})
+    assert sharded.table_select("orders", {"user_id": 5, "id": 500})["ts"] == 0
+
+
+def test_need_shards():
+    with pytest.raises(ValueError):
+        ShardedPyDO([])
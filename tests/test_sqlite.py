@@ -0,0 +1,48 @@
+import sqlite3  #
+
+import pytest  #
+
+from PyDO import Database  #
+
+
+def pragma(pydo, name: str):
+    return pydo._tuple_cursor().execute(f"PRAGMA {name}").fetchone()[0]
+
+
+def test_performance_profile(dsn):
+    pydo = Database(dsn, profile="performance")
+    assert pragma(pydo, "journal_mode") == "wal"
+    assert pragma(pydo, "temp_store") == 2
+    pydo.close()
+
+
+def test_dsn_pragma_overrides_profile(dsn):
+    pydo = Database(f"{dsn}?synchronous=OFF", profile="performance")
+    assert pragma(pydo, "synchronous") == 0
+    pydo.close()
+
+
+@pytest.mark.parametrize("option", ["foo=1", "cache_size=1;DROP"])
+def test_invalid_dsn_option(dsn, option):
+    with pytest.raises(ValueError):
+        Database(f"{dsn}?{option}")
+
+
+def test_invalid_profile(dsn):
+    with pytest.raises(ValueError):
+        Database(dsn, profile="nope")
+
+
+def test_reader_is_read_only(db):
+    db.table_insert("users", {"id": 1, "name": "a"})
+    reader = db.reader()
+    assert reader.read_only
+    assert reader.fetch_all("SELECT id FROM users") == [{"id": 1}]
+    with pytest.raises(sqlite3.OperationalError):
+        reader.exec("INSERT INTO users (id, name) VALUES (2, 'b')")
+    reader.close()
+
+
+def test_memory_database():
+    pydo = Database("sqlite:///:memory:")
+    assert pydo.fetch_one("SELECT 1 AS x") == {"x": 1}
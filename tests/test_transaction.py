@@ -0,0 +1,129 @@
+import sqlite3  #
+
+import pytest  #
+
+from PyDO import Database  #
+
+from .conftest import make_users  #
+
+
+def ids(pydo) -> list:
+    return [row["id"] for row in pydo.fetch_all("SELECT id FROM users ORDER BY id")]
+
+
+def test_transaction_commit_and_rollback(db):
+    with db.transaction():
+        db.table_inserts("users", make_users(2))
+    assert ids(db) == [1, 2]
+
+    with pytest.raises(ValueError):
+        with db.transaction():
+            db.table_delete("users", {"id": 1})
+            raise ValueError
+    assert ids(db) == [1, 2]
+    assert not db.inTransaction()
+
+
+def test_nested_transaction_is_savepoint(db):
+    with db.transaction():
+        db.table_inserts("users", make_users(1))
+        with pytest.raises(KeyError):
+            with db.transaction():
+                db.table_inserts("users", make_users(1, start=2))
+                with db.transaction():
+                    db.table_inserts("users", make_users(1, start=3))
+                raise KeyError("x")
+        with db.transaction():
+            db.table_inserts("users", make_users(1, start=4))
+
+    assert ids(db) == [1, 4]
+    assert not db.connect().in_transaction
+
+
+def test_batch_commits_every_n(db, dsn):
+    other = Database(dsn)
+    with db.batch(commit_every=3):
+        for row in make_users(7):
+            db.table_insert("users", row)
+            if row["id"] == 4:
+                assert other.fetch_one("SELECT COUNT(*) AS n FROM users")["n"] == 3
+    assert other.fetch_one("SELECT COUNT(*) AS n FROM users")["n"] == 7
+    assert not db.connect().in_transaction
+    other.close()
+
+
+def test_retry_transaction(db):
+    db.table_inserts("users", make_users(1))
+    calls = []
+
+    def work(pydo):
+        calls.append(1)
+        pydo.table_update("users", {"id": 1}, {"name": f"try{len(calls)}"})
+        if len(calls) < 3:
+            error = sqlite3.OperationalError("database is locked")
+            error.sqlite_errorcode = sqlite3.SQLITE_BUSY
+            raise error
+        return len(calls)
+
+    assert db.retry_transaction(work) == 3
+    assert db.table_select("users", {"id": 1})["name"] == "try3"
+    assert not db.inTransaction()
+
+
+def test_retry_transaction_gives_up(db):
+    def work(pydo):
+        raise sqlite3.IntegrityError("not retryable")
+
+    with pytest.raises(sqlite3.IntegrityError):
+        db.retry_transaction(work, attempts=5)
+    assert not db.inTransaction()
+
+
+@pytest.fixture
+def deferred(db):
+    db.exec("PRAGMA foreign_keys = ON")
+    db.exec(
+        "CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER "
+        "REFERENCES users (id) DEFERRABLE INITIALLY DEFERRED)"
+    )
+    return db
+
+
+def test_commit_failure_rolls_back(deferred, dsn):
+    with pytest.raises(sqlite3.IntegrityError):
+        with deferred.transaction():
+            deferred.table_insert("orders", {"id": 1, "user_id": 99})
+    assert not deferred.inTransaction()
+    assert not deferred.connect().in_transaction
+
+    deferred.table_insert("users", {"id": 1, "name": "a"})
+    other = Database(dsn)
+    assert ids(other) == [1]
+    other.close()
+
+
+def test_pool_commit_failure_rolls_back(dsn, deferred):
+    pooled = Database(dsn, pool=dict(max_size=1))
+    pooled.exec("PRAGMA foreign_keys = ON")
+    pooled.beginTransaction()
+    pooled.table_insert("orders", {"id": 1, "user_id": 99})
+    with pytest.raises(sqlite3.IntegrityError):
+        pooled.commit()
+    with pooled.connection() as pydo:
+        assert not pydo.connect().in_transaction
+    pooled.close()
+
+
+def test_batch_counter_resets_after_commit(db, dsn):
+    other = Database(dsn)
+    db.setAttribute("INSERT_BATCH", 1)
+    with db.batch(commit_every=3):
+        db.table_insert("users", {"id": 1, "name": "a"})
+        db.table_insert("users", {"id": 2, "name": "b"})
+        # 分批插入在自己的事务中提交, 之前未提交的写入一并提交
+        db.table_inserts("users", make_users(2, start=3))
+        db.table_insert("users", {"id": 5, "name": "e"})
+        db.table_insert("users", {"id": 6, "name": "f"})
+        assert ids(other) == [1, 2, 3, 4]
+    assert ids(other) == [1, 2, 3, 4, 5, 6]
+    other.close()
@@ -0,0 +1,50 @@
+import threading  #
+
+import pytest  #
+
+from PyDO.writer import BufferedWriter  #
+
+from .conftest import make_users  #
+
+
+def count(pydo) -> int:
+    return pydo.fetch_one("SELECT COUNT(*) AS n FROM users")["n"]
+
+
+def test_buffered_writes(db, dsn):
+    writer = BufferedWriter(dsn, "users", max_rows=50, max_latency_ms=10)
+
+    def produce(start):
+        for row in make_users(100, start=start):
+            writer.write(row)
+
+    threads = [threading.Thread(target=produce, args=(k * 100 + 1,)) for k in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.flush()
+    assert count(db) == 400
+
+    writer.writes(make_users(5, start=1000))
+    writer.close()
+    assert count(db) == 405
+
+    stats = writer.stats()
+    assert stats["rows"] == 405
+    assert stats["queue_depth"] == 0
+    assert stats["failed_rows"] == 0
+
+    with pytest.raises(RuntimeError):
+        writer.write({"id": 9999, "name": "late"})
+
+
+def test_on_error(db):
+    errors = []
+    with BufferedWriter(
+        db, "users", on_error=lambda error, rows: errors.append(len(rows))
+    ) as writer:
+        writer.write({"id": 1, "name": "ok"})
+        writer.write({"nope": 1})
+    assert errors == [2]
+    assert writer.stats()["failed_rows"] == 2